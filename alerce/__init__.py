@@ -12,8 +12,10 @@ Usage
 """
 
 from .core import Alerce
+from .async_search import AsyncAlerce
+from .transport import Transport
 
-__all__ = ["Alerce"]
+__all__ = ["Alerce", "AsyncAlerce", "Transport"]
 
 # If you update this version, also update it in docs/source/conf.py
 __version__ = "2.3.0"
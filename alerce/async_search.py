@@ -0,0 +1,406 @@
+import asyncio
+import warnings
+
+from .exceptions import handle_error, FormatValidationError
+from .ms_search import AlerceSearchMultiSurvey
+from .retry import RetryPolicy
+from .utils import FLOAT_COLUMNS, ResultCsv, ResultJson, load_config
+from .ztf_search import ZTFSearch
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncAlerce:
+    """
+    Asyncio counterpart of :class:`alerce.common_search.AlerceCommonSearch`.
+
+    It exposes the same ``query_*`` methods with the same ``survey`` routing
+    and return formats, but every method is a coroutine. Requests are sent
+    with an ``httpx.AsyncClient`` and at most ``max_concurrency`` of them are
+    in flight at the same time.
+
+    Parameters
+    ----------
+    max_concurrency : int
+        Maximum number of requests in flight at the same time.
+    http_client : httpx.AsyncClient, optional
+        Client used to send the requests. If not provided, one is created with
+        a connection pool of ``max_concurrency`` connections.
+    timeout : float
+        Timeout in seconds of each request when ``http_client`` is not given.
+    retry : RetryPolicy, optional
+        Policy to retry failed requests. Defaults to ``RetryPolicy()``.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from alerce.async_search import AsyncAlerce
+    >>> async def main(oids):
+    ...     async with AsyncAlerce(max_concurrency=50) as client:
+    ...         return await asyncio.gather(
+    ...             *[client.query_detections(oid, survey="ztf") for oid in oids]
+    ...         )
+    """
+
+    def __init__(self, max_concurrency=20, http_client=None, timeout=60.0, retry=None):
+        if httpx is None and http_client is None:
+            raise ImportError(
+                "AsyncAlerce requires httpx. Install it with `pip install httpx`."
+            )
+        if http_client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_concurrency,
+                    max_keepalive_connections=max_concurrency,
+                ),
+                timeout=timeout,
+            )
+        self.http_client = http_client
+        self.max_concurrency = max_concurrency
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.ztf_config = load_config(service="ztf")
+        self.ms_config = load_config(service="multisurvey")
+        self.allowed_formats = ["pandas", "votable", "json", "csv", "arrow", "polars"]
+        self.valid_surveys = ["ztf", "lsst"]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Closes the underlying HTTP client."""
+        await self.http_client.aclose()
+
+    def _validate_format(self, format):
+        format = format.lower()
+        if format not in self.allowed_formats:
+            raise FormatValidationError(
+                "Format '%s' not in %s" % (format, self.allowed_formats), code=500
+            )
+        return format
+
+    def _resolve_survey(self, survey):
+        if survey is None:
+            survey = "ztf"
+            warnings.warn(
+                "survey not provided, defaulting to 'ztf'. This will use the legacy ZTF client. This behavior will be deprecated in future versions.",
+                DeprecationWarning,
+            )
+        if survey not in self.valid_surveys:
+            raise ValueError(f"survey must be one of {self.valid_surveys}")
+        if survey != "ztf":
+            AlerceSearchMultiSurvey._check_survey_validity(survey)
+        return survey
+
+    def _ztf_url(self, resource, *args):
+        return self.ztf_config["ZTF_API_URL"] + (
+            self.ztf_config["ZTF_ROUTES"][resource] % args
+        )
+
+    def _ms_url(self, resource):
+        return self.ms_config["URL_MS"] + self.ms_config["ROUTES_MS"][resource]
+
+    async def _send(self, method, url, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                async with self.semaphore:
+                    resp = await self.http_client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if not self.retry.can_retry(method, attempt):
+                    raise
+                await asyncio.sleep(self.retry.sleep_time(attempt))
+                attempt += 1
+                continue
+            if not self.retry.is_retryable_status(
+                resp.status_code
+            ) or not self.retry.can_retry(method, attempt):
+                return resp
+            await asyncio.sleep(self.retry.sleep_time(attempt, resp))
+            attempt += 1
+
+    async def _request(
+        self,
+        method,
+        url,
+        params=None,
+        response_field=None,
+        result_format="json",
+        response_format="json",
+        route=None,
+    ):
+        result_format = self._validate_format(result_format)
+        resp = await self._send(method, url, params=params)
+        if resp.status_code >= 400:
+            handle_error(resp, response_format)
+
+        if response_format == "csv":
+            return ResultCsv(resp.content, format=result_format)
+        payload = resp.json()
+        if response_field and result_format != "json" and result_format != "csv":
+            payload = payload[response_field]
+        return ResultJson(
+            payload, format=result_format, float_columns=FLOAT_COLUMNS.get(route, ())
+        )
+
+    async def _query_ms_oid(self, resource, survey, oid, format, index, sort):
+        q = await self._request(
+            "GET",
+            self._ms_url(resource),
+            params={"survey_id": survey, "oid": oid},
+            result_format=format,
+            route=resource,
+        )
+        if resource != "probabilities":
+            q.json_result = AlerceSearchMultiSurvey.add_band_name(q.json_result)
+        return q.result(index, sort)
+
+    async def query_objects(
+        self, format="pandas", index=None, sort=None, survey=None, **kwargs
+    ):
+        """Gets a list of objects filtered by specified parameters.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_objects`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey == "ztf":
+            if "class_name" in kwargs:
+                kwargs["class"] = kwargs.pop("class_name")
+            q = await self._request(
+                "GET",
+                self._ztf_url("objects"),
+                params=kwargs,
+                result_format=format,
+                response_field="items",
+                route="objects",
+            )
+            return q.result(index, sort)
+
+        params = {"survey": survey}
+        params.update(kwargs)
+        for key in params.keys():
+            if key not in AlerceSearchMultiSurvey.VALID_OBJECT_PARAMS:
+                raise ValueError(f"Invalid parameter: {key}")
+        q = await self._request(
+            "GET",
+            self._ms_url("objects"),
+            params=params,
+            result_format=format,
+            route="objects",
+        )
+        q.json_result = q.json_result["items"]
+        return q.result(index, sort)
+
+    async def query_object(self, oid, format="json", survey=None, **kwargs):
+        """Gets a single object by object id.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_object`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey == "ztf":
+            q = await self._request(
+                "GET", self._ztf_url("single_object", oid), result_format=format
+            )
+            return q.result()
+        params = {"survey_id": survey, "oid": oid}
+        params.update(kwargs)
+        q = await self._request(
+            "GET", self._ms_url("single_object"), params=params, result_format=format
+        )
+        return q.result()
+
+    async def query_lightcurve(self, oid, format="json", survey=None):
+        """Gets the lightcurve (detections and non_detections) of a given object.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_lightcurve`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey == "ztf":
+            q = await self._request(
+                "GET", self._ztf_url("lightcurve", oid), result_format=format
+            )
+            return q.result()
+        q = await self._request(
+            "GET",
+            self._ms_url("lightcurve"),
+            params={"survey_id": survey, "oid": oid},
+            result_format=format,
+        )
+        q.json_result = {
+            key: AlerceSearchMultiSurvey.add_band_name(value)
+            for key, value in q.json_result.items()
+        }
+        return q.result()
+
+    async def query_detections(
+        self, oid, format="json", survey=None, index=None, sort=None
+    ):
+        """Gets all detections of a given object.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_detections`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey == "ztf":
+            q = await self._request(
+                "GET",
+                self._ztf_url("detections", oid),
+                result_format=format,
+                route="detections",
+            )
+            return q.result(index, sort)
+        return await self._query_ms_oid("detections", survey, oid, format, index, sort)
+
+    async def query_non_detections(
+        self, oid, format="json", survey=None, index=None, sort=None
+    ):
+        """Gets all non detections of a given object.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_non_detections`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey == "ztf":
+            q = await self._request(
+                "GET",
+                self._ztf_url("non_detections", oid),
+                result_format=format,
+                route="non_detections",
+            )
+            return q.result(index, sort)
+        return await self._query_ms_oid(
+            "non_detections", survey, oid, format, index, sort
+        )
+
+    async def query_forced_photometry(
+        self, oid, format="json", survey=None, index=None, sort=None
+    ):
+        """Gets all forced photometry of a given object.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_forced_photometry`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey == "ztf":
+            if format in ("arrow", "polars"):
+                # extra_fields are expanded on the records, before building the table
+                records = await self.query_forced_photometry(
+                    oid, format="json", survey=survey
+                )
+                return ResultJson(
+                    records,
+                    format=format,
+                    float_columns=FLOAT_COLUMNS["forced_photometry"],
+                ).result(index, sort)
+            q = await self._request(
+                "GET",
+                ZTFSearch.FORCED_PHOTOMETRY_URL % oid,
+                result_format=format,
+                route="forced_photometry",
+            )
+            return ZTFSearch.expand_forced_photometry(q.result(index, sort), format)
+        return await self._query_ms_oid(
+            "forced_photometry", survey, oid, format, index, sort
+        )
+
+    async def query_magstats(
+        self, oid, format="json", survey=None, index=None, sort=None
+    ):
+        """Gets all magnitude statistics of a given object.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_magstats`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey != "ztf":
+            raise NotImplementedError("Multisurvey query_magstats not implemented.")
+        q = await self._request(
+            "GET",
+            self._ztf_url("magstats", oid),
+            result_format=format,
+            route="magstats",
+        )
+        return q.result(index, sort)
+
+    async def query_probabilities(
+        self, oid, format="json", survey=None, index=None, sort=None
+    ):
+        """Gets all probabilities of a given object.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_probabilities`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey == "ztf":
+            q = await self._request(
+                "GET",
+                self._ztf_url("probabilities", oid),
+                result_format=format,
+                route="probabilities",
+            )
+            return q.result(index, sort)
+        return await self._query_ms_oid(
+            "probabilities", survey, oid, format, index, sort
+        )
+
+    async def query_features(
+        self, oid, format="json", survey=None, index=None, sort=None
+    ):
+        """Gets features of a given object.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_features`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey != "ztf":
+            raise NotImplementedError("Multisurvey query_features not implemented.")
+        q = await self._request(
+            "GET",
+            self._ztf_url("features", oid),
+            result_format=format,
+            route="features",
+        )
+        return q.result(index, sort)
+
+    async def query_feature(self, oid, name, format="json", survey=None):
+        """Gets a single feature of a specified object id.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_feature`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey != "ztf":
+            raise NotImplementedError("Multisurvey query_feature not implemented.")
+        q = await self._request(
+            "GET", self._ztf_url("single_feature", oid, name), result_format=format
+        )
+        return q.result()
+
+    async def query_classifiers(self, format="json", survey=None):
+        """Gets all classifiers and their classes.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_classifiers`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey != "ztf":
+            raise NotImplementedError("Multisurvey query_classifiers not implemented.")
+        q = await self._request(
+            "GET", self._ztf_url("classifiers"), result_format=format
+        )
+        return q.result()
+
+    async def query_classes(
+        self, classifier_name, classifier_version, format="json", survey=None
+    ):
+        """Gets classes from a specified classifier.
+
+        See :meth:`alerce.common_search.AlerceCommonSearch.query_classes`.
+        """
+        survey = self._resolve_survey(survey)
+        if survey != "ztf":
+            raise NotImplementedError("Multisurvey query_classes not implemented.")
+        q = await self._request(
+            "GET",
+            self._ztf_url("classifier_classes", classifier_name, classifier_version),
+            result_format=format,
+        )
+        return q.result()
@@ -0,0 +1,632 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import math
+import warnings
+
+from requests.exceptions import RequestException
+
+from .exceptions import APIError
+from .utils import FLOAT_COLUMNS, ResultJson
+
+
+class AlerceBulkSearch:
+    """
+    Bulk variants of the per-object query methods of
+    :class:`alerce.common_search.AlerceCommonSearch`.
+
+    Each ``query_*_many`` method fans the per-object query out over a bounded
+    thread pool and concatenates the results, in the same order as the input
+    oids, into a single result with an ``oid`` column. Objects that fail with
+    an API or connection error are collected instead of aborting the batch.
+
+    :meth:`iter_objects` walks every page of an objects query while the next
+    pages are already being requested, and :meth:`query_objects_all` fetches
+    all the pages of a query concurrently. :meth:`sync_lightcurves` keeps a
+    local store of lightcurves up to date, downloading only the objects with
+    new detections.
+    """
+
+    def _resolve_survey(self, survey):
+        if survey is None:
+            survey = "ztf"
+            warnings.warn(
+                "survey not provided, defaulting to 'ztf'. This will use the legacy ZTF client. This behavior will be deprecated in future versions.",
+                DeprecationWarning,
+            )
+        if survey not in self.valid_surveys:
+            raise ValueError(f"survey must be one of {self.valid_surveys}")
+        return survey
+
+    def _fetch_many(self, method, oids, survey, max_workers, **kwargs):
+        """Runs ``method`` for every oid in a thread pool.
+
+        :returns: the list of (oid, json result) of successful queries, in
+            input order, and a dictionary mapping each failed oid to its error
+        """
+        survey = self._resolve_survey(survey)
+        query = getattr(self, method)
+
+        def fetch(oid):
+            try:
+                return query(oid, format="json", survey=survey, **kwargs), None
+            except (APIError, RequestException) as e:
+                return None, e
+
+        oids = list(oids)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(fetch, oids))
+
+        fetched = []
+        errors = {}
+        for oid, (data, error) in zip(oids, results):
+            if error is None:
+                fetched.append((oid, data))
+            else:
+                errors[oid] = error
+        if errors:
+            warnings.warn(
+                f"{method} failed for {len(errors)} of {len(oids)} objects",
+                RuntimeWarning,
+            )
+        return fetched, errors
+
+    def _format_many(self, records, format, index=None, sort=None, float_columns=()):
+        format = self.legacy_ztf_client._validate_format(format)
+        if not records:
+            index, sort = None, None
+        return ResultJson(records, format=format, float_columns=float_columns).result(
+            index, sort
+        )
+
+    def _query_many(
+        self,
+        method,
+        oids,
+        format="pandas",
+        survey=None,
+        index=None,
+        sort=None,
+        max_workers=8,
+        return_errors=False,
+    ):
+        fetched, errors = self._fetch_many(method, oids, survey, max_workers)
+        records = []
+        for oid, data in fetched:
+            for record in data:
+                record["oid"] = oid
+                records.append(record)
+        # methods are named after their route, e.g. query_detections
+        route = method[len("query_") :]
+        result = self._format_many(
+            records, format, index, sort, float_columns=FLOAT_COLUMNS.get(route, ())
+        )
+        if return_errors:
+            return result, errors
+        return result
+
+    def query_lightcurve_many(
+        self,
+        oids,
+        format="pandas",
+        survey: str | None = None,
+        max_workers=8,
+        return_errors=False,
+    ):
+        """
+        Gets the lightcurves of many objects
+
+        Parameters
+        ----------
+        oids : iterable
+            The object identifiers
+        format : str
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'csv' | 'arrow' | 'polars'
+        survey : str | None
+            The survey to query. If None, defaults to 'ztf' (deprecated).
+        max_workers : int
+            Maximum number of requests in flight at the same time
+        return_errors : bool
+            If True, also return a dictionary mapping each oid that could not
+            be retrieved to its error
+
+        Returns
+        -------
+        A dictionary mapping each lightcurve component (e.g. 'detections',
+        'non_detections') to the concatenation of that component for every
+        object, with an ``oid`` column.
+        """
+        fetched, errors = self._fetch_many(
+            "query_lightcurve", oids, survey, max_workers
+        )
+        components = {}
+        for oid, data in fetched:
+            for key, records in data.items():
+                for record in records:
+                    record["oid"] = oid
+                components.setdefault(key, []).extend(records)
+        result = {
+            key: self._format_many(
+                records, format, float_columns=FLOAT_COLUMNS.get(key, ())
+            )
+            for key, records in components.items()
+        }
+        if return_errors:
+            return result, errors
+        return result
+
+    def query_detections_many(
+        self,
+        oids,
+        format="pandas",
+        survey: str | None = None,
+        index=None,
+        sort=None,
+        max_workers=8,
+        return_errors=False,
+    ):
+        """
+        Gets the detections of many objects
+
+        Parameters
+        ----------
+        oids : iterable
+            The object identifiers
+        format : str
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'csv' | 'arrow' | 'polars'
+        survey : str | None
+            The survey to query. If None, defaults to 'ztf' (deprecated).
+        index : str
+            The name of the column to use as index when format is 'pandas'
+        sort : str
+            The name of the column to sort when format is 'pandas'
+        max_workers : int
+            Maximum number of requests in flight at the same time
+        return_errors : bool
+            If True, also return a dictionary mapping each oid that could not
+            be retrieved to its error
+
+        Returns
+        -------
+        The detections of every object, in input order, with an ``oid`` column
+        """
+        return self._query_many(
+            "query_detections",
+            oids,
+            format=format,
+            survey=survey,
+            index=index,
+            sort=sort,
+            max_workers=max_workers,
+            return_errors=return_errors,
+        )
+
+    def query_non_detections_many(
+        self,
+        oids,
+        format="pandas",
+        survey: str | None = None,
+        index=None,
+        sort=None,
+        max_workers=8,
+        return_errors=False,
+    ):
+        """
+        Gets the non detections of many objects
+
+        Parameters are the same as :meth:`query_detections_many`.
+
+        Returns
+        -------
+        The non detections of every object, in input order, with an ``oid``
+        column
+        """
+        return self._query_many(
+            "query_non_detections",
+            oids,
+            format=format,
+            survey=survey,
+            index=index,
+            sort=sort,
+            max_workers=max_workers,
+            return_errors=return_errors,
+        )
+
+    def query_forced_photometry_many(
+        self,
+        oids,
+        format="pandas",
+        survey: str | None = None,
+        index=None,
+        sort=None,
+        max_workers=8,
+        return_errors=False,
+    ):
+        """
+        Gets the forced photometry of many objects
+
+        Parameters are the same as :meth:`query_detections_many`.
+
+        Returns
+        -------
+        The forced photometry of every object, in input order, with an ``oid``
+        column
+        """
+        return self._query_many(
+            "query_forced_photometry",
+            oids,
+            format=format,
+            survey=survey,
+            index=index,
+            sort=sort,
+            max_workers=max_workers,
+            return_errors=return_errors,
+        )
+
+    def query_magstats_many(
+        self,
+        oids,
+        format="pandas",
+        survey: str | None = None,
+        index=None,
+        sort=None,
+        max_workers=8,
+        return_errors=False,
+    ):
+        """
+        Gets the magnitude statistics of many objects
+
+        Parameters are the same as :meth:`query_detections_many`.
+
+        Returns
+        -------
+        The magnitude statistics of every object, in input order, with an
+        ``oid`` column
+        """
+        return self._query_many(
+            "query_magstats",
+            oids,
+            format=format,
+            survey=survey,
+            index=index,
+            sort=sort,
+            max_workers=max_workers,
+            return_errors=return_errors,
+        )
+
+    def query_probabilities_many(
+        self,
+        oids,
+        format="pandas",
+        survey: str | None = None,
+        index=None,
+        sort=None,
+        max_workers=8,
+        return_errors=False,
+    ):
+        """
+        Gets the probabilities of many objects
+
+        Parameters are the same as :meth:`query_detections_many`.
+
+        Returns
+        -------
+        The probabilities of every object, in input order, with an ``oid``
+        column
+        """
+        return self._query_many(
+            "query_probabilities",
+            oids,
+            format=format,
+            survey=survey,
+            index=index,
+            sort=sort,
+            max_workers=max_workers,
+            return_errors=return_errors,
+        )
+
+    def _last_mjds(self, oids, survey, batch_size, max_workers):
+        """Maps each oid listed by the objects API to its ``lastmjd``"""
+        batches = [oids[i : i + batch_size] for i in range(0, len(oids), batch_size)]
+
+        def fetch(batch):
+            try:
+                return self._query_objects_page(
+                    survey, page=1, page_size=len(batch), oid=batch
+                )
+            except (APIError, RequestException):
+                # unknown, the objects of the batch are downloaded again
+                return []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = list(executor.map(fetch, batches))
+        return {item["oid"]: item.get("lastmjd") for page in pages for item in page}
+
+    def sync_lightcurves(
+        self,
+        oids,
+        store,
+        survey: str | None = None,
+        batch_size=100,
+        max_workers=8,
+        return_errors=False,
+    ):
+        """
+        Brings the lightcurves of many objects in a local store up to date
+
+        The last detection of every object is first read from the objects
+        API, ``batch_size`` objects per request. Only the lightcurves of the
+        objects with detections after the watermark of the store are
+        downloaded, and their new points merged into the store.
+
+        Parameters
+        ----------
+        oids : iterable
+            The object identifiers
+        store : alerce.lightcurve_store.LightcurveStore
+            Local lightcurves to update
+        survey : str | None
+            The survey to query. If None, defaults to 'ztf' (deprecated).
+        batch_size : int
+            Number of objects asked for their last detection per request
+        max_workers : int
+            Maximum number of requests in flight at the same time
+        return_errors : bool
+            If True, also return a dictionary mapping each oid that could not
+            be retrieved to its error
+
+        Returns
+        -------
+        A dictionary mapping each object that got new points to the number
+        of points added
+        """
+        survey = self._resolve_survey(survey)
+        oids = list(oids)
+        last_mjds = self._last_mjds(oids, survey, batch_size, max_workers)
+        stale = [
+            oid for oid in oids if store.needs_update(survey, oid, last_mjds.get(oid))
+        ]
+        fetched, errors = self._fetch_many(
+            "query_lightcurve", stale, survey, max_workers
+        )
+        changed = {}
+        for oid, lightcurve in fetched:
+            added = store.merge(survey, oid, lightcurve)
+            if added:
+                changed[oid] = added
+        if return_errors:
+            return changed, errors
+        return changed
+
+    def _query_objects_page(self, survey, page, page_size, **kwargs):
+        """Gets the list of objects in a single page of an objects query"""
+        return self._query_objects_response(survey, page, page_size, **kwargs)["items"]
+
+    def _query_objects_response(self, survey, page, page_size, **kwargs):
+        """Gets a single page of an objects query, as a dictionary with the
+        objects under ``items`` and the pagination fields of the API, if any"""
+        result = self.query_objects(
+            format="json", survey=survey, page=page, page_size=page_size, **kwargs
+        )
+        if isinstance(result, dict):
+            return result
+        return {"items": result}
+
+    @staticmethod
+    def _is_last_page(response, received):
+        """Whether the objects page ``response`` is the last one of its
+        query, ``received`` objects having been received up to it.
+
+        A page shorter than requested is not enough, the API may serve less
+        objects per page than asked for.
+        """
+        if not response["items"]:
+            return True
+        if response.get("has_next") is False:
+            return True
+        if "next" in response and response["next"] is None:
+            return True
+        total = response.get("total")
+        return total is not None and received >= total
+
+    def iter_objects(
+        self,
+        format="pandas",
+        index=None,
+        sort=None,
+        survey: str | None = None,
+        page_size=100,
+        page=1,
+        prefetch=2,
+        max_pages=None,
+        rows=False,
+        **kwargs,
+    ):
+        """
+        Iterates over every page of an objects query, requesting the next
+        pages while the current one is being processed.
+
+        Parameters
+        ----------
+        format : str
+            Format of each page. Can be one of 'pandas' | 'votable' | 'json' | 'csv' | 'arrow' | 'polars'
+        index : str
+            Name of the column to use as index when format is 'pandas'
+        sort : str
+            Name of the column to sort each page when format is 'pandas'
+        survey : str | None
+            The survey to query. If None, defaults to 'ztf' (deprecated).
+        page_size : int
+            Number of objects in each page
+        page : int
+            First page to retrieve
+        prefetch : int
+            Number of pages requested ahead of the page being processed
+        max_pages : int, optional
+            Maximum number of pages to retrieve
+        rows : bool
+            If True, yield each object as a dictionary instead of pages
+        **kwargs
+            Filters of the objects query, see :meth:`query_objects`.
+
+        Yields
+        ------
+        Each page in the specified format, or each object if ``rows`` is True.
+        The iteration stops at the first empty page, or at the last page
+        according to the ``has_next``, ``next`` or ``total`` fields of the
+        response. Pages shorter than ``page_size`` do not stop it, as the API
+        may cap the page size. Closing the generator cancels the pages not
+        requested yet and waits for those in flight.
+        """
+        survey = self._resolve_survey(survey)
+        if not rows:
+            format = self.legacy_ztf_client._validate_format(format)
+        last_page = page + max_pages - 1 if max_pages is not None else None
+        executor = ThreadPoolExecutor(max_workers=prefetch + 1)
+        pending = deque()
+        next_page = page
+
+        def submit():
+            nonlocal next_page
+            if last_page is not None and next_page > last_page:
+                return
+            pending.append(
+                executor.submit(
+                    self._query_objects_response,
+                    survey,
+                    next_page,
+                    page_size,
+                    **kwargs,
+                )
+            )
+            next_page += 1
+
+        received = 0
+        try:
+            for _ in range(prefetch + 1):
+                submit()
+            while pending:
+                response = pending.popleft().result()
+                items = response["items"]
+                received += len(items)
+                if self._is_last_page(response, received):
+                    for future in pending:
+                        future.cancel()
+                    pending.clear()
+                else:
+                    submit()
+                if not items:
+                    break
+                if rows:
+                    yield from items
+                else:
+                    yield ResultJson(
+                        items, format=format, float_columns=FLOAT_COLUMNS["objects"]
+                    ).result(index, sort)
+        finally:
+            # no request outlives the generator
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def count_objects(self, survey: str | None = None, **kwargs):
+        """
+        Gets the total number of objects matching an objects query
+
+        Parameters
+        ----------
+        survey : str | None
+            The survey to query. If None, defaults to 'ztf' (deprecated).
+        **kwargs
+            Filters of the objects query, see :meth:`query_objects`.
+
+        Returns
+        -------
+        The number of objects, or None if the API did not report it
+        """
+        survey = self._resolve_survey(survey)
+        if survey == "ztf":
+            return self.legacy_ztf_client.count_objects(**kwargs)
+        return self.multisurvey_client.count_objects(survey, **kwargs)
+
+    def query_objects_all(
+        self,
+        format="pandas",
+        index=None,
+        sort=None,
+        survey: str | None = None,
+        page_size=500,
+        max_workers=4,
+        **kwargs,
+    ):
+        """
+        Gets every object matching an objects query.
+
+        The total number of matches and the first page are requested first,
+        then the other pages are fetched concurrently and joined in page
+        order. The number of pages follows from the number of objects in the
+        first page, which is less than ``page_size`` if the server caps it. Objects repeated at
+        page boundaries (e.g. when the results change between page requests)
+        are kept only once.
+
+        Parameters
+        ----------
+        format : str
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'csv' | 'arrow' | 'polars'
+        index : str
+            Name of the column to use as index when format is 'pandas'
+        sort : str
+            Name of the column to sort when format is 'pandas'
+        survey : str | None
+            The survey to query. If None, defaults to 'ztf' (deprecated).
+        page_size : int
+            Number of objects requested in each page
+        max_workers : int
+            Maximum number of pages requested at the same time
+        **kwargs
+            Filters of the objects query, see :meth:`query_objects`.
+
+        Returns
+        -------
+        All the matching objects in the specified format
+        """
+        survey = self._resolve_survey(survey)
+        format = self.legacy_ztf_client._validate_format(format)
+        kwargs.pop("page", None)
+        total = self.count_objects(survey=survey, **kwargs)
+        if total is None:
+            # the API did not report the total, walk the pages instead
+            pages = self.iter_objects(
+                survey=survey,
+                page_size=page_size,
+                prefetch=max_workers - 1,
+                format="json",
+                **kwargs,
+            )
+        else:
+
+            def fetch(page):
+                return self._query_objects_page(survey, page, page_size, **kwargs)
+
+            # the server may serve less objects per page than requested, the
+            # number of pages follows from the size of the first one
+            pages = [fetch(1)]
+            served = len(pages[0])
+            if served:
+                n_pages = math.ceil(total / served)
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    pages.extend(executor.map(fetch, range(2, n_pages + 1)))
+                # walk on if later pages were shorter than the first one
+                while pages[-1] and sum(map(len, pages)) < total:
+                    pages.append(fetch(len(pages) + 1))
+
+        items = []
+        seen = set()
+        for page in pages:
+            for item in page:
+                oid = item.get("oid")
+                if oid is not None:
+                    if oid in seen:
+                        continue
+                    seen.add(oid)
+                items.append(item)
+        return self._format_many(
+            items, format, index, sort, float_columns=FLOAT_COLUMNS["objects"]
+        )
@@ -0,0 +1,812 @@
+from collections import Counter, OrderedDict
+import abc
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+MINUTE = 60
+DAY = 24 * 60 * MINUTE
+
+#: Seconds each route is served from the cache without asking the server.
+#: Routes not listed are revalidated on every request.
+DEFAULT_TTLS = {
+    "classifiers": 7 * DAY,
+    "classifier_classes": 7 * DAY,
+    "single_object": 10 * MINUTE,
+    "lightcurve": 10 * MINUTE,
+    "detections": 10 * MINUTE,
+    "non_detections": 10 * MINUTE,
+    "forced_photometry": 10 * MINUTE,
+    "magstats": 10 * MINUTE,
+    "probabilities": 10 * MINUTE,
+    "features": 10 * MINUTE,
+    "single_feature": 10 * MINUTE,
+    "conesearch": DAY,
+    "conesearch_all": DAY,
+    "crossmatch": DAY,
+    "crossmatch_all": DAY,
+}
+
+#: Seconds the access time of a persisted entry is left as is when it is
+#: read again, so reads rarely need a write
+ACCESS_RESOLUTION = MINUTE
+
+
+class CacheEntry:
+    """
+    A cached response body with its validators.
+
+    Parameters
+    ----------
+    body : bytes
+        Response body exactly as received.
+    etag : str, optional
+        Value of the ``ETag`` header of the response.
+    last_modified : str, optional
+        Value of the ``Last-Modified`` header of the response.
+    stored_at : float, optional
+        Time (``time.time()``) the body was received or last revalidated.
+    payload : object, optional
+        Decoded body. Only kept by in-memory caches, so a revalidated entry
+        does not need to be decoded again.
+    payload_size : int, optional
+        Estimated memory taken by ``payload``, computed once by
+        :class:`LRUResponseCache`.
+    frames : FrameMemo, optional
+        DataFrames converted from the payload, kept by
+        :class:`LRUResponseCache` with ``keep_frames``.
+    """
+
+    __slots__ = (
+        "body",
+        "etag",
+        "last_modified",
+        "stored_at",
+        "payload",
+        "payload_size",
+        "frames",
+    )
+
+    def __init__(
+        self, body, etag=None, last_modified=None, stored_at=None, payload=None
+    ):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.time() if stored_at is None else stored_at
+        self.payload = payload
+        self.payload_size = None
+        self.frames = None
+
+    @classmethod
+    def from_response(cls, response, payload=None):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        return cls(
+            response.content,
+            etag=etag if isinstance(etag, str) else None,
+            last_modified=last_modified if isinstance(last_modified, str) else None,
+            payload=payload,
+        )
+
+    def validators(self):
+        """Headers to revalidate the entry with a conditional request"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+#: Items of a list measured by :func:`estimate_size`, the others are assumed
+#: to be alike
+SIZE_SAMPLE = 64
+
+
+def estimate_size(value):
+    """Approximate memory in bytes taken by a decoded JSON value.
+
+    Lists longer than :data:`SIZE_SAMPLE` are estimated from that many items
+    evenly spread, so large payloads are not walked entirely.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += sys.getsizeof(key) + estimate_size(item)
+    elif isinstance(value, list) and value:
+        step = max(len(value) // SIZE_SAMPLE, 1)
+        sample = value[::step]
+        sampled = sum(estimate_size(item) for item in sample)
+        size += sampled * len(value) // len(sample)
+    return size
+
+
+class FrameMemo:
+    """
+    DataFrames converted from a cached payload, by index and sort column.
+    Copies are stored and returned, so callers can modify them.
+
+    Parameters
+    ----------
+    on_change : callable, optional
+        Called without arguments when a DataFrame is added.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self._frames = {}
+        self._sizes = {}
+        self._nbytes = 0
+
+    def get(self, index=None, sort=None):
+        dataframe = self._frames.get((index, sort))
+        return None if dataframe is None else dataframe.copy()
+
+    def put(self, index, sort, dataframe):
+        dataframe = dataframe.copy()
+        size = int(dataframe.memory_usage(deep=True).sum())
+        self._nbytes += size - self._sizes.get((index, sort), 0)
+        self._frames[(index, sort)] = dataframe
+        self._sizes[(index, sort)] = size
+        if self.on_change is not None:
+            self.on_change()
+
+    def nbytes(self):
+        return self._nbytes
+
+
+class CacheStats:
+    """
+    Counters of the events of a cache layer, in total and by route.
+
+    Parameters
+    ----------
+    events : iterable of str
+        Events reported even before they happen, with a count of 0.
+    """
+
+    def __init__(self, events=("hits", "misses")):
+        self.events = tuple(events)
+        self._counts = Counter()
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def count(self, event, route=None, n=1):
+        """Adds ``n`` to the counter of ``event``, and to that of ``route``
+        if given"""
+        with self._lock:
+            self._counts[event] += n
+            if route is not None:
+                self._routes.setdefault(route, Counter())[event] += n
+
+    def _summary(self, counts):
+        summary = dict.fromkeys(self.events, 0)
+        summary.update(counts)
+        lookups = counts["hits"] + counts["misses"]
+        summary["hit_ratio"] = counts["hits"] / lookups if lookups else None
+        return summary
+
+    def snapshot(self):
+        """The counters as a dictionary, with the ``hit_ratio`` (None before
+        any lookup) and the counters of each route under ``routes``"""
+        with self._lock:
+            summary = self._summary(self._counts)
+            summary["routes"] = {
+                route: self._summary(counts) for route, counts in self._routes.items()
+            }
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._routes.clear()
+
+
+#: Events counted by response caches and blob stores
+CACHE_EVENTS = (
+    "hits",
+    "misses",
+    "stale",
+    "revalidated",
+    "evictions",
+    "bytes_cached",
+    "bytes_network",
+)
+
+
+class ResponseCache(abc.ABC):
+    """
+    Storage of response bodies keyed by :func:`alerce.transport.request_key`.
+
+    An entry younger than the TTL of its route is served without contacting
+    the server. Older entries are revalidated with their ``ETag`` or
+    ``Last-Modified`` validators.
+
+    The client reports to the cache how each request was answered, see
+    :attr:`stats`.
+
+    Parameters
+    ----------
+    ttls : dict, optional
+        Seconds entries of each route stay fresh, by route name (``"lightcurve"``,
+        ``"classifiers"``, ...). Defaults to :data:`DEFAULT_TTLS`.
+    default_ttl : float
+        Seconds entries of routes not in ``ttls`` stay fresh.
+    stale_while_revalidate : float
+        Seconds after its TTL an entry is still served at once, while it is
+        revalidated in the background.
+    stale_if_error : float
+        Seconds after its TTL an entry is served, with a
+        :class:`alerce.exceptions.StaleResultWarning`, when the server fails
+        to answer or answers with a server error.
+    """
+
+    #: Whether entries keep their decoded payload between requests
+    keeps_payload = False
+
+    def __init__(
+        self, ttls=None, default_ttl=0, stale_while_revalidate=0, stale_if_error=0
+    ):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self._stats = CacheStats(CACHE_EVENTS)
+
+    @property
+    def stats(self):
+        """Counters of the requests answered through the cache.
+
+        Keys are ``hits`` (requests answered with a stored body, fresh,
+        revalidated or stale), ``misses`` (requests answered with a body
+        downloaded), ``stale`` (hits past their TTL), ``revalidated`` (304
+        answers, including background revalidations), ``evictions``
+        (entries dropped to stay within the quota), ``bytes_cached`` and
+        ``bytes_network`` (body bytes served from the cache and downloaded),
+        and the ``hit_ratio``. The same counters of each route are under
+        ``routes``.
+        """
+        return self._stats.snapshot()
+
+    def reset_stats(self):
+        self._stats.reset()
+
+    def count(self, event, route=None, n=1):
+        """Reports ``n`` occurrences of ``event`` for a request of ``route``"""
+        self._stats.count(event, route, n)
+
+    def ttl(self, route):
+        """Seconds entries of ``route`` stay fresh"""
+        return self.ttls.get(route, self.default_ttl)
+
+    def is_fresh(self, entry, route):
+        """Whether ``entry`` can be served without contacting the server"""
+        return time.time() - entry.stored_at < self.ttl(route)
+
+    def can_serve_stale(self, entry, route):
+        """Whether ``entry`` can be served while it is revalidated"""
+        age = time.time() - entry.stored_at
+        return age < self.ttl(route) + self.stale_while_revalidate
+
+    def can_serve_if_error(self, entry, route):
+        """Whether ``entry`` can be served when the server fails"""
+        age = time.time() - entry.stored_at
+        return age < self.ttl(route) + self.stale_if_error
+
+    def should_store(self, entry, route):
+        """Whether a response can be served or revalidated later"""
+        return bool(
+            entry.etag
+            or entry.last_modified
+            or self.ttl(route) > 0
+            or self.stale_while_revalidate > 0
+            or self.stale_if_error > 0
+        )
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Returns the :class:`CacheEntry` stored for ``key``, or None"""
+        pass
+
+    @abc.abstractmethod
+    def set(self, key, entry):
+        """Stores ``entry`` for ``key``"""
+        pass
+
+    @abc.abstractmethod
+    def delete(self, key):
+        pass
+
+    @abc.abstractmethod
+    def clear(self):
+        pass
+
+    def touch(self, key, entry):
+        """Marks ``entry`` as revalidated now"""
+        entry.stored_at = time.time()
+        self.set(key, entry)
+
+    def resized(self, key, entry):
+        """Called when the decoded payload or DataFrames of a stored entry
+        change, for caches bounded by memory"""
+        pass
+
+    def frames(self, key):
+        """:class:`FrameMemo` of the entry stored for ``key``, or None if the
+        cache does not keep DataFrames"""
+        return None
+
+
+class MemoryResponseCache(ResponseCache):
+    """Response cache kept in the memory of the process"""
+
+    keeps_payload = True
+
+    def __init__(
+        self, ttls=None, default_ttl=0, stale_while_revalidate=0, stale_if_error=0
+    ):
+        super().__init__(
+            ttls=ttls,
+            default_ttl=default_ttl,
+            stale_while_revalidate=stale_while_revalidate,
+            stale_if_error=stale_if_error,
+        )
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LRUResponseCache(ResponseCache):
+    """
+    Response cache kept in the memory of the process, bounded by the memory
+    taken by its entries.
+
+    Entries keep their decoded payload when the standard json decoder is
+    used, so a fresh entry is served without contacting the server nor
+    decoding it again, and optionally the DataFrames converted from it. When the estimated size of the entries
+    goes over ``max_bytes``, the least recently used ones are dropped.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Memory budget of the cache.
+    ttls : dict, optional
+        See :class:`ResponseCache`.
+    default_ttl : float
+        See :class:`ResponseCache`.
+    keep_frames : bool
+        If True, the DataFrames returned in pandas format are kept too.
+    stale_while_revalidate : float
+        See :class:`ResponseCache`.
+    stale_if_error : float
+        See :class:`ResponseCache`.
+    """
+
+    keeps_payload = True
+
+    def __init__(
+        self,
+        max_bytes=256 * 1024**2,
+        ttls=None,
+        default_ttl=0,
+        keep_frames=False,
+        stale_while_revalidate=0,
+        stale_if_error=0,
+    ):
+        super().__init__(
+            ttls=ttls,
+            default_ttl=default_ttl,
+            stale_while_revalidate=stale_while_revalidate,
+            stale_if_error=stale_if_error,
+        )
+        self.max_bytes = max_bytes
+        self.keep_frames = keep_frames
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(entry):
+        size = len(entry.body) + sys.getsizeof(entry)
+        if entry.payload is not None:
+            if entry.payload_size is None:
+                entry.payload_size = estimate_size(entry.payload)
+            size += entry.payload_size
+        if entry.frames is not None:
+            size += entry.frames.nbytes()
+        return size
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        size = self._size(entry)
+        with self._lock:
+            self._put(key, entry, size)
+
+    def _put(self, key, entry, size):
+        self._total += size - self._sizes.get(key, 0)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        while self._total > self.max_bytes and self._entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._total -= self._sizes.pop(evicted)
+            self._stats.count("evictions")
+
+    def resized(self, key, entry):
+        size = self._size(entry)
+        with self._lock:
+            if self._entries.get(key) is entry:
+                self._put(key, entry, size)
+
+    def frames(self, key):
+        if not self.keep_frames:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.frames is None:
+                entry.frames = FrameMemo(lambda: self.resized(key, entry))
+            return entry.frames
+
+    def delete(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._total -= self._sizes.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total = 0
+
+    def size(self):
+        """Estimated memory in bytes taken by the entries"""
+        return self._total
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TieredResponseCache(ResponseCache):
+    """
+    Memory cache in front of a persistent one.
+
+    Entries are written to both, and read from ``memory`` first. Entries only
+    found in ``persistent`` are copied to ``memory``. The TTLs and stale
+    windows of ``persistent`` apply.
+
+    Parameters
+    ----------
+    memory : ResponseCache
+        Cache kept in memory, e.g. :class:`LRUResponseCache`.
+    persistent : ResponseCache
+        Cache that outlives the process, e.g. :class:`SQLiteResponseCache`.
+    """
+
+    def __init__(self, memory, persistent):
+        self.memory = memory
+        self.persistent = persistent
+        self.keeps_payload = memory.keeps_payload
+        self._stats = CacheStats(CACHE_EVENTS)
+
+    @property
+    def stats(self):
+        """See :attr:`ResponseCache.stats`. ``evictions`` adds up those of
+        both tiers."""
+        summary = self._stats.snapshot()
+        summary["evictions"] = (
+            self.memory.stats["evictions"] + self.persistent.stats["evictions"]
+        )
+        return summary
+
+    def reset_stats(self):
+        self._stats.reset()
+        self.memory.reset_stats()
+        self.persistent.reset_stats()
+
+    @property
+    def ttls(self):
+        return self.persistent.ttls
+
+    @property
+    def default_ttl(self):
+        return self.persistent.default_ttl
+
+    @property
+    def stale_while_revalidate(self):
+        return self.persistent.stale_while_revalidate
+
+    @property
+    def stale_if_error(self):
+        return self.persistent.stale_if_error
+
+    def ttl(self, route):
+        return self.persistent.ttl(route)
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is None:
+            entry = self.persistent.get(key)
+            if entry is not None:
+                self.memory.set(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self.memory.set(key, entry)
+        self.persistent.set(key, entry)
+
+    def touch(self, key, entry):
+        self.memory.touch(key, entry)
+        self.persistent.touch(key, entry)
+
+    def resized(self, key, entry):
+        self.memory.resized(key, entry)
+
+    def frames(self, key):
+        return self.memory.frames(key)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        self.persistent.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        self.persistent.clear()
+
+    def close(self):
+        if hasattr(self.persistent, "close"):
+            self.persistent.close()
+
+
+class SQLiteConnections:
+    """
+    One SQLite connection per thread to the same database, in WAL mode so
+    readers do not block the writer.
+
+    Parameters
+    ----------
+    path : str
+        Database file.
+    timeout : float
+        Seconds to wait for a lock held by another connection.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Connection of the calling thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=self.timeout, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Closes the connections of every thread"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Response cache persisted in a SQLite database, shared between processes.
+
+    The least recently used entries are deleted when the bodies stored add up
+    to more than ``max_bytes``, down to 90% of it so evictions are rare. Access
+    times are recorded with a resolution of :data:`ACCESS_RESOLUTION`. Each
+    thread uses its own connection and the database is opened in WAL mode, so
+    several threads and processes can read and write the same file.
+
+    Parameters
+    ----------
+    path : str, optional
+        Database file. Defaults to ``~/.cache/alerce/responses.sqlite``.
+    ttls : dict, optional
+        See :class:`ResponseCache`.
+    default_ttl : float
+        See :class:`ResponseCache`.
+    max_bytes : int
+        Maximum total size of the stored bodies.
+    timeout : float
+        Seconds to wait for a lock held by another connection.
+    stale_while_revalidate : float
+        See :class:`ResponseCache`.
+    stale_if_error : float
+        See :class:`ResponseCache`.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        ttls=None,
+        default_ttl=0,
+        max_bytes=512 * 1024**2,
+        timeout=30.0,
+        stale_while_revalidate=0,
+        stale_if_error=0,
+    ):
+        super().__init__(
+            ttls=ttls,
+            default_ttl=default_ttl,
+            stale_while_revalidate=stale_while_revalidate,
+            stale_if_error=stale_if_error,
+        )
+        if path is None:
+            path = os.path.join(
+                os.path.expanduser("~"), ".cache", "alerce", "responses.sqlite"
+            )
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._connections = SQLiteConnections(path, timeout=timeout)
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, body BLOB NOT NULL, etag TEXT, "
+                "last_modified TEXT, stored_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+        self._total = self.size()
+
+    def _connection(self):
+        return self._connections.get()
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT body, etag, last_modified, stored_at, accessed_at "
+            "FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, stored_at, accessed_at = row
+        now = time.time()
+        if now - accessed_at > ACCESS_RESOLUTION:
+            with conn:
+                conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+        return CacheEntry(
+            bytes(body), etag=etag, last_modified=last_modified, stored_at=stored_at
+        )
+
+    def set(self, key, entry):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        with self._connection() as conn:
+            previous = conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    sqlite3.Binary(entry.body),
+                    entry.etag,
+                    entry.last_modified,
+                    entry.stored_at,
+                    time.time(),
+                    size,
+                ),
+            )
+            with self._lock:
+                self._total += size - (previous[0] if previous else 0)
+                full = self._total > self.max_bytes
+            if full:
+                self._evict(conn)
+
+    def _evict(self, conn):
+        # the running total misses entries written by other processes, the
+        # quota is checked against the database before evicting
+        (total,) = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total > self.max_bytes:
+            target = 0.9 * self.max_bytes
+            victims = []
+            for key, size in conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at"
+            ):
+                victims.append((key,))
+                total -= size
+                if total <= target:
+                    break
+            conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+            self._stats.count("evictions", n=len(victims))
+        with self._lock:
+            self._total = total
+
+    def touch(self, key, entry):
+        entry.stored_at = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (entry.stored_at, entry.stored_at, key),
+            )
+
+    def delete(self, key):
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        if row is not None:
+            with self._lock:
+                self._total -= row[0]
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM responses")
+        with self._lock:
+            self._total = 0
+
+    def size(self):
+        """Total size in bytes of the stored bodies"""
+        (total,) = (
+            self._connection()
+            .execute("SELECT COALESCE(SUM(size), 0) FROM responses")
+            .fetchone()
+        )
+        return total
+
+    def __len__(self):
+        (count,) = (
+            self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()
+        )
+        return count
+
+    def close(self):
+        """Closes the connections of every thread"""
+        self._connections.close()
@@ -1,9 +1,12 @@
+from .bulk_search import AlerceBulkSearch
 from .ztf_search import ZTFSearch
 from .ms_search import AlerceSearchMultiSurvey
+from .metadata import metadata_cache
+from .transport import Transport
 import warnings
 
 
-class AlerceCommonSearch:
+class AlerceCommonSearch(AlerceBulkSearch):
     """
     AlerceCommonSearch provides a unified interface for querying astronomical data
     from multiple surveys, including ZTF and LSST. It supports querying objects,
@@ -12,15 +15,26 @@ class AlerceCommonSearch:
     This class routes queries to the appropriate survey-specific client based on the
     survey parameter. Users interact with the Alerce class which inherits from this,
     providing a single entry point for all queries.
+
+    Per-object queries also have bulk ``query_*_many`` variants, see
+    :class:`alerce.bulk_search.AlerceBulkSearch`.
     """
 
-    def __init__(self, **kwargs):
+    def __init__(self, transport=None, **kwargs):
         """
         Initializes the AlerceCommonSearch class with clients for legacy ZTF
         and multisurvey data.
+
+        Parameters
+        ----------
+        transport : Transport, optional
+            HTTP transport shared by the survey clients. A new one is created
+            from the config file if not provided.
         """
-        self.legacy_ztf_client = ZTFSearch()
-        self.multisurvey_client = AlerceSearchMultiSurvey()
+        if transport is None:
+            transport = Transport.from_config()
+        self.legacy_ztf_client = ZTFSearch(transport=transport)
+        self.multisurvey_client = AlerceSearchMultiSurvey(transport=transport)
         self.valid_surveys = ["ztf", "lsst"]
 
     def query_objects(
@@ -37,7 +51,7 @@ class AlerceCommonSearch:
         Parameters
         ----------
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         index : str
             Name of the column to use as index when format is 'pandas'
         sort : str
@@ -94,7 +108,7 @@ class AlerceCommonSearch:
             The object identifier
         format : str
             Return format. Can be one of 'pandas' | 'votable' |
-            'json'
+            'json' | 'arrow' | 'polars'
         survey: str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on the default
             (omitting the `survey` parameter) is deprecated and will be removed in a future
@@ -138,7 +152,7 @@ class AlerceCommonSearch:
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on the default
             (omitting the `survey` parameter) is deprecated and will be removed in a future
@@ -179,7 +193,7 @@ class AlerceCommonSearch:
         oid : str | int
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on
             the default (omitting the `survey` parameter) is deprecated and will be removed in a future
@@ -228,7 +242,7 @@ class AlerceCommonSearch:
         oid : str | int
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on
             the default (omitting the `survey` parameter) is deprecated and will be removed in
@@ -277,7 +291,7 @@ class AlerceCommonSearch:
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on
             the default (omitting the `survey` parameter) is deprecated and will be removed in
@@ -326,7 +340,7 @@ class AlerceCommonSearch:
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on
             the default (omitting the `survey` parameter) is deprecated and will be removed in
@@ -375,7 +389,7 @@ class AlerceCommonSearch:
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on
             the default (omitting the `survey` parameter) is deprecated and will be removed in
@@ -428,7 +442,7 @@ class AlerceCommonSearch:
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on
             the default (omitting the `survey` parameter) is deprecated and will be removed in
@@ -480,7 +494,7 @@ class AlerceCommonSearch:
         name : str
             The feature's name
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on
             the default (omitting the `survey` parameter) is deprecated and will be removed in
@@ -520,7 +534,7 @@ class AlerceCommonSearch:
         Parameters
         ----------
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on
             the default (omitting the `survey` parameter) is deprecated and will be removed in
@@ -571,7 +585,7 @@ class AlerceCommonSearch:
         classifier_version : str
             The classifier's version
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         survey : str | None
             The survey to query. If None, defaults to 'ztf'. Note: relying on
             the default (omitting the `survey` parameter) is deprecated and will be removed in
@@ -603,3 +617,40 @@ class AlerceCommonSearch:
             )
         else:
             raise ValueError(f"survey must be one of {self.valid_surveys}")
+
+    def taxonomy(self, survey: str | None = None):
+        """
+        Gets an index of the classes of each classifier and of the
+        classifiers of each class, built once per process.
+
+        Parameters
+        ----------
+        survey : str | None
+            The survey to query. If None, defaults to 'ztf'. Note: relying on
+            the default (omitting the `survey` parameter) is deprecated and will be removed in
+            a future release; callers should explicitly pass the desired survey (e.g. `survey='ztf'`).
+
+        Returns
+        -------
+        alerce.metadata.Taxonomy
+        """
+        if survey is None:
+            survey = "ztf"
+            warnings.warn(
+                "survey not provided, defaulting to 'ztf'. This will use the legacy ZTF client. This behavior will be deprecated in future versions.",
+                DeprecationWarning,
+            )
+
+        if survey == "ztf":
+            return self.legacy_ztf_client.taxonomy()
+        elif survey in self.valid_surveys:
+            raise NotImplementedError("Multisurvey taxonomy not implemented.")
+        else:
+            raise ValueError(f"survey must be one of {self.valid_surveys}")
+
+    def invalidate_metadata(self):
+        """
+        Drops the classifiers, classes and taxonomy memoized by every client
+        of the process, so the next queries fetch them again.
+        """
+        metadata_cache.clear()
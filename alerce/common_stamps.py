@@ -1,5 +1,6 @@
 from .ms_stamps import AlerceStampsMultisurvey
 from .stamps import AlerceStamps
+from .transport import Transport
 import warnings
 
 
@@ -13,16 +14,21 @@ class AlerceCommonStamps:
     providing a single entry point for all stamp operations.
     """
 
-    def __init__(self, **kwargs):
+    def __init__(self, transport=None, **kwargs):
         """
         Initializes the AlerceCommonStamps class with clients for legacy ZTF
         and multisurvey stamps.
 
         Parameters
         ----------
+        transport : Transport, optional
+            HTTP transport shared by the stamps clients. A new one is created
+            from the config file if not provided.
         """
-        self.legacy_stamps_client = AlerceStamps()
-        self.multisurvey_stamps_client = AlerceStampsMultisurvey()
+        if transport is None:
+            transport = Transport.from_config()
+        self.legacy_stamps_client = AlerceStamps(transport=transport)
+        self.multisurvey_stamps_client = AlerceStampsMultisurvey(transport=transport)
         self.valid_surveys = ["ztf", "lsst"]
 
     def plot_stamps(self, oid, candid=None, measurement_id=None, survey=None):
@@ -174,3 +180,43 @@ class AlerceCommonStamps:
             )
         else:
             return self.legacy_stamps_client.get_avro(oid, candid=candid)
+
+    def get_avros(self, pairs, use_multisurvey_api=False, survey=None, max_workers=8):
+        """
+        Download the avros of many alerts, reading the ones already in the
+        avro store of the transport from disk and downloading the rest
+        concurrently.
+
+        Parameters
+        ----------
+        pairs : iterable of (str, int)
+            (oid, candid) of each alert. With the multisurvey API, candid is
+            the measurement_id of the alert.
+        use_multisurvey_api : bool
+            If True, uses the multisurvey API. Requires `survey` parameter.
+        survey : str, optional
+            The survey to query. Required when use_multisurvey_api is True.
+        max_workers : int
+            Maximum number of concurrent downloads.
+
+        Returns
+        -------
+        dict
+            Maps each (oid, candid) pair to its avro data, or None if it could
+            not be downloaded.
+
+        Raises
+        ------
+        ValueError
+            If use_multisurvey_api is True and survey is not provided.
+        """
+        if use_multisurvey_api:
+            if survey is None:
+                raise ValueError(
+                    "survey must be provided when use_multisurvey_api is True"
+                )
+            return self.multisurvey_stamps_client.multisurvey_get_avros(
+                survey, pairs, max_workers=max_workers
+            )
+        else:
+            return self.legacy_stamps_client.get_avros(pairs, max_workers=max_workers)
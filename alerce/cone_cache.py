@@ -0,0 +1,259 @@
+from collections import OrderedDict
+import math
+import threading
+
+import numpy as np
+
+from .cache import CacheStats
+
+# height in degrees of the declination bands recorded cones are indexed by
+DEC_BAND = 1.0
+
+
+def angular_distance(ra1, dec1, ra2, dec2):
+    """Angular distance in arcsec between points given in degrees"""
+    ra1, dec1, ra2, dec2 = (np.radians(x) for x in (ra1, dec1, ra2, dec2))
+    a = (
+        np.sin((dec2 - dec1) / 2) ** 2
+        + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    )
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))) * 3600
+
+
+def _coordinates(data):
+    """RA and Dec in degrees of the rows of a catsHTM catalog response, or
+    None if the catalog has no coordinate columns"""
+    fields = {name.lower(): name for name in data}
+    if "ra" not in fields or "dec" not in fields:
+        return None
+    coordinates = []
+    for name in (fields["ra"], fields["dec"]):
+        column = data[name]
+        values = np.asarray(column.get("values", []), dtype=float)
+        if column.get("units", column.get("unit")) == "rad":
+            values = np.degrees(values)
+        coordinates.append(values)
+    return coordinates
+
+
+class _Region:
+    def __init__(self, ra, dec, radius, catalogs, wrapped):
+        self.ra = ra
+        self.dec = dec
+        self.radius = radius
+        # list of (catalog name, catalog response)
+        self.catalogs = catalogs
+        # whether the response is a {"catalogs": [...]} list of catalogs
+        self.wrapped = wrapped
+
+    def bands(self):
+        """Declination bands overlapped by the cone"""
+        radius = self.radius / 3600
+        low = math.floor(max(self.dec - radius, -90) / DEC_BAND)
+        high = math.floor(min(self.dec + radius, 90) / DEC_BAND)
+        return range(low, high + 1)
+
+    def contains(self, ra, dec, radius):
+        # the distance is at least the difference in declination
+        if abs(dec - self.dec) * 3600 + radius > self.radius:
+            return False
+        ra1, dec1, ra2, dec2 = map(math.radians, (self.ra, self.dec, ra, dec))
+        a = (
+            math.sin((dec2 - dec1) / 2) ** 2
+            + math.cos(dec1) * math.cos(dec2) * math.sin((ra2 - ra1) / 2) ** 2
+        )
+        distance = math.degrees(2 * math.asin(math.sqrt(min(max(a, 0), 1)))) * 3600
+        return distance + radius <= self.radius
+
+
+class ConeCache:
+    """
+    Spatial cache of catsHTM conesearch results.
+
+    The cones fetched from the server are recorded per catalog with all
+    their rows. A conesearch or crossmatch inside a recorded cone is
+    answered by filtering those rows on their angular distance to the
+    query center, without contacting the server.
+
+    Parameters
+    ----------
+    prefetch_radius : float, optional
+        Radius in arcsec fetched around the center of a query that misses
+        the cache, if larger than the query radius. Crossmatches that miss
+        the cache are answered from such a cone instead of being sent to the
+        server. Queries of clustered fields then hit the cache.
+    max_regions : int
+        Number of cones kept, the least recently used are dropped first.
+
+    Notes
+    -----
+    The cones are indexed per catalog and per declination band of
+    ``DEC_BAND`` degrees, so a lookup only tests the cones overlapping the
+    band of the query center.
+    """
+
+    def __init__(self, prefetch_radius=None, max_regions=1000):
+        self.prefetch_radius = prefetch_radius
+        self.max_regions = max_regions
+        self._regions = OrderedDict()
+        # catalog -> declination band -> {key: region}
+        self._index = {}
+        self._lock = threading.Lock()
+        self._stats = CacheStats(("hits", "misses", "evictions"))
+
+    @property
+    def stats(self):
+        """Counters of the queries answered from recorded cones (``hits``)
+        or not (``misses``), of the cones dropped (``evictions``) and the
+        ``hit_ratio``. The same counters of each catalog are under
+        ``routes``."""
+        return self._stats.snapshot()
+
+    def reset_stats(self):
+        self._stats.reset()
+
+    def fetch_radius(self, radius):
+        """Radius in arcsec to fetch for a query of ``radius`` that misses"""
+        return max(radius, self.prefetch_radius or 0)
+
+    def add(self, catalog, ra, dec, radius, response):
+        """Records the conesearch ``response`` of ``catalog`` ("all" for
+        every catalog) around ``ra``, ``dec`` (degrees) with ``radius``
+        (arcsec)"""
+        wrapped = isinstance(response, dict) and "catalogs" in response
+        if wrapped:
+            catalogs = [item for r in response["catalogs"] for item in r.items()]
+        else:
+            catalogs = list(response.items())
+        region = _Region(float(ra), float(dec), float(radius), catalogs, wrapped)
+        key = (catalog, region.ra, region.dec, region.radius)
+        with self._lock:
+            if key in self._regions:
+                self._unindex(key, self._regions.pop(key))
+            self._regions[key] = region
+            index = self._index.setdefault(catalog, {})
+            for band in region.bands():
+                index.setdefault(band, {})[key] = region
+            while len(self._regions) > self.max_regions:
+                self._unindex(*self._regions.popitem(last=False))
+                self._stats.count("evictions")
+
+    def _unindex(self, key, region):
+        index = self._index[key[0]]
+        for band in region.bands():
+            del index[band][key]
+            if not index[band]:
+                del index[band]
+        if not index:
+            del self._index[key[0]]
+
+    def _find(self, catalog, ra, dec, radius):
+        band = math.floor(dec / DEC_BAND)
+        with self._lock:
+            candidates = list(self._index.get(catalog, {}).get(band, {}).items())
+        for key, region in reversed(candidates):
+            if region.contains(ra, dec, radius):
+                with self._lock:
+                    if key in self._regions:
+                        self._regions.move_to_end(key)
+                return region
+        return None
+
+    def _matches(self, region, ra, dec, radius):
+        """Rows within ``radius`` of each catalog of ``region``
+
+        :returns: list of (name, catalog response, row indices, distances),
+            or None if a catalog has no coordinates to filter on
+        """
+        matches = []
+        for name, data in region.catalogs:
+            if not data:
+                matches.append((name, data, np.array([], dtype=int), None))
+                continue
+            coordinates = _coordinates(data)
+            if coordinates is None:
+                return None
+            distance = angular_distance(ra, dec, *coordinates)
+            matches.append((name, data, np.flatnonzero(distance <= radius), distance))
+        return matches
+
+    def _lookup(self, catalog, ra, dec, radius):
+        """Recorded cone containing a query and the matches of the query in
+        it, see :meth:`_matches`, or None"""
+        region = self._find(catalog, ra, dec, radius)
+        if region is not None:
+            matches = self._matches(region, ra, dec, radius)
+            if matches is not None:
+                self._stats.count("hits", catalog)
+                return region, matches
+        self._stats.count("misses", catalog)
+        return None
+
+    def conesearch(self, catalog, ra, dec, radius):
+        """Conesearch response answered from a recorded cone, or None if no
+        recorded cone contains the query"""
+        ra, dec, radius = float(ra), float(dec), float(radius)
+        found = self._lookup(catalog, ra, dec, radius)
+        if found is None:
+            return None
+        region, matches = found
+        catalogs = []
+        for name, data, rows, _ in matches:
+            if len(rows) == 0:
+                catalogs.append((name, {}))
+                continue
+            filtered = {}
+            for field, column in data.items():
+                if "values" in column:
+                    column = dict(column)
+                    column["values"] = [column["values"][i] for i in rows]
+                filtered[field] = column
+            catalogs.append((name, filtered))
+        if region.wrapped:
+            return {"catalogs": [{name: data} for name, data in catalogs]}
+        return {name: data for name, data in catalogs if data}
+
+    def crossmatch(self, catalog, ra, dec, radius):
+        """Crossmatch response (the nearest row of each catalog) answered from
+        a recorded cone, or None if no recorded cone contains the query. A
+        single catalog without rows in range is answered ``{}``, like the
+        server does."""
+        ra, dec, radius = float(ra), float(dec), float(radius)
+        found = self._lookup(catalog, ra, dec, radius)
+        if found is None:
+            return None
+        _, matches = found
+        nearest = []
+        for name, data, rows, distance in matches:
+            if len(rows) == 0:
+                continue
+            row = rows[np.argmin(distance[rows])]
+            nearest.append(
+                (
+                    name,
+                    {
+                        field: {
+                            "unit": column.get("units", column.get("unit")),
+                            "value": (
+                                column["values"][row]
+                                if "values" in column
+                                else column.get("value")
+                            ),
+                        }
+                        for field, column in data.items()
+                    },
+                )
+            )
+        if catalog == "all":
+            return [{name: match} for name, match in nearest]
+        if not nearest:
+            return {}
+        return nearest[0][1]
+
+    def clear(self):
+        with self._lock:
+            self._regions.clear()
+            self._index.clear()
+
+    def __len__(self):
+        return len(self._regions)
@@ -1,6 +1,7 @@
 from .common_search import AlerceCommonSearch
 from .crossmatch import AlerceXmatch
 from .common_stamps import AlerceCommonStamps
+from .transport import Transport
 
 
 class Alerce(AlerceCommonSearch, AlerceXmatch, AlerceCommonStamps):
@@ -39,6 +40,11 @@ class Alerce(AlerceCommonSearch, AlerceXmatch, AlerceCommonStamps):
     ...     survey="ztf"
     ... )
 
+    Share a tuned connection pool between all sub-clients:
+
+    >>> from alerce.transport import Transport
+    >>> client = Alerce(transport=Transport(pool_maxsize=32, pool_block=True))
+
     Notes
     -----
     Most methods require a ``survey`` parameter to specify which survey's data
@@ -47,12 +53,19 @@ class Alerce(AlerceCommonSearch, AlerceXmatch, AlerceCommonStamps):
     is deprecated and will be removed in future versions. Always explicitly
     specify the survey parameter.
 
+    All sub-clients (search, crossmatch and stamps) send their requests
+    through a single :class:`alerce.transport.Transport`, which is exposed as
+    the ``transport`` attribute. When no transport is given, one is created
+    from the ``transport`` section of the config file.
+
     See Also
     --------
     migration_guide : Guide for migrating to the multi-survey API
     """
 
-    def __init__(self, **kwargs):
-        AlerceCommonSearch.__init__(self, **kwargs)
-        AlerceXmatch.__init__(self, **kwargs)
-        AlerceCommonStamps.__init__(self, **kwargs)
+    def __init__(self, transport=None, **kwargs):
+        if transport is None:
+            transport = Transport.from_config()
+        AlerceCommonSearch.__init__(self, transport=transport, **kwargs)
+        AlerceXmatch.__init__(self, transport=transport, **kwargs)
+        AlerceCommonStamps.__init__(self, transport=transport, **kwargs)
@@ -1,9 +1,16 @@
-import requests
-
 from astropy.table import Table, Column
 
-from .utils import Client
-from .exceptions import handle_error
+from .utils import Client, _require_polars, _require_pyarrow
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+try:
+    import polars
+except ImportError:  # pragma: no cover
+    polars = None
 
 
 class AlerceXmatch(Client):
@@ -15,8 +22,7 @@ class AlerceXmatch(Client):
         "SDSS/DR10": "SDSSDR10",
     }
 
-    def __init__(self, **kwargs):
-        self.session = requests.Session()
+    def __init__(self, transport=None, **kwargs):
         default_config = {
             "CATSHTM_API_URL": "https://catshtm.alerce.online",
             "CATSHTM_ROUTES": {
@@ -27,15 +33,45 @@ class AlerceXmatch(Client):
             },
         }
         default_config.update(kwargs)
-        super().__init__(**default_config)
+        super().__init__(transport=transport, **default_config)
 
-    def _request_catshtm(self, method, url, params=None, result_format="json"):
+    def _request_catshtm(
+        self, method, url, params=None, result_format="json", route=None
+    ):
         result_format = self._validate_format(result_format)
-        resp = self.session.request(method, url, params=params)
-        if resp.status_code >= 400:
-            handle_error(resp)
+        return self._fetch(method, url, params=params, route=route)
+
+    @staticmethod
+    def _arrow_catalog(catalog_name, catalog_data):
+        """Arrow table of a catalog response, built from its columns, with
+        the unit of each column in the field metadata"""
+        _require_pyarrow()
+        arrays = []
+        fields = []
+        for field, column in catalog_data.items():
+            data = column["values"] if "values" in column else [column["value"]]
+            unit = column["units"] if "units" in column else column.get("unit")
+            array = pyarrow.array(data)
+            metadata = {"unit": str(unit)} if unit else None
+            arrays.append(array)
+            fields.append(pyarrow.field(field, array.type, metadata=metadata))
+        n_rows = len(arrays[0]) if arrays else 0
+        arrays.append(pyarrow.array(["catsHTM_%s" % catalog_name] * n_rows))
+        fields.append(pyarrow.field("cat_name", pyarrow.string()))
+        return pyarrow.Table.from_arrays(arrays, schema=pyarrow.schema(fields))
 
-        return resp.json()
+    @staticmethod
+    def _polars_catalog(catalog_name, catalog_data):
+        """polars frame of a catalog response, built from its columns. The
+        units are dropped, polars columns having no metadata"""
+        _require_polars()
+        columns = {
+            field: column["values"] if "values" in column else [column["value"]]
+            for field, column in catalog_data.items()
+        }
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        columns["cat_name"] = ["catsHTM_%s" % catalog_name] * n_rows
+        return polars.DataFrame(columns)
 
     def _format_all(self, catalog_list, result_format="json"):
         votables = {}
@@ -43,6 +79,12 @@ class AlerceXmatch(Client):
             key = list(r.keys())[0]
             if r[key] == {}:
                 continue
+            if result_format == "arrow":
+                votables[key] = self._arrow_catalog(key, r[key])
+                continue
+            if result_format == "polars":
+                votables[key] = self._polars_catalog(key, r[key])
+                continue
             t = Table()
             for field in r[key].keys():
                 data = (
@@ -68,6 +110,10 @@ class AlerceXmatch(Client):
     def _format_one(self, catalog, result_format="json"):
         catalog_name = list(catalog.keys())[0]
         catalog_data = catalog[catalog_name]
+        if result_format == "arrow":
+            return self._arrow_catalog(catalog_name, catalog_data)
+        if result_format == "polars":
+            return self._polars_catalog(catalog_name, catalog_data)
         t = Table()
         for field in catalog_data.keys():
             data = (
@@ -89,6 +135,33 @@ class AlerceXmatch(Client):
                 t.name = "catsHTM_%s" % catalog_name
         return t
 
+    def _catshtm_cone(self, params, ra, dec, radius, format):
+        """Conesearch response of ``params``, answered from the cone cache of
+        the transport when a recorded cone contains it"""
+        cache = self.transport.cone_cache
+        catalog = params["catalog"]
+        route = "conesearch_all" if catalog == "all" else "conesearch"
+        if cache is not None:
+            q = cache.conesearch(catalog, ra, dec, radius)
+            if q is not None:
+                return q
+            fetch_radius = cache.fetch_radius(radius)
+            params = dict(params, radius="%f" % fetch_radius)
+        q = self._request_catshtm(
+            "GET",
+            url=self.config["CATSHTM_API_URL"] + self.config["CATSHTM_ROUTES"][route],
+            result_format=format,
+            params=params,
+            route=route,
+        )
+        if cache is not None:
+            cache.add(catalog, ra, dec, fetch_radius, q)
+            # filtered down to the query when the cone was widened
+            filtered = cache.conesearch(catalog, ra, dec, radius)
+            if filtered is not None:
+                q = filtered
+        return q
+
     def catshtm_catalog_translator(self, catalog):
         return self.CATALOG_TRANSLATE.get(catalog, catalog)
 
@@ -108,11 +181,12 @@ class AlerceXmatch(Client):
         radius : float
             Conesearch radius in arcsec.
         format : str
-            Output format: "votable" or "pandas".
+            Output format: "votable", "pandas", "arrow" or "polars".
 
         Returns
         -------
-        dict or astropy.table.Table or pandas.DataFrame or None
+        dict or astropy.table.Table or pandas.DataFrame or pyarrow.Table or
+            polars.DataFrame or None
             If `catalog_name` is "all", returns a dictionary mapping catalog
             name to an astropy Table or pandas DataFrame. If a single catalog
             is requested, returns the Table/DataFrame for that catalog. Returns
@@ -124,23 +198,10 @@ class AlerceXmatch(Client):
             "dec": dec,
             "radius": "%f" % radius,
         }
+        q = self._catshtm_cone(params, ra, dec, radius, format)
         if params["catalog"] == "all":
-            q = self._request_catshtm(
-                "GET",
-                url=self.config["CATSHTM_API_URL"]
-                + self.config["CATSHTM_ROUTES"]["conesearch_all"],
-                result_format=format,
-                params=params,
-            )
             q = self._format_all(q["catalogs"], result_format=format)
         else:
-            q = self._request_catshtm(
-                "GET",
-                url=self.config["CATSHTM_API_URL"]
-                + self.config["CATSHTM_ROUTES"]["conesearch"],
-                result_format=format,
-                params=params,
-            )
             if isinstance(q, dict) and len(q) == 0:
                 return None
             q = self._format_one(q, result_format=format)
@@ -162,7 +223,7 @@ class AlerceXmatch(Client):
         radius : float
             Crossmatch radius in arcsec.
         format : str
-            Output format: "votable" or "pandas".
+            Output format: "votable", "pandas", "arrow" or "polars".
 
         Returns
         -------
@@ -177,23 +238,26 @@ class AlerceXmatch(Client):
             "dec": "%f" % dec,
             "radius": "%f" % radius,
         }
-        if catalog_name == "all":
+        cache = self.transport.cone_cache
+        q = None
+        if cache is not None:
+            q = cache.crossmatch(params["catalog"], ra, dec, radius)
+            if q is None and cache.prefetch_radius:
+                self._catshtm_cone(params, ra, dec, radius, format)
+                q = cache.crossmatch(params["catalog"], ra, dec, radius)
+        if q is None:
+            route = "crossmatch_all" if catalog_name == "all" else "crossmatch"
             q = self._request_catshtm(
                 "GET",
                 url=self.config["CATSHTM_API_URL"]
-                + self.config["CATSHTM_ROUTES"]["crossmatch_all"],
+                + self.config["CATSHTM_ROUTES"][route],
                 result_format=format,
                 params=params,
+                route=route,
             )
+        if catalog_name == "all":
             q = self._format_all(q, result_format=format)
         else:
-            q = self._request_catshtm(
-                "GET",
-                url=self.config["CATSHTM_API_URL"]
-                + self.config["CATSHTM_ROUTES"]["crossmatch"],
-                result_format=format,
-                params=params,
-            )
             q = self._format_one({catalog_name: q}, result_format=format)
 
         return q
@@ -1,6 +1,3 @@
-import requests
-
-
 def handle_error(response, response_format="json"):
     # TODO: The direct API uses code 400 for user input error (bad requests, etc), what should be done here then?
     codes = {-1: APIError, 400: ParseError, 404: ObjectNotFoundError}
@@ -10,7 +7,8 @@ def handle_error(response, response_format="json"):
         try:
             error = response.json().get("errors", {})
             message = response.json().get("detail")
-        except requests.exceptions.JSONDecodeError:
+        except ValueError:
+            # requests and other HTTP clients raise ValueError subclasses
             pass
     elif response_format == "csv":
         error = response.content.decode("utf-8")
@@ -63,3 +61,9 @@ class FormatValidationError(ParseError):
 class ObjectNotFoundError(APIError):
     ## TODO add logic for including oid in error message
     pass
+
+
+class StaleResultWarning(UserWarning):
+    """A cached result was returned because the API failed to answer"""
+
+    pass
@@ -0,0 +1,63 @@
+from collections import deque
+import threading
+
+
+class HedgePolicy:
+    """
+    Policy to hedge slow GET requests.
+
+    When a request to a host has not answered after the ``percentile`` of the
+    latencies recently observed for that host, a duplicate request is sent and
+    the first response wins. Duplicates are limited to ``budget`` times the
+    number of requests, so hedging never adds more than that fraction of load.
+
+    Parameters
+    ----------
+    percentile : float
+        Percentile (0-100) of the recent latencies after which a request is
+        hedged.
+    budget : float
+        Maximum fraction of extra requests sent as duplicates.
+    min_samples : int
+        Number of latencies of a host to observe before hedging its requests.
+    window : int
+        Number of recent latencies kept per host.
+    """
+
+    def __init__(self, percentile=95, budget=0.05, min_samples=20, window=500):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self.requests = 0
+        self.hedged = 0
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def delay(self, host):
+        """Seconds to wait for a request to ``host`` before hedging it, or
+        None if there are not enough latencies observed yet"""
+        with self._lock:
+            self.requests += 1
+            latencies = self._latencies.get(host)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    def record(self, host, latency):
+        """Adds the latency of a finished request to ``host``"""
+        with self._lock:
+            if host not in self._latencies:
+                self._latencies[host] = deque(maxlen=self.window)
+            self._latencies[host].append(latency)
+
+    def acquire(self):
+        """Takes budget for one duplicate request, returns False if the budget
+        is spent"""
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.requests:
+                return False
+            self.hedged += 1
+            return True
@@ -0,0 +1,71 @@
+import json
+import warnings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:  # pragma: no cover
+    simdjson = None
+
+
+def _available():
+    decoders = {}
+    if orjson is not None:
+        decoders["orjson"] = orjson.loads
+    if simdjson is not None:
+        decoders["simdjson"] = simdjson.loads
+    decoders["json"] = json.loads
+    return decoders
+
+
+#: Decoders installed, fastest first
+DECODERS = _available()
+
+
+def _with_fallback(loads):
+    def decode(body):
+        try:
+            return loads(body)
+        except ValueError:
+            # NaN and Infinity are accepted by the standard library only
+            return json.loads(body)
+
+    return decode
+
+
+def get_decoder(name="auto"):
+    """
+    Function decoding a JSON response body, given as bytes or str.
+
+    Parameters
+    ----------
+    name : str
+        'orjson', 'simdjson' or 'json' (the standard library), or 'auto' for
+        the fastest one installed. A decoder that is not installed falls back
+        to the standard library with a warning.
+
+    Returns
+    -------
+    A function of the body. Bodies the fast decoders reject, like those with
+    NaN values, are decoded by the standard library. Note that orjson
+    decodes integers wider than 64 bits as floats.
+    """
+    if name == "auto":
+        name = next(iter(DECODERS))
+    elif name not in ("orjson", "simdjson", "json"):
+        raise ValueError(
+            "json decoder must be one of 'auto', 'orjson', 'simdjson' or 'json'"
+        )
+    elif name not in DECODERS:
+        warnings.warn(
+            "%s is not installed, the standard json module is used instead" % name,
+            RuntimeWarning,
+        )
+        name = "json"
+    if name == "json":
+        return json.loads
+    return _with_fallback(DECODERS[name])
@@ -0,0 +1,153 @@
+import json
+import os
+import tempfile
+import threading
+
+from .utils import ResultJson, copy_json
+
+
+def _point_key(record):
+    """Identifies a lightcurve point, so points downloaded twice are merged"""
+    for field in ("candid", "measurement_id"):
+        if record.get(field) is not None:
+            return field, str(record[field])
+    return (
+        "epoch",
+        record.get("mjd"),
+        record.get("fid", record.get("band")),
+        record.get("band_name"),
+    )
+
+
+class LightcurveStore:
+    """
+    Local lightcurves of a watch list, with the last detection seen of each
+    object as its watermark.
+
+    Each object is stored as its lightcurve components (``detections``,
+    ``non_detections``, ...), as returned by ``query_lightcurve`` in json
+    format. See :meth:`alerce.bulk_search.AlerceBulkSearch.sync_lightcurves`
+    to keep it up to date.
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory where each object is saved as a JSON file, so the store
+        outlives the process. Objects are kept in memory only if not given.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def _file(self, survey, oid):
+        return os.path.join(self.path, survey, "%s.json" % oid)
+
+    def _load(self, survey, oid):
+        key = (survey, str(oid))
+        with self._lock:
+            if key in self._objects:
+                return self._objects[key]
+        record = None
+        if self.path is not None:
+            try:
+                with open(self._file(survey, oid)) as f:
+                    record = json.load(f)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            return self._objects.setdefault(key, record)
+
+    def _save(self, survey, oid, record):
+        with self._lock:
+            self._objects[(survey, str(oid))] = record
+        if self.path is None:
+            return
+        directory = os.path.join(self.path, survey)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp, self._file(survey, oid))
+
+    def watermark(self, survey, oid):
+        """(mjd, candid) of the last detection stored for an object, or
+        (None, None) if it has none"""
+        record = self._load(survey, oid)
+        if record is None:
+            return None, None
+        return record["last_mjd"], record["last_candid"]
+
+    def needs_update(self, survey, oid, last_mjd):
+        """Whether an object whose last detection is at ``last_mjd`` (None if
+        unknown) has points that are not stored yet"""
+        stored_mjd, _ = self.watermark(survey, oid)
+        if stored_mjd is None or last_mjd is None:
+            return True
+        return last_mjd > stored_mjd
+
+    def merge(self, survey, oid, lightcurve):
+        """Adds the points of ``lightcurve`` that are not stored yet.
+
+        :lightcurve: lightcurve components of the object, as returned by
+            ``query_lightcurve(format="json")``
+        :returns: the number of points added
+        """
+        record = copy_json(self._load(survey, oid)) or {
+            "components": {},
+            "last_mjd": None,
+            "last_candid": None,
+        }
+        added = 0
+        for component, points in lightcurve.items():
+            if not isinstance(points, list):
+                continue
+            stored = record["components"].setdefault(component, [])
+            seen = {_point_key(point) for point in stored}
+            for point in points:
+                key = _point_key(point)
+                if key not in seen:
+                    seen.add(key)
+                    stored.append(point)
+                    added += 1
+        detections = record["components"].get("detections", [])
+        dated = [p for p in detections if p.get("mjd") is not None]
+        if dated:
+            last = max(dated, key=lambda p: p["mjd"])
+            record["last_mjd"] = last["mjd"]
+            record["last_candid"] = last.get("candid", last.get("measurement_id"))
+        if added:
+            self._save(survey, oid, record)
+        return added
+
+    def lightcurve(self, survey, oid, format="json"):
+        """Stored lightcurve of an object, as a dictionary of components in
+        the given format, or None if the object is not stored"""
+        record = self._load(survey, oid)
+        if record is None:
+            return None
+        return {
+            component: ResultJson(copy_json(points), format=format).result()
+            for component, points in record["components"].items()
+        }
+
+    def oids(self, survey):
+        """Objects of ``survey`` in the store"""
+        with self._lock:
+            oids = {
+                oid
+                for (s, oid), record in self._objects.items()
+                if s == survey and record is not None
+            }
+        if self.path is not None and os.path.isdir(os.path.join(self.path, survey)):
+            oids.update(
+                name[: -len(".json")]
+                for name in os.listdir(os.path.join(self.path, survey))
+                if name.endswith(".json")
+            )
+        return sorted(oids)
+
+    def __contains__(self, item):
+        survey, oid = item
+        return self._load(survey, oid) is not None
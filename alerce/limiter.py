@@ -0,0 +1,134 @@
+import threading
+import time
+
+
+class _HostLimit:
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.latency = None
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+
+class AdaptiveLimiter:
+    """
+    Per-host concurrency limiter that adapts with AIMD (additive increase,
+    multiplicative decrease).
+
+    Every request to a host takes a slot before being sent. The number of
+    slots of each host grows by about ``increase`` every time a full window of
+    requests completes with a stable latency, and is multiplied by
+    ``decrease`` when a request is throttled (429), fails on the server side
+    (5xx), fails to connect, or takes more than ``latency_tolerance`` times
+    the usual latency of the host. The limit then settles close to the number
+    of concurrent requests the server can actually handle.
+
+    Parameters
+    ----------
+    initial_limit : int
+        Number of concurrent requests allowed to a host before any feedback.
+    min_limit : int
+        Lowest number of concurrent requests allowed to a host.
+    max_limit : int
+        Highest number of concurrent requests allowed to a host.
+    increase : float
+        Slots added after each window of ``limit`` successful requests.
+    decrease : float
+        Factor applied to the limit when the host shows overload.
+    latency_tolerance : float
+        A latency above this multiple of the average latency of the host is
+        considered overload.
+    smoothing : float
+        Weight of each new latency in the exponential average of a host.
+    """
+
+    def __init__(
+        self,
+        initial_limit=8,
+        min_limit=1,
+        max_limit=64,
+        increase=1.0,
+        decrease=0.5,
+        latency_tolerance=2.0,
+        smoothing=0.1,
+    ):
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = _HostLimit(self.initial_limit)
+            return self._hosts[host]
+
+    def acquire(self, host):
+        """Waits until a request to ``host`` can be sent and takes its slot"""
+        state = self._host(host)
+        with state.condition:
+            while state.in_flight >= max(int(state.limit), self.min_limit):
+                state.condition.wait()
+            state.in_flight += 1
+
+    def release(self, host, latency, status_code):
+        """Frees the slot of a finished request and adapts the host limit.
+
+        Parameters
+        ----------
+        host : str
+            Host the request was sent to.
+        latency : float
+            Time in seconds the request took.
+        status_code : int
+            Status code of the response, 0 if the request failed without a
+            response.
+        """
+        state = self._host(host)
+        with state.condition:
+            state.in_flight -= 1
+            overloaded = (
+                status_code == 0
+                or status_code == 429
+                or status_code >= 500
+                or (
+                    state.latency is not None
+                    and latency > state.latency * self.latency_tolerance
+                )
+            )
+            now = time.monotonic()
+            if overloaded:
+                # decrease at most once per round trip, requests already in
+                # flight report the same overload
+                if now - state.last_decrease >= (state.latency or latency):
+                    state.limit = max(self.min_limit, state.limit * self.decrease)
+                    state.last_decrease = now
+            else:
+                state.limit = min(
+                    self.max_limit, state.limit + self.increase / state.limit
+                )
+            if 0 < status_code < 500 and status_code != 429:
+                if state.latency is None:
+                    state.latency = latency
+                else:
+                    state.latency += self.smoothing * (latency - state.latency)
+            state.condition.notify_all()
+
+    def limits(self):
+        """Current limit, requests in flight and average latency of each host"""
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {
+            host: {
+                "limit": int(state.limit),
+                "in_flight": state.in_flight,
+                "latency": state.latency,
+            }
+            for host, state in hosts.items()
+        }
@@ -0,0 +1,117 @@
+import threading
+
+from .cache import CacheStats
+from .utils import copy_json
+
+
+class MetadataCache:
+    """
+    Process-wide memo of catalog metadata that does not change between
+    requests, like the classifiers and their classes.
+
+    Entries are shared by every client of the process and are only dropped
+    with :meth:`invalidate` or :meth:`clear`.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+
+    @property
+    def stats(self):
+        """Counters of the lookups answered from the memo (``hits``) or
+        loaded (``misses``), and the ``hit_ratio``"""
+        return self._stats.snapshot()
+
+    def reset_stats(self):
+        self._stats.reset()
+
+    def get(self, key, loader, copy=True):
+        """Returns the value memoized for ``key``, calling ``loader()`` to
+        obtain it the first time.
+
+        :copy: if True, a copy of the decoded JSON value is returned, so
+            callers can modify it
+        """
+        with self._lock:
+            found = key in self._entries
+            value = self._entries.get(key)
+        self._stats.count("hits" if found else "misses")
+        if not found:
+            value = loader()
+            with self._lock:
+                value = self._entries.setdefault(key, value)
+        return copy_json(value) if copy else value
+
+    def invalidate(self, prefix=""):
+        """Drops the entries whose key starts with ``prefix``, all of them by
+        default"""
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+#: Metadata memo shared by every client of the process
+metadata_cache = MetadataCache()
+
+
+class Taxonomy:
+    """
+    Index of the classes of each classifier, and of the classifiers of each
+    class.
+
+    Parameters
+    ----------
+    classifiers : list of dict
+        Classifiers as returned by ``query_classifiers(format="json")``, with
+        ``classifier_name``, ``classifier_version`` and ``classes`` keys.
+    """
+
+    def __init__(self, classifiers):
+        self._classes = {}
+        self._latest = {}
+        self._classifiers = {}
+        for classifier in classifiers:
+            name = classifier["classifier_name"]
+            version = classifier["classifier_version"]
+            classes = tuple(classifier.get("classes") or ())
+            self._classes[(name, version)] = classes
+            self._latest.setdefault(name, version)
+            for class_name in classes:
+                self._classifiers.setdefault(class_name, []).append((name, version))
+
+    def classes(self, classifier_name, classifier_version=None):
+        """Classes of a classifier. If ``classifier_version`` is not given,
+        the first version listed by the API is used.
+
+        :returns: tuple of class names, empty if the classifier is unknown
+        """
+        if classifier_version is None:
+            classifier_version = self._latest.get(classifier_name)
+        return self._classes.get((classifier_name, classifier_version), ())
+
+    def classifiers(self, class_name=None):
+        """(name, version) pairs of the classifiers that predict
+        ``class_name``, or of every classifier if not given"""
+        if class_name is None:
+            return list(self._classes)
+        return list(self._classifiers.get(class_name, ()))
+
+    def has_class(self, class_name, classifier_name=None, classifier_version=None):
+        if classifier_name is None:
+            return class_name in self._classifiers
+        return class_name in self.classes(classifier_name, classifier_version)
+
+    def __contains__(self, class_name):
+        return class_name in self._classifiers
@@ -7,10 +7,30 @@ VALID_SURVEYS = ["lsst", "ztf"]
 
 
 class AlerceSearchMultiSurvey(Client):
-    def __init__(self):
+    VALID_OBJECT_PARAMS = [
+        "oid",
+        "survey",
+        "classifier",
+        "class_name",
+        "ranking",
+        "n_det",
+        "probability",
+        "firstmjd",
+        "lastmjd",
+        "ra",
+        "dec",
+        "radius",
+        "page",
+        "page_size",
+        "count",
+        "order_by",
+        "order_mode",
+    ]
+
+    def __init__(self, transport=None):
 
         cfg = load_config(service="multisurvey")
-        super().__init__(**cfg)
+        super().__init__(transport=transport, **cfg)
 
         self.url_ms = self.config["URL_MS"]
         self.routes_ms = self.config["ROUTES_MS"]
@@ -18,7 +38,8 @@ class AlerceSearchMultiSurvey(Client):
     def _get_survey_url(self, resource):
         return self.url_ms + self.routes_ms[resource]
 
-    def _check_survey_validity(self, survey):
+    @staticmethod
+    def _check_survey_validity(survey):
         if survey == "ztf":
             warnings.warn(
                 "ZTF is not yet supported in the multisurvey API.", UserWarning
@@ -32,30 +53,11 @@ class AlerceSearchMultiSurvey(Client):
     def query_objects(
         self, survey: str, format: str = "json", index=None, sort=None, **kwargs
     ):
-        valid_params = [
-            "oid",
-            "survey",
-            "classifier",
-            "class_name",
-            "ranking",
-            "n_det",
-            "probability",
-            "firstmjd",
-            "lastmjd",
-            "ra",
-            "dec",
-            "radius",
-            "page",
-            "page_size",
-            "count",
-            "order_by",
-            "order_mode",
-        ]
         self._check_survey_validity(survey)
         params = {"survey": survey}
         params.update(kwargs)
         for key in params.keys():
-            if key not in valid_params:
+            if key not in self.VALID_OBJECT_PARAMS:
                 raise ValueError(f"Invalid parameter: {key}")
         q = self._request(
             "GET",
@@ -63,10 +65,28 @@ class AlerceSearchMultiSurvey(Client):
             params=params,
             result_format=format,
             response_field=None,
+            route="objects",
         )
         q.json_result = q.json_result["items"]
         return q.result(index, sort)
 
+    def count_objects(self, survey: str, **kwargs):
+        self._check_survey_validity(survey)
+        params = {"survey": survey}
+        params.update(kwargs)
+        for key in params.keys():
+            if key not in self.VALID_OBJECT_PARAMS:
+                raise ValueError(f"Invalid parameter: {key}")
+        params.update(count=True, page=1, page_size=1)
+        q = self._request(
+            "GET",
+            url=self._get_survey_url("objects"),
+            params=params,
+            response_field=None,
+            route="objects",
+        )
+        return q.json_result.get("total")
+
     def query_object(self, survey: str, oid, format: str = "json", **kwargs):
         self._check_survey_validity(survey)
         params = {"survey_id": survey, "oid": oid}
@@ -77,6 +97,7 @@ class AlerceSearchMultiSurvey(Client):
             params=params,
             result_format=format,
             response_field=None,
+            route="single_object",
         )
         return q.result()
 
@@ -89,9 +110,11 @@ class AlerceSearchMultiSurvey(Client):
             params=params,
             result_format=format,
             response_field=None,
+            route="lightcurve",
         )
-        for key in q.json_result.keys():
-            self.add_band_name(q.json_result[key])
+        q.json_result = {
+            key: self.add_band_name(value) for key, value in q.json_result.items()
+        }
         return q.result()
 
     def query_detections(
@@ -112,8 +135,9 @@ class AlerceSearchMultiSurvey(Client):
             params=params,
             result_format=format,
             response_field=None,
+            route="detections",
         )
-        self.add_band_name(q.json_result)
+        q.json_result = self.add_band_name(q.json_result)
         return q.result(index, sort)
 
     def query_non_detections(
@@ -128,8 +152,9 @@ class AlerceSearchMultiSurvey(Client):
             params=params,
             result_format=format,
             response_field=None,
+            route="non_detections",
         )
-        self.add_band_name(q.json_result)
+        q.json_result = self.add_band_name(q.json_result)
         return q.result(index, sort)
 
     def query_forced_photometry(
@@ -144,8 +169,9 @@ class AlerceSearchMultiSurvey(Client):
             params=params,
             result_format=format,
             response_field=None,
+            route="forced_photometry",
         )
-        self.add_band_name(q.json_result)
+        q.json_result = self.add_band_name(q.json_result)
         return q.result(index, sort)
 
     def query_probabilities(
@@ -162,6 +188,7 @@ class AlerceSearchMultiSurvey(Client):
             params=params,
             result_format=format,
             response_field=None,
+            route="probabilities",
         )
 
         return q.result(index, sort)
@@ -192,12 +219,20 @@ class AlerceSearchMultiSurvey(Client):
     ):
         raise NotImplementedError("Multisurvey query_classes not implemented.")
 
-    def add_band_name(self, messages):
+    @staticmethod
+    def add_band_name(messages):
+        """Copies of ``messages`` with their ``band_map`` replaced by the
+        ``band_name`` of their band. The messages themselves are left as
+        they are, they may be shared with the response cache."""
+        named = []
         for message in messages:
-            message["band_name"] = self.num_to_band(
+            copy = {key: value for key, value in message.items() if key != "band_map"}
+            copy["band_name"] = AlerceSearchMultiSurvey.num_to_band(
                 message["band_map"], message["band"]
             )
-            del message["band_map"]
+            named.append(copy)
+        return named
 
-    def num_to_band(self, band_map, band):
+    @staticmethod
+    def num_to_band(band_map, band):
         return band_map[str(band)]
@@ -5,8 +5,9 @@ from .utils import Client, load_config
 from astropy.io.fits import open as fits_open
 from urllib.error import HTTPError
 from alerce.ms_search import AlerceSearchMultiSurvey
-from alerce.exceptions import CandidError
+from alerce.exceptions import CandidError, ObjectNotFoundError
 from .ms_stamp_utils import create_stamp_parameters
+from .store import BlobStore
 import matplotlib.pyplot as plt
 from PIL import Image
 
@@ -14,7 +15,7 @@ VALID_SURVEYS = ["lsst", "ztf"]
 
 
 class AlerceStampsMultisurvey(Client):
-    def __init__(self):
+    def __init__(self, transport=None):
         # load stamps-specific config and pass to Client
         cfg = load_config(service="stamps")
 
@@ -24,10 +25,10 @@ class AlerceStampsMultisurvey(Client):
             "difference": "cutoutDifference",
         }
 
-        super().__init__(**cfg)
+        super().__init__(transport=transport, **cfg)
 
         # create a search client per instance so it can receive different configs if needed
-        self.search_client = AlerceSearchMultiSurvey()
+        self.search_client = AlerceSearchMultiSurvey(transport=self.transport)
 
     def _in_ipynb(self):
         try:
@@ -109,8 +110,18 @@ class AlerceStampsMultisurvey(Client):
                 avro_url,
                 "plot",
             )
-            http_response = self.session.request("GET", url)
-            data = http_response.content
+            data = self._fetch_stored(
+                self.transport.stamp_store,
+                BlobStore.make_key(
+                    survey,
+                    oid,
+                    measurement_id,
+                    self.ztf_types[image_type.lower()],
+                    "png",
+                ),
+                url,
+                route="stamps",
+            )
 
             ax[i].imshow(Image.open(io.BytesIO(data)))
             ax[i].set_title(image_type, fontsize=10)
@@ -149,10 +160,15 @@ class AlerceStampsMultisurvey(Client):
                 url = create_stamp_parameters(
                     oid, survey, measurement_id, stamp_type, avro_url, "get"
                 )
-                http_response = self.session.request("GET", url)
+                content = self._fetch_stored(
+                    self.transport.stamp_store,
+                    BlobStore.make_key(survey, oid, measurement_id, stamp_type, "fits"),
+                    url,
+                    route="stamps",
+                )
 
                 if survey == "ztf" or survey == "lsst":
-                    fits_buffer = gzip.open(io.BytesIO(http_response.content))
+                    fits_buffer = gzip.open(io.BytesIO(content))
                 else:
                     raise Exception(f"survey {survey} not valid")
 
@@ -173,7 +189,7 @@ class AlerceStampsMultisurvey(Client):
             elif out_format == "numpy":
                 return [stamp.data.copy() for stamp in stamp_list]
 
-        except HTTPError:
+        except (HTTPError, ObjectNotFoundError):
             warnings.warn("AVRO File not found.", RuntimeWarning)
             return None
 
@@ -193,9 +209,32 @@ class AlerceStampsMultisurvey(Client):
 
         try:
             url = self.config["STAMP_URL"] + self.config["AVRO_ROUTES"]["get_avro"]
-            params = {"oid": kwargs.get("oid"), "measurement_id": measurement_id}
-            http_response = self.session.request("GET", url, params=params)
-            return http_response.content
-        except HTTPError:
+            params = {"oid": oid, "measurement_id": measurement_id}
+            return self._fetch_stored(
+                self.transport.avro_store,
+                BlobStore.make_key(survey, oid, measurement_id),
+                url,
+                params=params,
+                route="avro",
+            )
+        except (HTTPError, ObjectNotFoundError):
             warnings.warn("AVRO File not found.", RuntimeWarning)
             return None
+
+    def multisurvey_get_avros(self, survey, pairs, max_workers=8):
+        """Download the avros of many alerts given survey and (oid, measurement_id) pairs.
+
+        Avros found in the avro store of the transport are read from disk and
+        the rest are downloaded concurrently. Returns a dictionary mapping each
+        pair to its avro, or None if it could not be downloaded."""
+        self._check_survey_validity(survey)
+        pairs = [tuple(pair) for pair in pairs]
+        keys = [BlobStore.make_key(survey, oid, mid) for oid, mid in pairs]
+
+        def fetch(oid, measurement_id):
+            return self.multisurvey_get_avro(survey, oid, measurement_id=measurement_id)
+
+        bodies = self._fetch_stored_many(
+            self.transport.avro_store, keys, fetch, pairs, max_workers
+        )
+        return dict(zip(pairs, bodies))
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from .cache import CacheStats
+
+
+class NegativeCache:
+    """
+    Short-lived memory of the requests answered with 404, so they are
+    rejected locally instead of being sent again.
+
+    Parameters
+    ----------
+    ttl : float
+        Seconds a 404 answer is remembered.
+    capacity : int
+        Number of misses remembered before the expired ones are dropped.
+        It doubles when the misses not expired fill it.
+    """
+
+    def __init__(self, ttl=300.0, capacity=100000):
+        self.ttl = ttl
+        self.capacity = capacity
+        self._misses = {}
+        self._added = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats(("hits", "misses", "additions", "expirations"))
+
+    @property
+    def stats(self):
+        """Counters of the cache: ``hits`` (requests rejected locally),
+        ``misses``, ``additions`` (404 answers remembered), ``expirations``
+        (misses forgotten after their TTL) and the ``hit_ratio``."""
+        return self._stats.snapshot()
+
+    def reset_stats(self):
+        self._stats.reset()
+
+    def add(self, key, message=None):
+        """Remembers that the request ``key`` was answered with 404"""
+        with self._lock:
+            if len(self._misses) >= self.capacity:
+                self._purge()
+            self._misses[key] = (time.monotonic() + self.ttl, message)
+        self._stats.count("additions")
+
+    def _purge(self):
+        now = time.monotonic()
+        count = len(self._misses)
+        self._misses = {
+            key: miss for key, miss in self._misses.items() if miss[0] > now
+        }
+        self._stats.count("expirations", n=count - len(self._misses))
+        if len(self._misses) >= self.capacity:
+            self.capacity *= 2
+
+    def get(self, key):
+        """Message of the 404 answer remembered for ``key``, or None if the
+        request is not known to miss"""
+        with self._lock:
+            miss = self._misses.get(key)
+            if miss is not None and miss[0] <= time.monotonic():
+                del self._misses[key]
+                self._stats.count("expirations")
+                miss = None
+        if miss is None:
+            self._stats.count("misses")
+            return None
+        self._stats.count("hits")
+        return miss[1] or "Not found."
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def discard(self, key):
+        with self._lock:
+            self._misses.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._misses.clear()
+
+    def __len__(self):
+        return len(self._misses)
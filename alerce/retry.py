@@ -0,0 +1,92 @@
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import random
+
+
+class RetryPolicy:
+    """
+    Policy to retry failed requests with exponential backoff.
+
+    Parameters
+    ----------
+    total : int
+        Maximum number of retries of a request. 0 disables retries.
+    status_forcelist : iterable of int
+        Response status codes that are retried.
+    backoff_factor : float
+        Base delay in seconds. The delay before retry ``n`` (starting at 0) is
+        ``backoff_factor * 2 ** n``, capped at ``backoff_max``.
+    backoff_max : float
+        Maximum delay in seconds between two attempts.
+    jitter : bool
+        If True, the delay is drawn uniformly between 0 and the backoff delay
+        ("full jitter"), so many clients failing at once do not retry in sync.
+    respect_retry_after : bool
+        If True, the ``Retry-After`` header of a retried response is used as
+        the delay when present, capped at ``retry_after_max``.
+    retry_after_max : float
+        Maximum delay in seconds accepted from a ``Retry-After`` header.
+    allowed_methods : iterable of str
+        Methods that are retried. Only idempotent methods should be listed.
+    """
+
+    def __init__(
+        self,
+        total=3,
+        status_forcelist=(429, 502, 503, 504),
+        backoff_factor=0.5,
+        backoff_max=30.0,
+        jitter=True,
+        respect_retry_after=True,
+        retry_after_max=120.0,
+        allowed_methods=("GET", "HEAD", "OPTIONS"),
+    ):
+        self.total = total
+        self.status_forcelist = frozenset(status_forcelist)
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.retry_after_max = retry_after_max
+        self.allowed_methods = frozenset(m.upper() for m in allowed_methods)
+
+    def can_retry(self, method, attempt):
+        """Whether a request of ``method`` that failed ``attempt + 1`` times
+        can be sent again"""
+        return attempt < self.total and method.upper() in self.allowed_methods
+
+    def is_retryable_status(self, status_code):
+        return status_code in self.status_forcelist
+
+    def backoff(self, attempt):
+        """Delay in seconds before retry number ``attempt`` (starting at 0)"""
+        delay = min(self.backoff_factor * (2**attempt), self.backoff_max)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def retry_after(self, response):
+        """Delay in seconds requested by the ``Retry-After`` header of
+        ``response``, or None if there is none"""
+        if not self.respect_retry_after or response is None:
+            return None
+        value = response.headers.get("Retry-After")
+        if not isinstance(value, str):
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                date = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            delay = (date - datetime.now(timezone.utc)).total_seconds()
+        return min(max(delay, 0.0), self.retry_after_max)
+
+    def sleep_time(self, attempt, response=None):
+        """Delay in seconds before retry number ``attempt`` of a request that
+        failed with ``response`` (None for connection errors)"""
+        delay = self.retry_after(response)
+        if delay is None:
+            delay = self.backoff(attempt)
+        return delay
@@ -1,4 +1,5 @@
 import warnings
+import base64
 import gzip
 import io
 from .utils import Client
@@ -7,15 +8,15 @@ from astropy.io.fits import HDUList
 from astropy.io.fits import open as fits_open
 from urllib.error import HTTPError
 from alerce.ztf_search import ZTFSearch
-from alerce.exceptions import CandidError
+from alerce.exceptions import CandidError, ObjectNotFoundError
+from alerce.store import BlobStore
 
 
 class AlerceStamps(Client):
-    search_client = ZTFSearch()
-
-    def __init__(self):
+    def __init__(self, transport=None):
         cfg = load_config(service="stamps_ztf")
-        super().__init__(**cfg)
+        super().__init__(transport=transport, **cfg)
+        self.search_client = ZTFSearch(transport=self.transport)
 
     def _in_ipynb(self):
         try:
@@ -73,6 +74,24 @@ class AlerceStamps(Client):
         )
         template = science.replace("science", "template")
         difference = science.replace("science", "difference")
+        store = self.transport.stamp_store
+        if store is not None:
+            # embed the stored images instead of linking the server
+            science, template, difference = [
+                "data:image/png;base64,%s"
+                % base64.b64encode(
+                    self._fetch_stored(
+                        store,
+                        BlobStore.make_key("ztf", oid, candid, stamp_type, "png"),
+                        url,
+                        route="stamps",
+                    )
+                ).decode("ascii")
+                for stamp_type, url in zip(
+                    ["science", "template", "difference"],
+                    [science, template, difference],
+                )
+            ]
         images = """
         <div>ZTF oid: %s, candid: %s</div>
         <div>&emsp;&emsp;&emsp;&emsp;&emsp;
@@ -124,9 +143,14 @@ class AlerceStamps(Client):
                     stamp_type,
                 )
 
-                http_response = self.session.request("GET", url)
+                content = self._fetch_stored(
+                    self.transport.stamp_store,
+                    BlobStore.make_key("ztf", oid, candid, stamp_type, "fits"),
+                    url,
+                    route="stamps",
+                )
 
-                with gzip.open(io.BytesIO(http_response.content), "rb") as f:
+                with gzip.open(io.BytesIO(content), "rb") as f:
                     tmp_hdulist = fits_open(
                         io.BytesIO(f.read()), ignore_missing_simple=True
                     )
@@ -141,7 +165,7 @@ class AlerceStamps(Client):
                 return hdulist
             elif format == "numpy":
                 return [stamp.data.copy() for stamp in stamp_list]
-        except HTTPError:
+        except (HTTPError, ObjectNotFoundError):
             warnings.warn("AVRO File not found.", RuntimeWarning)
             return None
 
@@ -164,8 +188,38 @@ class AlerceStamps(Client):
         try:
             url = self.config["AVRO_URL"] + self.config["AVRO_ROUTES"]["get_avro"]
             params = {"oid": oid, "candid": candid}
-            http_response = self.session.request("GET", url, params=params)
-            return http_response.content
-        except HTTPError:
+            return self._fetch_stored(
+                self.transport.avro_store,
+                BlobStore.make_key("ztf", oid, candid),
+                url,
+                params=params,
+                route="avro",
+            )
+        except (HTTPError, ObjectNotFoundError):
             warnings.warn("AVRO File not found.", RuntimeWarning)
             return None
+
+    def get_avros(self, pairs, max_workers=8):
+        """Download the avros of many alerts.
+
+        Avros found in the avro store of the transport are read from disk and
+        the rest are downloaded concurrently.
+
+        Parameters
+        ----------
+        pairs : iterable of (:py:class:`str`, :py:class:`int`)
+            (oid, candid) of each alert.
+        max_workers : :py:class:`int`
+            Maximum number of concurrent downloads.
+
+        Returns
+        -------
+            Dictionary mapping each (oid, candid) to its avro, or None if it
+            could not be downloaded.
+        """
+        pairs = [tuple(pair) for pair in pairs]
+        keys = [BlobStore.make_key("ztf", oid, candid) for oid, candid in pairs]
+        bodies = self._fetch_stored_many(
+            self.transport.avro_store, keys, self.get_avro, pairs, max_workers
+        )
+        return dict(zip(pairs, bodies))
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from .cache import CACHE_EVENTS, CacheStats, SQLiteConnections
+
+
+class BlobStore:
+    """
+    Content-addressed store of response bodies on disk.
+
+    Bodies are kept exactly as received, in a file named after their SHA-256
+    digest, so identical bodies stored under different keys take disk space
+    only once. A SQLite index maps each key to its digest. When the stored
+    files add up to more than ``max_bytes``, the least recently read keys are
+    dropped, along with the files no other key refers to.
+
+    Several threads and processes can share the same directory.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the store, created if it does not exist.
+    max_bytes : int
+        Disk quota of the stored files.
+    timeout : float
+        Seconds to wait for a lock on the index held by another connection.
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024**3, timeout=30.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(path, "blobs"), exist_ok=True)
+        self._connections = SQLiteConnections(
+            os.path.join(path, "index.sqlite"), timeout=timeout
+        )
+        self._lock = threading.Lock()
+        self._total = None
+        self._stats = CacheStats(CACHE_EVENTS)
+        with self._connections.get() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "digest TEXT PRIMARY KEY, size INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, digest TEXT NOT NULL, "
+                "accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed_at "
+                "ON entries (accessed_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest)"
+            )
+
+    @property
+    def stats(self):
+        """Counters of the store: ``hits`` and ``misses`` of :meth:`get`,
+        ``evictions``, ``bytes_cached`` (bytes read) and ``bytes_network``
+        (bytes of the bodies put, downloaded from the network), and the
+        ``hit_ratio``."""
+        return self._stats.snapshot()
+
+    def reset_stats(self):
+        self._stats.reset()
+
+    @staticmethod
+    def make_key(*parts):
+        """Key of the body identified by ``parts``, e.g. survey, oid, candid"""
+        return "/".join(str(part) for part in parts)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.path, "blobs", digest[:2], digest)
+
+    def digest(self, key):
+        """SHA-256 digest of the body stored for ``key``, or None"""
+        row = (
+            self._connections.get()
+            .execute("SELECT digest FROM entries WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return None if row is None else row[0]
+
+    def get(self, key):
+        """Body stored for ``key``, or None"""
+        digest = self.digest(key)
+        if digest is None:
+            self._stats.count("misses")
+            return None
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            # removed by another process evicting it
+            self.delete(key)
+            self._stats.count("misses")
+            return None
+        self._stats.count("hits")
+        self._stats.count("bytes_cached", n=len(body))
+        with self._connections.get() as conn:
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return body
+
+    def put(self, key, body):
+        """Stores ``body`` under ``key``
+
+        :returns: the SHA-256 digest of the body
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        size = len(body)
+        self._stats.count("bytes_network", n=size)
+        if size > self.max_bytes:
+            return digest
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+        with self._connections.get() as conn:
+            new_file = conn.execute(
+                "INSERT OR IGNORE INTO files VALUES (?, ?)", (digest, size)
+            ).rowcount
+            previous = self.digest(key)
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                (key, digest, time.time()),
+            )
+            if previous is not None and previous != digest:
+                self._drop_unreferenced(conn, previous)
+        if new_file:
+            self._grow(size)
+        return digest
+
+    def _grow(self, size):
+        with self._lock:
+            if self._total is not None:
+                self._total += size
+            if self._total is not None and self._total <= self.max_bytes:
+                return
+        # the running total misses files written by other processes, the
+        # quota is checked against the index before evicting
+        with self._connections.get() as conn:
+            self._evict(conn)
+
+    def _evict(self, conn):
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()
+        if total > self.max_bytes:
+            victims = conn.execute(
+                "SELECT key, digest FROM entries ORDER BY accessed_at"
+            ).fetchall()
+            for key, digest in victims:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= self._drop_unreferenced(conn, digest)
+                self._stats.count("evictions")
+                if total <= self.max_bytes:
+                    break
+        with self._lock:
+            self._total = total
+
+    def _drop_unreferenced(self, conn, digest):
+        """Removes the file of ``digest`` if no key refers to it
+
+        :returns: the number of bytes freed
+        """
+        referenced = conn.execute(
+            "SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone()
+        if referenced is not None:
+            return 0
+        row = conn.execute(
+            "SELECT size FROM files WHERE digest = ?", (digest,)
+        ).fetchone()
+        conn.execute("DELETE FROM files WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+        return 0 if row is None else row[0]
+
+    def delete(self, key):
+        with self._connections.get() as conn:
+            digest = self.digest(key)
+            if digest is None:
+                return
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            freed = self._drop_unreferenced(conn, digest)
+        with self._lock:
+            if self._total is not None:
+                self._total -= freed
+
+    def clear(self):
+        with self._connections.get() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM files")
+        shutil.rmtree(os.path.join(self.path, "blobs"), ignore_errors=True)
+        os.makedirs(os.path.join(self.path, "blobs"), exist_ok=True)
+        with self._lock:
+            self._total = 0
+
+    def size(self):
+        """Total size in bytes of the stored files"""
+        (total,) = (
+            self._connections.get()
+            .execute("SELECT COALESCE(SUM(size), 0) FROM files")
+            .fetchone()
+        )
+        return total
+
+    def __contains__(self, key):
+        return self.digest(key) is not None
+
+    def __len__(self):
+        (count,) = (
+            self._connections.get().execute("SELECT COUNT(*) FROM entries").fetchone()
+        )
+        return count
+
+    def close(self):
+        """Closes the index connections of every thread"""
+        self._connections.close()
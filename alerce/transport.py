@@ -0,0 +1,417 @@
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from urllib.parse import urlencode, urlsplit
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import LRUResponseCache, SQLiteResponseCache, TieredResponseCache
+from .cone_cache import ConeCache
+from .hedging import HedgePolicy
+from .json_decoders import get_decoder
+from .limiter import AdaptiveLimiter
+from .negative_cache import NegativeCache
+from .retry import RetryPolicy
+from .store import BlobStore
+
+
+def request_key(method, url, params=None, headers=None):
+    """Identifies a request by its method, url and parameters.
+
+    Parameters are sorted by name and ``None`` values are dropped, like
+    ``requests`` does when sending them, so equivalent requests get the same
+    key regardless of the order of the parameters. Headers, if given, are
+    appended to the key.
+    """
+    key = "%s %s" % (method.upper(), url)
+    if params:
+        pairs = []
+        for name in sorted(params):
+            value = params[name]
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple)) else [value]
+            pairs.extend((name, str(v)) for v in values)
+        if pairs:
+            key += ("&" if "?" in url else "?") + urlencode(pairs)
+    if headers:
+        key += "".join("\n%s: %s" % item for item in sorted(headers.items()))
+    return key
+
+
+class Transport:
+    """
+    HTTP transport shared by every sub-client of :class:`alerce.core.Alerce`.
+
+    A single ``requests.Session`` is mounted with one connection pool per
+    host, so the search, crossmatch and stamps clients reuse the same warm
+    connections instead of opening their own. Failed requests are retried
+    following ``retry``, and the number of concurrent requests to each host
+    can be adapted to the server load with ``limiter``. A GET request that is
+    identical to one already in flight waits for it and shares its response
+    instead of being sent again. Slow GET requests can be hedged with
+    ``hedge``.
+
+    Parameters
+    ----------
+    pool_connections : int
+        Number of per-host connection pools to keep cached.
+    pool_maxsize : int
+        Maximum number of connections kept alive in each host pool. Should be
+        at least the number of threads issuing requests concurrently.
+    pool_block : bool
+        If True, a request waits for a free connection when ``pool_maxsize``
+        connections to a host are in use, capping the connections per host.
+        If False, extra connections are opened and discarded after use.
+    keep_alive : bool
+        If False, every request is sent with ``Connection: close``.
+    timeout : float or tuple, optional
+        Timeout in seconds of each request, as accepted by ``requests``.
+    retry : RetryPolicy, optional
+        Policy to retry failed requests. Defaults to ``RetryPolicy()``. Use
+        ``RetryPolicy(total=0)`` to disable retries.
+    limiter : AdaptiveLimiter, optional
+        Per-host concurrency limiter applied to every request. Requests are
+        not limited if not provided.
+    coalesce : bool
+        If True, identical GET requests in flight at the same time are sent
+        only once.
+    hedge : HedgePolicy, optional
+        Policy to send a duplicate of GET requests that take longer than
+        usual and keep the first response. Requests are not hedged if not
+        provided.
+    cache : ResponseCache, optional
+        Cache of GET responses shared by the clients using this transport,
+        see :class:`alerce.cache.ResponseCache`. Responses are not cached if
+        not provided. A ``CACHE`` dict in the config file creates a
+        :class:`alerce.cache.SQLiteResponseCache` with those arguments, and
+        a ``MEMORY_CACHE`` dict an :class:`alerce.cache.LRUResponseCache`,
+        placed in front of the former when both are given.
+    stamp_store : BlobStore, optional
+        Store of the stamps downloaded by the stamps clients, see
+        :class:`alerce.store.BlobStore`. A stored stamp is never downloaded
+        again. Stamps are not stored if not provided.
+    avro_store : BlobStore, optional
+        Store of the alert avros downloaded by the stamps clients. Avros are
+        not stored if not provided.
+    cone_cache : ConeCache, optional
+        Spatial cache of catsHTM conesearches, see
+        :class:`alerce.cone_cache.ConeCache`. Cones are not cached if not
+        provided.
+    negative_cache : NegativeCache, optional
+        Memory of the GET requests answered with 404, which are then
+        rejected without being sent, see
+        :class:`alerce.negative_cache.NegativeCache`. 404 answers are not
+        remembered if not provided.
+    json_decoder : str
+        Decoder of the JSON responses: 'orjson', 'simdjson', 'json' (the
+        standard library) or 'auto' for the fastest one installed, see
+        :func:`alerce.json_decoders.get_decoder`.
+    """
+
+    def __init__(
+        self,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        keep_alive=True,
+        timeout=None,
+        retry=None,
+        limiter=None,
+        coalesce=True,
+        hedge=None,
+        cache=None,
+        stamp_store=None,
+        avro_store=None,
+        cone_cache=None,
+        negative_cache=None,
+        json_decoder="auto",
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.limiter = limiter
+        self.coalesce = coalesce
+        self.hedge = hedge
+        self.cache = cache
+        self.stamp_store = stamp_store
+        self.avro_store = avro_store
+        self.cone_cache = cone_cache
+        self.negative_cache = negative_cache
+        self.json_decoder = json_decoder
+        self.loads = get_decoder(json_decoder)
+        #: Whether the decoder is faster than the standard library
+        self.fast_json = self.loads is not json.loads
+        self._hedge_executor = None
+        if hedge is not None:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=max(32, 4 * pool_maxsize),
+                thread_name_prefix="alerce-hedge",
+            )
+        self.session = self._build_session()
+        self._stats = Counter()
+        self._in_flight = {}
+        self._refreshing = set()
+        self._refresh_executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        """Creates a transport from the ``transport`` section of the config file.
+
+        Keyword arguments take precedence over the values in the config file.
+        """
+        from .utils import load_config
+
+        cfg = load_config(service="transport")
+        params = {key.lower(): value for key, value in cfg.items()}
+        for name, factory in _CONFIG_FACTORIES.items():
+            if isinstance(params.get(name), dict):
+                # only the top level keys are lowercased, route names in the
+                # TTLS of caches are kept as written
+                params[name] = factory(
+                    **{key.lower(): value for key, value in params[name].items()}
+                )
+        memory_cache = params.pop("memory_cache", None)
+        if memory_cache is not None:
+            if params.get("cache") is None:
+                params["cache"] = memory_cache
+            else:
+                params["cache"] = TieredResponseCache(memory_cache, params["cache"])
+        params.update(kwargs)
+        return cls(**params)
+
+    def _build_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    @property
+    def stats(self):
+        """Counters of the requests handled by the transport.
+
+        Keys are ``requests``, ``retries``, ``exhausted`` (requests that ran
+        out of retries), ``retries_<n>`` for each retried status code
+        (``retries_error`` for connection errors), ``coalesced`` (requests
+        answered with the response of an identical request in flight),
+        ``hedged`` (duplicates sent), ``hedge_wins`` (duplicates that
+        answered first), ``refreshes`` (cached responses revalidated in the
+        background) and ``refresh_errors`` (background revalidations that
+        failed).
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _cache_layers(self):
+        from .metadata import metadata_cache
+
+        layers = {
+            "cache": self.cache,
+            "stamp_store": self.stamp_store,
+            "avro_store": self.avro_store,
+            "cone_cache": self.cone_cache,
+            "negative_cache": self.negative_cache,
+            # shared by every client of the process
+            "metadata_cache": metadata_cache,
+        }
+        return {name: layer for name, layer in layers.items() if layer is not None}
+
+    @property
+    def cache_stats(self):
+        """Counters of every cache layer of the transport, by attribute name
+        (``cache``, ``stamp_store``, ...), and of the process-wide
+        ``metadata_cache``. See the ``stats`` of each layer.
+        """
+        return {name: layer.stats for name, layer in self._cache_layers().items()}
+
+    def reset_cache_stats(self):
+        for layer in self._cache_layers().values():
+            layer.reset_stats()
+
+    def _count(self, *keys):
+        with self._lock:
+            self._stats.update(keys)
+
+    def _send(self, method, url, **kwargs):
+        if self.limiter is None:
+            return self.session.request(method, url, **kwargs)
+        host = urlsplit(url).netloc
+        self.limiter.acquire(host)
+        start = time.monotonic()
+        status_code = 0
+        try:
+            resp = self.session.request(method, url, **kwargs)
+            status_code = resp.status_code
+            return resp
+        finally:
+            self.limiter.release(host, time.monotonic() - start, status_code)
+
+    def _send_hedged(self, method, url, **kwargs):
+        host = urlsplit(url).netloc
+        delay = self.hedge.delay(host)
+        start = time.monotonic()
+        attempts = [self._hedge_executor.submit(self._send, method, url, **kwargs)]
+        if delay is not None:
+            done, _ = wait(attempts, timeout=delay)
+            if not done and self.hedge.acquire():
+                self._count("hedged")
+                attempts.append(
+                    self._hedge_executor.submit(self._send, method, url, **kwargs)
+                )
+
+        pending = set(attempts)
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+            if winner is not None or not pending:
+                break
+        if winner is None:
+            winner = done.pop()
+        for future in pending | (done - {winner}):
+            future.add_done_callback(_close_response)
+        resp = winner.result()
+        if winner is not attempts[0]:
+            self._count("hedge_wins")
+        self.hedge.record(host, time.monotonic() - start)
+        return resp
+
+    def request(self, method, url, **kwargs):
+        """Sends a request through the shared session, retrying it according
+        to the retry policy.
+
+        Retryable status codes are returned as is once the retries run out,
+        so callers handle them like any other error response.
+        """
+        if not self.coalesce or method.upper() != "GET" or kwargs.get("data"):
+            return self._request(method, url, **kwargs)
+
+        key = request_key(method, url, kwargs.get("params"), kwargs.get("headers"))
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        try:
+            resp = self._request(method, url, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(resp)
+            return resp
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _request(self, method, url, **kwargs):
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        self._count("requests")
+        attempt = 0
+        while True:
+            try:
+                if self.hedge is not None and method.upper() == "GET":
+                    resp = self._send_hedged(method, url, **kwargs)
+                else:
+                    resp = self._send(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if not self.retry.can_retry(method, attempt):
+                    self._count("exhausted")
+                    raise
+                self._count("retries", "retries_error")
+                time.sleep(self.retry.sleep_time(attempt))
+                attempt += 1
+                continue
+            if not self.retry.is_retryable_status(resp.status_code):
+                return resp
+            if not self.retry.can_retry(method, attempt):
+                self._count("exhausted")
+                return resp
+            self._count("retries", "retries_%d" % resp.status_code)
+            delay = self.retry.sleep_time(attempt, resp)
+            resp.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def refresh(self, key, fn, *args):
+        """Calls ``fn(*args)`` in a background thread, unless a refresh of
+        ``key`` is already running. Errors are ignored, the cached response
+        being refreshed is kept.
+
+        :returns: True if the refresh was scheduled
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=self.pool_maxsize,
+                    thread_name_prefix="alerce-refresh",
+                )
+            executor = self._refresh_executor
+
+        def run():
+            try:
+                fn(*args)
+            except Exception:
+                self._count("refresh_errors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._count("refreshes")
+        executor.submit(run)
+        return True
+
+    def close(self):
+        """Closes every pooled connection."""
+        for store in (self.stamp_store, self.avro_store):
+            if store is not None:
+                store.close()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        if self._refresh_executor is not None:
+            self._refresh_executor.shutdown(wait=False)
+        self.session.close()
+
+
+# objects created from dictionaries of the transport section of the config
+_CONFIG_FACTORIES = {
+    "retry": RetryPolicy,
+    "hedge": HedgePolicy,
+    "limiter": AdaptiveLimiter,
+    "cache": SQLiteResponseCache,
+    "memory_cache": LRUResponseCache,
+    "negative_cache": NegativeCache,
+    "cone_cache": ConeCache,
+    "stamp_store": BlobStore,
+    "avro_store": BlobStore,
+}
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
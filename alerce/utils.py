@@ -1,18 +1,294 @@
 import json
 
 import copy
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+import threading
+import time
+import warnings
 
 from typing import Dict, Any
 
+import numpy as np
 from pandas import DataFrame, read_csv
+import io
 from io import StringIO
 from astropy.table import Table
 
-from .exceptions import handle_error, FormatValidationError
-import requests
+from .cache import CacheEntry
+from requests.exceptions import RequestException
+
+try:
+    import pyarrow
+    import pyarrow.csv
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+try:
+    import polars
+except ImportError:  # pragma: no cover
+    polars = None
+
+from .exceptions import (
+    APIError,
+    FormatValidationError,
+    ObjectNotFoundError,
+    StaleResultWarning,
+    handle_error,
+)
+from .transport import Transport, request_key
 import abc
 import os
 
+# key just looked up and missing from its store, in the threads downloading
+# the bodies of _fetch_stored_many
+_missing = threading.local()
+
+
+def copy_json(value):
+    """Copies a decoded JSON value, faster than ``copy.deepcopy``"""
+    if isinstance(value, dict):
+        return {key: copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_json(item) for item in value]
+    return value
+
+
+def _is_server_failure(error):
+    """Whether ``error`` comes from the server failing to answer, rather than
+    from the request itself"""
+    if isinstance(error, RequestException):
+        return True
+    return error.code == 429 or error.code >= 500
+
+
+def _count_hit(cache, entry, route, *events):
+    """Reports to ``cache`` a request answered with ``entry``"""
+    for event in ("hits",) + events:
+        cache.count(event, route)
+    cache.count("bytes_cached", route, len(entry.body))
+
+
+def _failure_reason(error):
+    if isinstance(error, APIError):
+        return "status code %d" % error.code
+    return type(error).__name__
+
+
+#: Columns known to hold floating point values, by route. They are built as
+#: float arrays directly, even when the first rows hold None or integers.
+FLOAT_COLUMNS = {
+    "objects": (
+        "meanra",
+        "meandec",
+        "sigmara",
+        "sigmadec",
+        "firstmjd",
+        "lastmjd",
+        "deltajd",
+        "mjdstarthist",
+        "mjdendhist",
+        "g_r_max",
+        "g_r_max_corr",
+        "g_r_mean",
+        "g_r_mean_corr",
+        "probability",
+    ),
+    "detections": (
+        "mjd",
+        "ra",
+        "dec",
+        "magpsf",
+        "sigmapsf",
+        "magpsf_corr",
+        "sigmapsf_corr",
+        "sigmapsf_corr_ext",
+        "magap",
+        "sigmagap",
+        "magapbig",
+        "sigmagapbig",
+        "diffmaglim",
+        "distnr",
+        "rb",
+        "drb",
+        "psfFlux",
+        "psfFluxErr",
+        "scienceFlux",
+        "scienceFluxErr",
+    ),
+    "non_detections": ("mjd", "diffmaglim"),
+    "forced_photometry": (
+        "mjd",
+        "ra",
+        "dec",
+        "mag",
+        "e_mag",
+        "mag_corr",
+        "e_mag_corr",
+        "e_mag_corr_ext",
+        "diffmaglim",
+        "psfFlux",
+        "psfFluxErr",
+        "scienceFlux",
+        "scienceFluxErr",
+    ),
+    "magstats": (
+        "magmean",
+        "magmedian",
+        "magmax",
+        "magmin",
+        "magsigma",
+        "maglast",
+        "magfirst",
+        "dmdt_first",
+        "dm_first",
+        "sigmadm_first",
+        "dt_first",
+        "firstmjd",
+        "lastmjd",
+    ),
+    "probabilities": ("probability",),
+}
+
+
+def records_to_frame(records, float_columns=()):
+    """Builds a DataFrame from a list of JSON objects, column by column.
+
+    When every record has the same keys as the first one, the columns holding
+    floats in the first record or listed in ``float_columns`` are filled
+    into a single float array in one pass, without going through object
+    arrays nor inferring their type. Integer and boolean columns are typed
+    by numpy, and only the remaining columns are inferred by pandas, each
+    from a list of its own. Otherwise the DataFrame is built row by row
+    like ``DataFrame(records)``.
+    """
+    if not records or not isinstance(records[0], dict):
+        return DataFrame(records)
+    first = records[0]
+    columns = list(first)
+    keys = first.keys()
+    if any(record.keys() != keys for record in records):
+        # keys missing from some record
+        return DataFrame(records)
+    floats = [
+        column
+        for column in columns
+        if column in float_columns or isinstance(first[column], float)
+    ]
+    data = {}
+    if floats:
+        try:
+            block = np.array(list(map(itemgetter(*floats), records)), dtype=float)
+        except (TypeError, ValueError):
+            # a float column holding other values, inferred like the others
+            floats = []
+        else:
+            block = block.reshape(len(records), len(floats))
+            data = {column: block[:, i] for i, column in enumerate(floats)}
+    float_set = set(floats)
+    for column in columns:
+        if column in float_set:
+            continue
+        values = list(map(itemgetter(column), records))
+        if isinstance(first[column], int):
+            # integers and booleans are typed by numpy, much faster than
+            # pandas infers them, unless None or other types are mixed in
+            array = np.array(values)
+            is_bool = isinstance(first[column], bool)
+            if (
+                array.dtype.kind in "iu"
+                and not is_bool
+                or (array.dtype.kind == "b" and is_bool)
+            ):
+                values = array
+        data[column] = values
+    return DataFrame(data, columns=columns, copy=False)
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError(
+            "The arrow format requires pyarrow. Install it with `pip install pyarrow`."
+        )
+
+
+def records_to_arrow(records, float_columns=()):
+    """Builds a ``pyarrow.Table`` from a list of JSON objects.
+
+    The columns are filled by Arrow straight from the records, without a
+    DataFrame in between. Columns listed in ``float_columns`` are stored as
+    float64 even when they only hold integers or nulls.
+    """
+    _require_pyarrow()
+    if not records:
+        return pyarrow.table({})
+    columns = list(records[0])
+    if len(set().union(*records)) != len(columns):
+        # keys missing from the first record
+        columns = list(dict.fromkeys(key for record in records for key in record))
+        table = pyarrow.table(
+            {column: [record.get(column) for record in records] for column in columns}
+        )
+    else:
+        table = pyarrow.Table.from_pylist(records)
+    for i, field in enumerate(table.schema):
+        if field.name in float_columns and (
+            pyarrow.types.is_integer(field.type) or pyarrow.types.is_null(field.type)
+        ):
+            table = table.set_column(
+                i, field.name, table.column(i).cast(pyarrow.float64())
+            )
+    return table
+
+
+def arrange_table(table, index=None, sort=None):
+    """Sorts an Arrow table by the ``sort`` column and moves the ``index``
+    column first, Arrow tables having no index"""
+    if sort:
+        table = table.sort_by(sort)
+    if index:
+        names = [index] + [name for name in table.column_names if name != index]
+        table = table.select(names)
+    return table
+
+
+def _require_polars():
+    if polars is None:
+        raise ImportError(
+            "The polars format requires polars. Install it with `pip install polars`."
+        )
+
+
+def records_to_polars(records, float_columns=()):
+    """Builds a ``polars.DataFrame`` from a list of JSON objects.
+
+    The columns are filled by polars straight from the records, reading all
+    of them to infer the types. Columns listed in ``float_columns`` are
+    stored as Float64 even when they only hold integers or nulls.
+    """
+    _require_polars()
+    if not records:
+        return polars.DataFrame()
+    frame = polars.from_dicts(records, infer_schema_length=None)
+    casts = [
+        polars.col(name).cast(polars.Float64)
+        for name, dtype in frame.schema.items()
+        if name in float_columns and (dtype.is_integer() or dtype == polars.Null)
+    ]
+    if casts:
+        frame = frame.with_columns(casts)
+    return frame
+
+
+def arrange_polars(frame, index=None, sort=None):
+    """Sorts a polars frame by the ``sort`` column and moves the ``index``
+    column first, polars frames having no index"""
+    if sort:
+        frame = frame.sort(sort)
+    if index:
+        frame = frame.select([index, polars.exclude(index)])
+    return frame
+
 
 class Result(abc.ABC):
     def __init__(self, format="json"):
@@ -41,6 +317,28 @@ class Result(abc.ABC):
     def to_csv(self):
         pass
 
+    @abc.abstractmethod
+    def to_arrow(self, index=None, sort=None):
+        """Convert the result to a ``pyarrow.Table``
+
+        :index: column moved first, Arrow tables having no index
+        :sort: sorting column for the table
+        :returns: the table
+
+        """
+        pass
+
+    @abc.abstractmethod
+    def to_polars(self, index=None, sort=None):
+        """Convert the result to a ``polars.DataFrame``
+
+        :index: column moved first, polars frames having no index
+        :sort: sorting column for the frame
+        :returns: the frame
+
+        """
+        pass
+
     def result(self, index=None, sort=None):
         """Creates the result depending on the arguments and the expected format
 
@@ -57,25 +355,37 @@ class Result(abc.ABC):
             return self.to_csv()
         elif self.format == "json":
             return self.to_json()
+        elif self.format == "arrow":
+            return self.to_arrow(index, sort)
+        elif self.format == "polars":
+            return self.to_polars(index, sort)
         raise ValueError(f"Unrecognized format '{self.format}'")
 
 
 class ResultJson(Result):
     """Object that holds a json type result"""
 
-    def __init__(self, json_result, **kwargs):
+    def __init__(self, json_result, frames=None, float_columns=(), **kwargs):
         self.json_result = json_result
+        self.frames = frames
+        self.float_columns = float_columns
         super().__init__(**kwargs)
 
     def to_pandas(self, index=None, sort=None):
+        if self.frames is not None:
+            dataframe = self.frames.get(index, sort)
+            if dataframe is not None:
+                return dataframe
         if isinstance(self.json_result, list):
-            dataframe = DataFrame(self.json_result)
+            dataframe = records_to_frame(self.json_result, self.float_columns)
         else:
             dataframe = DataFrame([self.json_result])
         if sort:
             dataframe.sort_values(sort, inplace=True)
         if index:
             dataframe.set_index(index, inplace=True)
+        if self.frames is not None:
+            self.frames.put(index, sort, dataframe)
         return dataframe
 
     def to_votable(self):
@@ -88,6 +398,19 @@ class ResultJson(Result):
         df = self.to_pandas()
         return df.to_csv(index=False)
 
+    def to_arrow(self, index=None, sort=None):
+        records = self.json_result
+        if not isinstance(records, list):
+            records = [records]
+        return arrange_table(records_to_arrow(records, self.float_columns), index, sort)
+
+    def to_polars(self, index=None, sort=None):
+        records = self.json_result
+        if not isinstance(records, list):
+            records = [records]
+        frame = records_to_polars(records, self.float_columns)
+        return arrange_polars(frame, index, sort)
+
 
 class ResultCsv(Result):
     """Object that holds a csv type result"""
@@ -134,13 +457,26 @@ class ResultCsv(Result):
     def to_csv(self):
         return self.csv_result
 
+    def to_arrow(self, index=None, sort=None):
+        _require_pyarrow()
+        table = pyarrow.csv.read_csv(io.BytesIO(self.csv_result.encode("utf-8")))
+        return arrange_table(table, index, sort)
+
+    def to_polars(self, index=None, sort=None):
+        _require_polars()
+        frame = polars.read_csv(io.BytesIO(self.csv_result.encode("utf-8")))
+        return arrange_polars(frame, index, sort)
+
 
 class Client:
-    def __init__(self, **kwargs):
-        self.session = requests.Session()
+    def __init__(self, transport=None, **kwargs):
+        if transport is None:
+            transport = Transport.from_config()
+        self.transport = transport
+        self.session = transport.session
         self.config = {}
         self.config.update(kwargs)
-        self.allowed_formats = ["pandas", "votable", "json", "csv"]
+        self.allowed_formats = ["pandas", "votable", "json", "csv", "arrow", "polars"]
 
     def load_config_from_object(self, object):
         self.config.update(object)
@@ -162,17 +498,270 @@ class Client:
         response_field=None,
         result_format="json",
         response_format="json",
+        route=None,
     ):
         result_format = self._validate_format(result_format)
-        resp = self.session.request(method, url, params=params, data=data)
-        if resp.status_code >= 400:
-            handle_error(resp, response_format)
+        payload = self._fetch(
+            method,
+            url,
+            params=params,
+            data=data,
+            response_format=response_format,
+            route=route,
+            # only json results hand out the payload itself
+            copy=result_format == "json",
+        )
 
         if response_format == "csv":
-            return ResultCsv(resp.content, format=result_format)
+            return ResultCsv(payload, format=result_format)
+        frames = None
+        cache = self.transport.cache
+        if cache is not None and result_format == "pandas" and method.upper() == "GET":
+            frames = cache.frames(request_key(method, url, params))
+        float_columns = FLOAT_COLUMNS.get(route, ())
         if response_field and result_format != "json" and result_format != "csv":
-            return ResultJson(resp.json()[response_field], format=result_format)
-        return ResultJson(resp.json(), format=result_format)
+            payload = payload[response_field]
+        return ResultJson(
+            payload, format=result_format, frames=frames, float_columns=float_columns
+        )
+
+    def _decode(self, resp, response_format):
+        if response_format == "json":
+            return self.transport.loads(resp.content)
+        return resp.content
+
+    def _decode_body(self, body, response_format):
+        if response_format == "json":
+            return self.transport.loads(body)
+        return body
+
+    def _fetch(
+        self,
+        method,
+        url,
+        params=None,
+        data=None,
+        response_format="json",
+        route=None,
+        copy=True,
+        use_cache=True,
+    ):
+        """Sends a request and returns its decoded body.
+
+        If the transport has a cache, GET responses are stored when they carry
+        an ``ETag`` or ``Last-Modified`` header or when their route has a TTL.
+        A stored response younger than the TTL of its route is served without
+        contacting the server. Older ones are revalidated with
+        ``If-None-Match`` / ``If-Modified-Since``, and a 304 answer is served
+        from the stored copy. Within the ``stale_while_revalidate`` window of
+        the cache, the stored copy is served at once and revalidated in the
+        background. Within its ``stale_if_error`` window, the stored copy is
+        served with a ``StaleResultWarning`` if the server cannot be reached
+        or answers with a server error. If the transport has a negative cache, GET
+        requests recently answered with 404 raise ``ObjectNotFoundError``
+        without being sent.
+
+        :response_format: 'json' to decode the body, 'csv' or 'bytes' to
+            return it as is
+        :route: name of the route requested, used to pick the TTL of the
+            cached response
+        :copy: if False, a payload kept by the cache may be returned as is,
+            for callers that do not modify it
+        :use_cache: if False, the response cache of the transport is neither
+            read nor written, for bodies kept elsewhere
+        :returns: the decoded body
+        """
+        key = request_key(method, url, params) if method.upper() == "GET" else None
+        negative_cache = self.transport.negative_cache
+        if negative_cache is not None and key is not None:
+            message = negative_cache.get(key)
+            if message is not None:
+                raise ObjectNotFoundError(message=message, code=404)
+
+        cache = self.transport.cache if use_cache else None
+        if cache is None or key is None:
+            resp = self.transport.request(method, url, params=params, data=data)
+            if resp.status_code >= 400:
+                self._handle_error(resp, response_format, key)
+            return self._decode(resp, response_format)
+
+        entry = cache.get(key)
+        if entry is not None:
+            if cache.is_fresh(entry, route):
+                _count_hit(cache, entry, route)
+                return self._cached_payload(cache, key, entry, response_format, copy)
+            if cache.can_serve_stale(entry, route):
+                self.transport.refresh(
+                    key,
+                    self._revalidate,
+                    cache,
+                    key,
+                    entry,
+                    method,
+                    url,
+                    params,
+                    data,
+                    response_format,
+                    route,
+                    True,
+                )
+                _count_hit(cache, entry, route, "stale")
+                return self._cached_payload(cache, key, entry, response_format, copy)
+        try:
+            return self._revalidate(
+                cache,
+                key,
+                entry,
+                method,
+                url,
+                params,
+                data,
+                response_format,
+                route,
+                copy=copy,
+            )
+        except (RequestException, APIError) as e:
+            if (
+                entry is None
+                or not _is_server_failure(e)
+                or not cache.can_serve_if_error(entry, route)
+            ):
+                raise
+            stored_at = time.localtime(entry.stored_at)
+            warnings.warn(
+                "The API failed to answer (%s), the result cached at %s is "
+                "returned instead"
+                % (_failure_reason(e), time.strftime("%Y-%m-%d %H:%M:%S", stored_at)),
+                StaleResultWarning,
+                stacklevel=4,
+            )
+            _count_hit(cache, entry, route, "stale")
+            return self._cached_payload(cache, key, entry, response_format, copy)
+
+    def _revalidate(
+        self,
+        cache,
+        key,
+        entry,
+        method,
+        url,
+        params,
+        data,
+        response_format,
+        route,
+        background=False,
+        copy=True,
+    ):
+        """Requests ``key`` with the validators of the cached ``entry``, if
+        any, and stores the response.
+
+        :background: if True, the request is not counted as a hit or miss of
+            the cache, the stale entry was already served
+        :copy: see :meth:`_fetch`
+        """
+        headers = entry.validators() if entry is not None else {}
+        resp = self.transport.request(
+            method, url, params=params, data=data, headers=headers
+        )
+        if resp.status_code == 304 and entry is not None:
+            cache.touch(key, entry)
+            cache.count("revalidated", route)
+            if not background:
+                _count_hit(cache, entry, route)
+            return self._cached_payload(cache, key, entry, response_format, copy)
+        if resp.status_code >= 400:
+            self._handle_error(resp, response_format, key)
+        cache.count("bytes_network", route, len(resp.content))
+        if not background:
+            cache.count("misses", route)
+
+        payload = self._decode(resp, response_format)
+        new_entry = CacheEntry.from_response(resp)
+        if cache.should_store(new_entry, route):
+            if not copy and self._keeps_payload(cache, response_format):
+                # otherwise decoded again on the first hit, when needed
+                new_entry.payload = payload
+            cache.set(key, new_entry)
+        return payload
+
+    def _handle_error(self, resp, response_format, key=None):
+        negative_cache = self.transport.negative_cache
+        try:
+            handle_error(resp, response_format)
+        except ObjectNotFoundError as e:
+            if negative_cache is not None and key is not None:
+                negative_cache.add(key, e.message)
+            raise
+
+    def _fetch_stored(self, store, key, url, params=None, route=None):
+        """Returns the body stored under ``key`` in ``store``, downloading and
+        storing it if missing. Bodies are returned exactly as received.
+
+        :store: a :class:`alerce.store.BlobStore`, or None to always download.
+            Bodies kept in a store are not kept in the response cache too.
+        """
+        body = None
+        if store is not None and getattr(_missing, "key", None) != key:
+            body = store.get(key)
+        if body is None:
+            body = self._fetch(
+                "GET",
+                url,
+                params=params,
+                response_format="bytes",
+                route=route,
+                use_cache=store is None,
+            )
+            if store is not None:
+                store.put(key, body)
+        return body
+
+    def _fetch_stored_many(self, store, keys, fetch, args, max_workers=8):
+        """Serves the bodies of ``keys`` found in ``store`` and runs
+        ``fetch(*args[i])`` in a thread pool for the missing ones.
+
+        :returns: the list of bodies, in the order of ``keys``, with None for
+            the ones that failed with an API or connection error
+        """
+        bodies = [None if store is None else store.get(key) for key in keys]
+        missing = [i for i, body in enumerate(bodies) if body is None]
+
+        def run(i):
+            # the store is not looked up again for the missing key
+            _missing.key = keys[i]
+            try:
+                return fetch(*args[i])
+            except (APIError, RequestException):
+                return None
+            finally:
+                _missing.key = None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for i, body in zip(missing, executor.map(run, missing)):
+                bodies[i] = body
+        failed = sum(body is None for body in bodies)
+        if failed:
+            warnings.warn(f"{failed} of {len(keys)} downloads failed", RuntimeWarning)
+        return bodies
+
+    def _keeps_payload(self, cache, response_format):
+        """Whether the decoded payload of the entries of ``cache`` is kept.
+        Only worth it with the standard json decoder, the others decode a
+        body faster than the payload is copied."""
+        return (
+            cache.keeps_payload
+            and response_format == "json"
+            and not self.transport.fast_json
+        )
+
+    def _cached_payload(self, cache, key, entry, response_format, copy=True):
+        if not self._keeps_payload(cache, response_format):
+            return self._decode_body(entry.body, response_format)
+        # decoded once and copied, callers are free to modify the result
+        if entry.payload is None:
+            entry.payload = self._decode_body(entry.body, response_format)
+            cache.resized(key, entry)
+        return copy_json(entry.payload) if copy else entry.payload
 
 
 def load_config(service) -> Dict[str, Any]:
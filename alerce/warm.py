@@ -0,0 +1,319 @@
+"""
+Fills the local caches with the data of a list of objects, so it can later
+be queried without waiting on the network.
+
+The caches to fill are those of the transport of the client: the response
+cache for the query resources and the stamp store for the stamps, see
+:class:`alerce.transport.Transport`. From the command line::
+
+    python -m alerce.warm oids.txt --resources object lightcurve stamps \\
+        --survey ztf --cache ~/.cache/alerce/responses.sqlite \\
+        --stamp-store ~/.cache/alerce/stamps --checkpoint warm.done
+
+where ``oids.txt`` lists one oid per line. Run ``python -m alerce.warm -h``
+for every option. Stamps are only kept by a stamp store, the response cache
+does not keep them.
+
+Whether a warmed response is fresh is decided when it is read, by the TTLs
+of the cache reading it. With the default TTLs (10 minutes for objects,
+lightcurves, probabilities and features) a cache warmed overnight is stale
+by morning, and every query is revalidated with the server. To query the
+warmed data without waiting on the network, read it through a cache with
+longer TTLs, e.g. a week for every route in the ``transport`` section of
+the config file::
+
+    "CACHE": {"TTLS": {}, "DEFAULT_TTL": 604800}
+
+or with a ``STALE_IF_ERROR`` window, to fall back on the warmed responses
+only when the server cannot be reached. See
+:class:`alerce.cache.SQLiteResponseCache`.
+"""
+
+import argparse
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import os
+import sys
+import threading
+import time
+import warnings
+
+from requests.exceptions import RequestException
+
+from .exceptions import APIError, CandidError
+
+
+def _get_stamps(client, oid, survey):
+    stamps = client.get_stamps(oid, survey=survey, format="numpy")
+    if stamps is None:
+        raise CandidError()
+    return stamps
+
+
+#: Resources that can be warmed, and how each one is requested
+RESOURCES = {
+    "object": lambda client, oid, survey: client.query_object(oid, survey=survey),
+    "lightcurve": lambda client, oid, survey: client.query_lightcurve(
+        oid, survey=survey
+    ),
+    "probabilities": lambda client, oid, survey: client.query_probabilities(
+        oid, survey=survey
+    ),
+    "features": lambda client, oid, survey: client.query_features(oid, survey=survey),
+    "stamps": _get_stamps,
+}
+
+
+class _Pacer:
+    """Spaces the start of the downloads to at most ``rate`` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(start - now)
+
+
+def read_oids(path):
+    """Oids listed in a file, one per line. Blank lines and lines starting
+    with ``#`` are skipped, and only the first field of each line is read."""
+    oids = []
+    with open(path) as f:
+        for line in f:
+            fields = line.replace(",", " ").split()
+            if fields and not fields[0].startswith("#"):
+                oids.append(fields[0])
+    return oids
+
+
+def _read_checkpoint(path):
+    done = set()
+    if path is None or not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) == 2:
+                done.add(tuple(fields))
+    return done
+
+
+def warm(
+    oids,
+    resources=tuple(RESOURCES),
+    survey="ztf",
+    client=None,
+    max_workers=8,
+    rate=None,
+    checkpoint=None,
+    progress=None,
+):
+    """
+    Downloads some resources of many objects through the caches of a client.
+
+    Parameters
+    ----------
+    oids : iterable
+        The object identifiers
+    resources : iterable of str
+        Resources to download for every object, among ``RESOURCES``:
+        'object', 'lightcurve', 'probabilities', 'features' and 'stamps'
+        (those of the first detection with stamps)
+    survey : str
+        The survey of the objects
+    client : alerce.core.Alerce, optional
+        Client whose caches are filled. If not given, one is created from
+        the config file.
+    max_workers : int
+        Maximum number of downloads at the same time. At most twice as many
+        are queued, the rest are submitted as those finish.
+    rate : float, optional
+        Maximum number of downloads started per second
+    checkpoint : str, optional
+        File where every (oid, resource) downloaded is recorded. The ones
+        already recorded are skipped, so an interrupted run resumes where it
+        stopped.
+    progress : callable, optional
+        Called as ``progress(done, total, failed)`` after each download
+
+    Returns
+    -------
+    A dictionary with the number of downloads ``done``, the number
+    ``skipped`` because of the checkpoint, and ``failed``, mapping each
+    (oid, resource) that could not be downloaded to its error
+    """
+    resources = list(resources)
+    unknown = [resource for resource in resources if resource not in RESOURCES]
+    if unknown:
+        raise ValueError(
+            "unknown resources %s, must be among %s" % (unknown, list(RESOURCES))
+        )
+    if client is None:
+        from .core import Alerce
+
+        client = Alerce()
+    transport = client.transport
+    if transport.cache is None and transport.stamp_store is None:
+        warnings.warn(
+            "the transport has no cache nor stamp store, nothing is kept",
+            RuntimeWarning,
+        )
+    elif "stamps" in resources and transport.stamp_store is None:
+        warnings.warn(
+            "the transport has no stamp store, the stamps are not kept",
+            RuntimeWarning,
+        )
+
+    done = _read_checkpoint(checkpoint)
+    tasks = [(str(oid), resource) for oid in oids for resource in resources]
+    pending = [task for task in tasks if task not in done]
+    pacer = _Pacer(rate) if rate else None
+
+    def download(oid, resource):
+        if pacer is not None:
+            pacer.wait()
+        RESOURCES[resource](client, oid, survey)
+
+    report = {"done": 0, "skipped": len(tasks) - len(pending), "failed": {}}
+    log = open(checkpoint, "a") if checkpoint is not None else None
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    queue = iter(pending)
+    futures = {}
+
+    def submit(count):
+        for task in itertools.islice(queue, count):
+            futures[executor.submit(download, *task)] = task
+
+    try:
+        submit(2 * max_workers)
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                task = futures.pop(future)
+                try:
+                    future.result()
+                except (
+                    APIError,
+                    CandidError,
+                    RequestException,
+                    NotImplementedError,
+                ) as e:
+                    report["failed"][task] = e
+                else:
+                    report["done"] += 1
+                    if log is not None:
+                        log.write("%s\t%s\n" % task)
+                        log.flush()
+                if progress is not None:
+                    progress(
+                        report["done"] + len(report["failed"]),
+                        len(pending),
+                        len(report["failed"]),
+                    )
+            submit(len(finished))
+    finally:
+        # an interrupted run stops at the downloads in flight
+        executor.shutdown(wait=True, cancel_futures=True)
+        if log is not None:
+            log.close()
+    if report["failed"]:
+        warnings.warn(
+            "%d of %d downloads failed" % (len(report["failed"]), len(pending)),
+            RuntimeWarning,
+        )
+    return report
+
+
+def _print_progress(done, total, failed):
+    sys.stderr.write("\rwarmed %d/%d (%d failed)" % (done, total, failed))
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m alerce.warm",
+        description="Fills the local caches with the data of a list of objects.",
+    )
+    parser.add_argument("oids", help="file with one oid per line")
+    parser.add_argument(
+        "-r",
+        "--resources",
+        nargs="+",
+        choices=list(RESOURCES),
+        default=list(RESOURCES),
+        help="resources to download for every object (default: all)",
+    )
+    parser.add_argument("-s", "--survey", default="ztf", help="default: ztf")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=8,
+        help="downloads at the same time (default: 8)",
+    )
+    parser.add_argument(
+        "--rate", type=float, help="maximum downloads started per second"
+    )
+    parser.add_argument(
+        "--checkpoint", help="file recording the downloads done, to resume from"
+    )
+    parser.add_argument(
+        "--cache",
+        help="SQLite response cache to fill, instead of the one of the config "
+        "file. Its entries are fresh as long as the TTLs of the cache reading "
+        "them allow, see the module documentation",
+    )
+    parser.add_argument(
+        "--stamp-store",
+        help="stamp store directory to fill, instead of the one of the config "
+        "file. Stamps are not kept without one",
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="hide progress")
+    args = parser.parse_args(argv)
+
+    from .cache import SQLiteResponseCache
+    from .core import Alerce
+    from .store import BlobStore
+    from .transport import Transport
+
+    overrides = {}
+    if args.cache is not None:
+        overrides["cache"] = SQLiteResponseCache(os.path.expanduser(args.cache))
+    if args.stamp_store is not None:
+        overrides["stamp_store"] = BlobStore(os.path.expanduser(args.stamp_store))
+    transport = Transport.from_config(**overrides)
+    try:
+        report = warm(
+            read_oids(args.oids),
+            resources=args.resources,
+            survey=args.survey,
+            client=Alerce(transport=transport),
+            max_workers=args.workers,
+            rate=args.rate,
+            checkpoint=args.checkpoint,
+            progress=None if args.quiet else _print_progress,
+        )
+    finally:
+        transport.close()
+        if args.cache is not None:
+            overrides["cache"].close()
+    for (oid, resource), error in sorted(report["failed"].items()):
+        reason = str(error) or type(error).__name__
+        print("%s %s: %s" % (oid, resource, reason), file=sys.stderr)
+    print(
+        "%d downloaded, %d skipped, %d failed"
+        % (report["done"], report["skipped"], len(report["failed"]))
+    )
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,22 @@
-from .utils import Client, load_config
+from .metadata import Taxonomy, metadata_cache
+from .utils import FLOAT_COLUMNS, Client, ResultJson, load_config
 
 
 class ZTFSearch(Client):
-    def __init__(self):
+    # NOTA: la api principal de ztf no tiene ruta de forced photometry, la v2 si tiene. Esto es lo mas facil
+    # pero no es correcto.
+    FORCED_PHOTOMETRY_URL = (
+        "https://api.alerce.online/v2/lightcurve/forced-photometry/%s"
+    )
+
+    def __init__(self, transport=None):
         """
         ZTF search client to query objects, lightcurves, detections,
         non-detections, magnitude statistics, probabilities, features,
         classifiers and classes from the ALeRCE ZTF API_.
         """
         cfg = load_config(service="ztf")
-        super().__init__(**cfg)
+        super().__init__(transport=transport, **cfg)
 
     @property
     def ztf_url(self):
@@ -26,7 +33,7 @@ class ZTFSearch(Client):
         Parameters
         ----------
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         index : str
             Name of the column to use as index when format is 'pandas'
         sort : str
@@ -76,9 +83,27 @@ class ZTFSearch(Client):
             params=kwargs,
             result_format=format,
             response_field="items",
+            route="objects",
         )
         return q.result(index, sort)
 
+    def count_objects(self, **kwargs):
+        """
+        Gets the total number of objects matching the query parameters
+
+        Parameters
+        ----------
+        **kwargs
+            Object query parameters, see :meth:`query_objects`.
+        """
+        if "class_name" in kwargs:
+            kwargs["class"] = kwargs.pop("class_name")
+        params = dict(kwargs, count="true", page=1, page_size=1)
+        q = self._request(
+            "GET", url=self.__get_url("objects"), params=params, route="objects"
+        )
+        return q.json_result.get("total")
+
     def query_object(self, oid, format="json"):
         """
         Gets a single object by object id
@@ -88,11 +113,14 @@ class ZTFSearch(Client):
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
 
         """
         q = self._request(
-            "GET", self.__get_url("single_object", oid), result_format=format
+            "GET",
+            self.__get_url("single_object", oid),
+            result_format=format,
+            route="single_object",
         )
         return q.result()
 
@@ -105,11 +133,14 @@ class ZTFSearch(Client):
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
 
         """
         q = self._request(
-            "GET", self.__get_url("lightcurve", oid), result_format=format
+            "GET",
+            self.__get_url("lightcurve", oid),
+            result_format=format,
+            route="lightcurve",
         )
         return q.result()
 
@@ -122,14 +153,17 @@ class ZTFSearch(Client):
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         index : str
             The name of the column to use as index when format is 'pandas'
         sort : str
             The name of the column to sort when format is 'pandas'
         """
         q = self._request(
-            "GET", self.__get_url("detections", oid), result_format=format
+            "GET",
+            self.__get_url("detections", oid),
+            result_format=format,
+            route="detections",
         )
         return q.result(index, sort)
 
@@ -142,10 +176,13 @@ class ZTFSearch(Client):
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         """
         q = self._request(
-            "GET", self.__get_url("non_detections", oid), result_format=format
+            "GET",
+            self.__get_url("non_detections", oid),
+            result_format=format,
+            route="non_detections",
         )
         return q.result(index, sort)
 
@@ -158,20 +195,37 @@ class ZTFSearch(Client):
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         """
+        format = self._validate_format(format)
+        if format in ("arrow", "polars"):
+            # extra_fields are expanded on the records, before building the table
+            records = self.query_forced_photometry(oid, format="json")
+            return ResultJson(
+                records,
+                format=format,
+                float_columns=FLOAT_COLUMNS["forced_photometry"],
+            ).result(index, sort)
         q = self._request(
             "GET",
-            "https://api.alerce.online/v2/lightcurve/forced-photometry/%s" % oid,
+            self.FORCED_PHOTOMETRY_URL % oid,
             result_format=format,
+            route="forced_photometry",
         )
+        return self.expand_forced_photometry(q.result(index, sort), format)
 
-        # NOTA: la api principal de ztf no tiene ruta de forced photometry, la v2 si tiene. Esto es lo mas facil
-        # pero no es correcto.
-
-        # all this extra code is to expand the extra fields.
-        complete_result = q.result(index, sort)
+    @staticmethod
+    def expand_forced_photometry(complete_result, format):
+        """
+        Expands the ``extra_fields`` of forced photometry epochs into columns
 
+        Parameters
+        ----------
+        complete_result : list or DataFrame
+            Forced photometry as returned by the API in the given format
+        format : str
+            Format of ``complete_result``
+        """
         FIELDS_TO_REMOVE = ["extra_fields", "aid", "sid"]
 
         parsed_result = None
@@ -212,9 +266,14 @@ class ZTFSearch(Client):
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         """
-        q = self._request("GET", self.__get_url("magstats", oid), result_format=format)
+        q = self._request(
+            "GET",
+            self.__get_url("magstats", oid),
+            result_format=format,
+            route="magstats",
+        )
         return q.result(index, sort)
 
     def query_probabilities(self, oid, format="json", index=None, sort=None, **kwargs):
@@ -226,13 +285,14 @@ class ZTFSearch(Client):
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         """
         q = self._request(
             "GET",
             self.__get_url("probabilities", oid),
             result_format=format,
             params=kwargs,
+            route="probabilities",
         )
         return q.result(index, sort)
 
@@ -245,9 +305,14 @@ class ZTFSearch(Client):
         oid : str
             The object identifier
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         """
-        q = self._request("GET", self.__get_url("features", oid), result_format=format)
+        q = self._request(
+            "GET",
+            self.__get_url("features", oid),
+            result_format=format,
+            route="features",
+        )
         return q.result(index, sort)
 
     def query_feature(self, oid, name, format="json"):
@@ -261,23 +326,39 @@ class ZTFSearch(Client):
         name : str
             The feature's name
         format : str
-            Return format. Can be one of 'pandas' | 'votable' | 'json'
+            Return format. Can be one of 'pandas' | 'votable' | 'json' | 'arrow' | 'polars'
         """
         q = self._request(
-            "GET", self.__get_url("single_feature", oid, name), result_format=format
+            "GET",
+            self.__get_url("single_feature", oid, name),
+            result_format=format,
+            route="single_feature",
         )
         return q.result()
 
+    def __query_metadata(self, resource, format, *args):
+        format = self._validate_format(format)
+        url = self.__get_url(resource, *args)
+        payload = metadata_cache.get(
+            url, lambda: self._fetch("GET", url, route=resource)
+        )
+        return ResultJson(payload, format=format).result()
+
     def query_classifiers(self, format="json"):
         """
-        Gets all classifiers and their classes
+        Gets all classifiers and their classes.
+
+        The response is memoized for the whole process, see
+        :meth:`invalidate_metadata`.
         """
-        q = self._request("GET", self.__get_url("classifiers"), result_format=format)
-        return q.result()
+        return self.__query_metadata("classifiers", format)
 
     def query_classes(self, classifier_name, classifier_version, format="json"):
         """
-        Gets classes from a specified classifier
+        Gets classes from a specified classifier.
+
+        The response is memoized for the whole process, see
+        :meth:`invalidate_metadata`.
 
         Parameters
         ----------
@@ -287,9 +368,26 @@ class ZTFSearch(Client):
         classifier_version : str
             The classifier's version
         """
-        q = self._request(
-            "GET",
-            self.__get_url("classifier_classes", classifier_name, classifier_version),
-            result_format=format,
+        return self.__query_metadata(
+            "classifier_classes", format, classifier_name, classifier_version
         )
-        return q.result()
+
+    def taxonomy(self):
+        """
+        Index of the classes of each classifier and the classifiers of each
+        class, built once per process from :meth:`query_classifiers`.
+
+        Returns
+        -------
+        alerce.metadata.Taxonomy
+        """
+        url = self.__get_url("classifiers")
+        return metadata_cache.get(
+            url + "#taxonomy",
+            lambda: Taxonomy(self.query_classifiers(format="json")),
+            copy=False,
+        )
+
+    def invalidate_metadata(self):
+        """Drops the memoized classifiers, classes and taxonomy of this API"""
+        metadata_cache.invalidate(self.ztf_url)
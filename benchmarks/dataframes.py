@@ -0,0 +1,45 @@
+"""
+Time and peak memory of building the pandas DataFrame of a detections list
+row by row (``DataFrame(records)``) and by column (``records_to_frame``).
+
+    python benchmarks/dataframes.py [--rows N] [--repeat N]
+"""
+
+import argparse
+import timeit
+import tracemalloc
+
+from pandas import DataFrame
+
+from alerce.utils import FLOAT_COLUMNS, records_to_frame
+from json_decoding import lsst_detections
+
+
+def measure(build, repeat):
+    seconds = min(timeit.repeat(build, number=1, repeat=repeat))
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    records = lsst_detections(args.rows)
+    builders = {
+        "row by row": lambda: DataFrame(records),
+        "columnar": lambda: records_to_frame(records, FLOAT_COLUMNS["detections"]),
+    }
+    print("%d detections with %d keys" % (len(records), len(records[0])))
+    for name, build in builders.items():
+        seconds, peak = measure(build, args.repeat)
+        print("  %-10s %8.1f ms  %7.1f MB peak" % (name, seconds * 1e3, peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Time of each installed JSON decoder on response bodies shaped like those of
+the API: the detections of LSST objects and a ``conesearch_all`` answer.
+
+    python benchmarks/json_decoding.py [--repeat N]
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from alerce.json_decoders import DECODERS, get_decoder
+
+
+def lsst_detections(n=2000):
+    rng = random.Random(0)
+    bands = "ugrizy"
+    return [
+        {
+            "measurement_id": 170000000000000000 + i,
+            "oid": 313953668125294686,
+            "mjd": 60500 + rng.random() * 300,
+            "ra": 150 + rng.random() * 1e-4,
+            "dec": 2 + rng.random() * 1e-4,
+            "band": rng.randrange(6),
+            "band_name": bands[rng.randrange(6)],
+            "psfFlux": rng.gauss(1e4, 2e3),
+            "psfFluxErr": rng.gauss(300, 50),
+            "scienceFlux": rng.gauss(5e4, 1e4),
+            "scienceFluxErr": rng.gauss(400, 60),
+            "isDipole": rng.random() < 0.1,
+            "has_stamp": rng.random() < 0.5,
+            "x": rng.random() * 4000,
+            "y": rng.random() * 4000,
+            "visit": 2024100100000 + i,
+            "detector": rng.randrange(189),
+            "parentDiaSourceId": None,
+            "reliability": rng.random(),
+            "extendedness": rng.random(),
+            "snr": rng.gauss(20, 5),
+        }
+        for i in range(n)
+    ]
+
+
+def conesearch_all(n_catalogs=40, n_rows=300):
+    rng = random.Random(1)
+    catalogs = []
+    for c in range(n_catalogs):
+        columns = {
+            name: {
+                "units": unit,
+                "values": [rng.random() * 100 for _ in range(n_rows)],
+            }
+            for name, unit in [
+                ("RA", "deg"),
+                ("Dec", "deg"),
+                ("Mag_G", "mag"),
+                ("Mag_BP", "mag"),
+                ("Mag_RP", "mag"),
+                ("PMRA", "mas/yr"),
+                ("PMDec", "mas/yr"),
+                ("Plx", "mas"),
+            ]
+        }
+        catalogs.append({"catalog%d" % c: columns})
+    return {"catalogs": catalogs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = {
+        "lsst detections": json.dumps(lsst_detections()).encode(),
+        "conesearch_all": json.dumps(conesearch_all()).encode(),
+    }
+    for label, body in payloads.items():
+        print("%s (%.1f MB)" % (label, len(body) / 1e6))
+        baseline = None
+        for name in reversed(list(DECODERS)):
+            loads = get_decoder(name)
+            seconds = min(
+                timeit.repeat(lambda: loads(body), number=1, repeat=args.repeat)
+            )
+            baseline = baseline or seconds
+            print("  %-9s %8.2f ms  %5.1fx" % (name, seconds * 1e3, baseline / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,12 @@ setup(
     author_email="contact@alerce.online",
     packages=find_packages(),
     install_requires=required_packages,
+    extras_require={
+        "async": ["httpx>=0.23"],
+        "json": ["orjson>=3.6"],
+        "arrow": ["pyarrow>=10"],
+        "polars": ["polars>=0.20"],
+    },
     python_requires=">=3.10",
     include_package_data=True,
     package_data={
@@ -0,0 +1,85 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+
+from alerce.metadata import metadata_cache
+
+
+class LocalServer:
+    """Stand-in HTTP server that answers conditional requests.
+
+    ``routes`` maps a path to a JSON serializable body (or bytes). Responses
+    carry an ``ETag`` and ``Last-Modified`` header unless ``validators`` is
+    False, and a matching ``If-None-Match`` is answered with 304.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.validators = True
+        self.status_code = 200
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                server.requests.append((self.path, dict(self.headers)))
+                if path not in server.routes:
+                    return self._send(404, json.dumps({"detail": "not found"}))
+                if server.status_code != 200:
+                    return self._send(server.status_code, "{}")
+                body = server.routes[path]
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                etag = '"%x"' % (hash(body) & 0xFFFFFFFF)
+                headers = {}
+                if server.validators:
+                    headers["ETag"] = etag
+                    headers["Last-Modified"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._send(304, b"", headers)
+                return self._send(200, body, headers)
+
+            def _send(self, status, body, headers=None):
+                if isinstance(body, str):
+                    body = body.encode()
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def statuses(self):
+        return [headers.get("If-None-Match") for _, headers in self.requests]
+
+
+@pytest.fixture
+def local_server():
+    server = LocalServer()
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def clear_metadata_cache():
+    # memoized metadata outlives clients, keep mocked responses of a test
+    # out of the next one
+    metadata_cache.clear()
+    yield
+    metadata_cache.clear()
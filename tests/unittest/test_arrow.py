@@ -0,0 +1,85 @@
+import sys
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+sys.path.append("..")
+from alerce.core import Alerce
+from alerce.utils import ResultCsv, records_to_arrow
+from catshtm_testcases import CONESEARCH_CATALOG_RESPONSE
+
+alerce = Alerce()
+ZTF_URL = alerce.legacy_ztf_client.ztf_url
+DETECTIONS = [
+    {"candid": 2, "mjd": 59001, "magpsf": 18.5, "band_name": "r"},
+    {"candid": 1, "mjd": 59000, "magpsf": None, "band_name": "g"},
+]
+
+
+def test_query_detections_arrow(requests_mock):
+    requests_mock.get(ZTF_URL + "/objects/oid/detections", json=DETECTIONS)
+    table = alerce.query_detections("oid", survey="ztf", format="arrow")
+    assert isinstance(table, pa.Table)
+    assert table.num_rows == 2
+    assert table.column("candid").to_pylist() == [2, 1]
+    # known float columns stay float even when they hold integers
+    assert table.schema.field("mjd").type == pa.float64()
+    assert table.column("magpsf").null_count == 1
+    frame = table.to_pandas()
+    assert list(frame.columns) == ["candid", "mjd", "magpsf", "band_name"]
+
+
+def test_arrow_index_and_sort(requests_mock):
+    requests_mock.get(ZTF_URL + "/objects/oid/detections", json=DETECTIONS)
+    table = alerce.query_detections(
+        "oid", survey="ztf", format="arrow", index="band_name", sort="mjd"
+    )
+    assert table.column_names[0] == "band_name"
+    assert table.column("candid").to_pylist() == [1, 2]
+
+
+def test_query_objects_arrow(requests_mock):
+    requests_mock.get(
+        ZTF_URL + "/objects",
+        json={"items": [{"oid": "a", "ndet": 3}, {"oid": "b", "ndet": 4}]},
+    )
+    table = alerce.query_objects(survey="ztf", format="arrow")
+    assert table.column("oid").to_pylist() == ["a", "b"]
+
+
+def test_records_to_arrow_irregular():
+    table = records_to_arrow([{"a": 1}, {"a": 2, "b": "x"}])
+    assert table.column_names == ["a", "b"]
+    assert table.column("b").to_pylist() == [None, "x"]
+    assert records_to_arrow([]).num_rows == 0
+
+
+def test_csv_result_arrow():
+    result = ResultCsv(b"oid,ndet\na,3\nb,4\n", format="arrow")
+    table = result.result(sort="ndet")
+    assert table.column("ndet").to_pylist() == [3, 4]
+
+
+def test_forced_photometry_arrow(requests_mock):
+    requests_mock.get(
+        alerce.legacy_ztf_client.FORCED_PHOTOMETRY_URL % "oid",
+        json=[
+            {"mjd": 1, "aid": "x", "sid": "y", "extra_fields": {"procstatus": "0"}},
+        ],
+    )
+    table = alerce.query_forced_photometry("oid", survey="ztf", format="arrow")
+    assert table.column_names == ["mjd", "procstatus"]
+
+
+def test_catshtm_conesearch_arrow(requests_mock):
+    requests_mock.get(
+        alerce.config["CATSHTM_API_URL"]
+        + alerce.config["CATSHTM_ROUTES"]["conesearch"],
+        json=CONESEARCH_CATALOG_RESPONSE,
+    )
+    table = alerce.catshtm_conesearch(1, 1, 10, catalog_name="GAIA/DR1", format="arrow")
+    assert isinstance(table, pa.Table)
+    assert table.num_rows == 9
+    assert table.schema.field("RA").metadata == {b"unit": b"deg"}
+    assert set(table.column("cat_name").to_pylist()) == {"catsHTM_GAIA/DR1"}
@@ -0,0 +1,180 @@
+import asyncio
+import sys
+import pytest
+
+sys.path.append("..")
+from pandas import DataFrame
+from alerce.async_search import AsyncAlerce
+from alerce.exceptions import ObjectNotFoundError, FormatValidationError
+
+httpx = pytest.importorskip("httpx")
+
+
+def make_client(handler, **kwargs):
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncAlerce(http_client=http_client, **kwargs)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_query_objects_ztf():
+    def handler(request):
+        assert request.url.path.endswith("/objects")
+        assert request.url.params["class"] == "SN"
+        return httpx.Response(200, json={"items": [{"oid": "a"}, {"oid": "b"}]})
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.query_objects(
+                survey="ztf", class_name="SN", format="pandas", index="oid"
+            )
+
+    r = run(main())
+    assert isinstance(r, DataFrame)
+    assert list(r.index) == ["a", "b"]
+
+
+def test_query_detections_lsst_band_name():
+    def handler(request):
+        assert request.url.params["survey_id"] == "lsst"
+        return httpx.Response(200, json=[{"mjd": 1, "band": 1, "band_map": {"1": "g"}}])
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.query_detections(123, survey="lsst")
+
+    r = run(main())
+    assert r == [{"mjd": 1, "band": 1, "band_name": "g"}]
+
+
+def test_query_detections_gather_bounded():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handler(request):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json=[{"candid": request.url.path}])
+
+    async def main():
+        async with make_client(handler, max_concurrency=3) as client:
+            return await asyncio.gather(
+                *[client.query_detections("oid%d" % i, survey="ztf") for i in range(12)]
+            )
+
+    r = run(main())
+    assert len(r) == 12
+    assert max_in_flight <= 3
+
+
+def test_query_object_not_found():
+    def handler(request):
+        return httpx.Response(404, json={"detail": "not found"})
+
+    async def main():
+        async with make_client(handler) as client:
+            await client.query_object("oid", survey="ztf")
+
+    with pytest.raises(ObjectNotFoundError):
+        run(main())
+
+
+def test_query_format_error():
+    async def main():
+        async with make_client(lambda request: httpx.Response(200)) as client:
+            await client.query_object("oid", survey="ztf", format="bad")
+
+    with pytest.raises(FormatValidationError):
+        run(main())
+
+
+def test_query_magstats_lsst_not_implemented():
+    async def main():
+        async with make_client(lambda request: httpx.Response(200)) as client:
+            await client.query_magstats("oid", survey="lsst")
+
+    with pytest.raises(NotImplementedError):
+        run(main())
+
+
+def test_query_detections_arrow():
+    pa = pytest.importorskip("pyarrow")
+
+    def handler(request):
+        return httpx.Response(
+            200, json=[{"candid": 2, "mjd": 2}, {"candid": 1, "mjd": 1}]
+        )
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.query_detections(
+                "oid", survey="ztf", format="arrow", sort="mjd"
+            )
+
+    r = run(main())
+    assert isinstance(r, pa.Table)
+    assert r.column("candid").to_pylist() == [1, 2]
+    # float columns of the route, as with the sync client
+    assert r.schema.field("mjd").type == pa.float64()
+
+
+def test_query_forced_photometry_arrow():
+    pytest.importorskip("pyarrow")
+
+    def handler(request):
+        return httpx.Response(
+            200,
+            json=[{"mjd": 1, "aid": "x", "extra_fields": {"procstatus": "0"}}],
+        )
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.query_forced_photometry(
+                "oid", survey="ztf", format="arrow"
+            )
+
+    assert run(main()).column_names == ["mjd", "procstatus"]
+
+
+def test_query_objects_polars():
+    pl = pytest.importorskip("polars")
+
+    def handler(request):
+        return httpx.Response(
+            200, json={"items": [{"oid": "b", "meanra": 2}, {"oid": "a", "meanra": 1}]}
+        )
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.query_objects(
+                survey="ztf", format="polars", index="meanra", sort="oid"
+            )
+
+    r = run(main())
+    assert isinstance(r, pl.DataFrame)
+    assert r.columns == ["meanra", "oid"]
+    assert r["oid"].to_list() == ["a", "b"]
+    assert r.schema["meanra"] == pl.Float64
+
+
+def test_query_forced_photometry_polars():
+    pytest.importorskip("polars")
+
+    def handler(request):
+        return httpx.Response(
+            200,
+            json=[{"mjd": 1, "aid": "x", "extra_fields": {"procstatus": "0"}}],
+        )
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.query_forced_photometry(
+                "oid", survey="ztf", format="polars"
+            )
+
+    assert run(main()).columns == ["mjd", "procstatus"]
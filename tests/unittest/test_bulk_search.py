@@ -0,0 +1,200 @@
+import sys
+import time
+import pytest
+from pandas import DataFrame
+
+sys.path.append("..")
+from alerce.core import Alerce
+
+alerce = Alerce()
+ZTF_URL = alerce.legacy_ztf_client.ztf_url
+
+
+def register_detections(requests_mock, oid):
+    requests_mock.get(
+        ZTF_URL + "/objects/%s/detections" % oid,
+        json=[{"candid": "%s_1" % oid, "mjd": 1}, {"candid": "%s_2" % oid, "mjd": 2}],
+    )
+
+
+def test_query_detections_many(requests_mock):
+    oids = ["oid%d" % i for i in range(10)]
+    for oid in oids:
+        register_detections(requests_mock, oid)
+    r = alerce.query_detections_many(oids, survey="ztf", max_workers=4)
+    assert isinstance(r, DataFrame)
+    assert len(r) == 20
+    assert list(r.oid.drop_duplicates()) == oids
+    assert list(r.candid[:2]) == ["oid0_1", "oid0_2"]
+
+
+def test_query_detections_many_collects_errors(requests_mock):
+    register_detections(requests_mock, "ok")
+    requests_mock.get(
+        ZTF_URL + "/objects/missing/detections",
+        json={"detail": "not found"},
+        status_code=404,
+    )
+    with pytest.warns(RuntimeWarning):
+        r, errors = alerce.query_detections_many(
+            ["missing", "ok"], survey="ztf", return_errors=True
+        )
+    assert list(r.oid.unique()) == ["ok"]
+    assert list(errors) == ["missing"]
+
+
+def test_query_detections_many_json(requests_mock):
+    register_detections(requests_mock, "a")
+    r = alerce.query_detections_many(["a"], survey="ztf", format="json")
+    assert r == [
+        {"candid": "a_1", "mjd": 1, "oid": "a"},
+        {"candid": "a_2", "mjd": 2, "oid": "a"},
+    ]
+
+
+def test_query_lightcurve_many(requests_mock):
+    for oid in ["a", "b"]:
+        requests_mock.get(
+            ZTF_URL + "/objects/%s/lightcurve" % oid,
+            json={"detections": [{"mjd": 1}], "non_detections": [{"mjd": 0}]},
+        )
+    r = alerce.query_lightcurve_many(["a", "b"], survey="ztf")
+    assert list(r["detections"].oid) == ["a", "b"]
+    assert list(r["non_detections"].oid) == ["a", "b"]
+
+
+def test_query_many_invalid_survey():
+    with pytest.raises(ValueError):
+        alerce.query_probabilities_many(["a"], survey="other")
+
+
+def register_object_pages(requests_mock, total, page_size):
+    def callback(request, context):
+        page = int(request.qs["page"][0])
+        start = (page - 1) * page_size
+        stop = min(start + page_size, total)
+        return {"items": [{"oid": "oid%d" % i} for i in range(start, stop)]}
+
+    requests_mock.get(ZTF_URL + "/objects", json=callback)
+
+
+def test_iter_objects_pages(requests_mock):
+    register_object_pages(requests_mock, total=25, page_size=10)
+    pages = list(alerce.iter_objects(survey="ztf", page_size=10, prefetch=2))
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert all(isinstance(page, DataFrame) for page in pages)
+    assert pages[0].oid.iloc[0] == "oid0"
+    assert pages[-1].oid.iloc[-1] == "oid24"
+
+
+def test_iter_objects_rows(requests_mock):
+    register_object_pages(requests_mock, total=20, page_size=10)
+    rows = list(alerce.iter_objects(survey="ztf", page_size=10, rows=True))
+    assert [row["oid"] for row in rows] == ["oid%d" % i for i in range(20)]
+
+
+def test_iter_objects_max_pages(requests_mock):
+    register_object_pages(requests_mock, total=100, page_size=10)
+    pages = list(
+        alerce.iter_objects(survey="ztf", page_size=10, max_pages=3, format="json")
+    )
+    assert len(pages) == 3
+    assert pages[2][0]["oid"] == "oid20"
+
+
+def test_iter_objects_capped_page_size(requests_mock):
+    # the server serves at most 4 objects per page whatever is asked for
+    register_object_pages(requests_mock, total=10, page_size=4)
+    pages = list(alerce.iter_objects(survey="ztf", page_size=10, format="json"))
+    assert [len(page) for page in pages] == [4, 4, 2]
+
+
+def test_iter_objects_stops_at_total(requests_mock):
+    requested = []
+
+    def callback(request, context):
+        page = int(request.qs["page"][0])
+        requested.append(page)
+        start = (page - 1) * 10
+        return {
+            "total": 15,
+            "items": [{"oid": "oid%d" % i} for i in range(start, min(start + 10, 15))],
+        }
+
+    requests_mock.get(ZTF_URL + "/objects", json=callback)
+    pages = list(
+        alerce.iter_objects(survey="ztf", page_size=10, prefetch=0, format="json")
+    )
+    assert [len(page) for page in pages] == [10, 5]
+    assert requested == [1, 2]
+
+
+def test_iter_objects_close_waits_for_prefetch(requests_mock):
+    running = []
+
+    def callback(request, context):
+        running.append(request)
+        time.sleep(0.05)
+        running.remove(request)
+        return {"items": [{"oid": "oid"}]}
+
+    requests_mock.get(ZTF_URL + "/objects", json=callback)
+    pages = alerce.iter_objects(survey="ztf", page_size=1, prefetch=3, format="json")
+    next(pages)
+    pages.close()
+    assert running == []
+
+
+def test_query_objects_all(requests_mock):
+    oids = ["oid%d" % i for i in range(23)]
+
+    def callback(request, context):
+        if "count" in request.qs:
+            return {"total": len(oids), "items": []}
+        page = int(request.qs["page"][0])
+        page_size = int(request.qs["page_size"][0])
+        # simulate an object shifting into the previous page boundary
+        start = max((page - 1) * page_size - 1, 0)
+        return {"items": [{"oid": oid} for oid in oids[start : page * page_size]]}
+
+    requests_mock.get(ZTF_URL + "/objects", json=callback)
+    r = alerce.query_objects_all(survey="ztf", page_size=10, max_workers=3)
+    assert list(r.oid) == oids
+
+
+def test_query_objects_all_capped_page_size(requests_mock):
+    def callback(request, context):
+        if "count" in request.qs:
+            return {"total": 25, "items": []}
+        # the server serves at most 4 objects per page
+        start = (int(request.qs["page"][0]) - 1) * 4
+        return {
+            "items": [{"oid": "oid%d" % i} for i in range(start, min(start + 4, 25))]
+        }
+
+    requests_mock.get(ZTF_URL + "/objects", json=callback)
+    r = alerce.query_objects_all(survey="ztf", page_size=10, format="json")
+    assert [item["oid"] for item in r] == ["oid%d" % i for i in range(25)]
+
+
+def test_query_objects_all_without_total(requests_mock):
+    register_object_pages(requests_mock, total=15, page_size=10)
+    r = alerce.query_objects_all(survey="ztf", page_size=10, format="json")
+    assert len(r) == 15
+
+
+def test_bulk_dtypes_match_single_queries(requests_mock):
+    requests_mock.get(
+        ZTF_URL + "/objects/a/detections",
+        json=[{"candid": 1, "mjd": 1, "magpsf_corr": None}],
+    )
+    requests_mock.get(
+        ZTF_URL + "/objects/a/lightcurve",
+        json={"detections": [{"mjd": 1, "magpsf_corr": None}], "non_detections": []},
+    )
+    single = alerce.query_detections("a", survey="ztf", format="pandas")
+    bulk = alerce.query_detections_many(["a"], survey="ztf")
+    assert bulk.mjd.dtype == single.mjd.dtype == "float64"
+    assert bulk.magpsf_corr.dtype == single.magpsf_corr.dtype == "float64"
+    lightcurves = alerce.query_lightcurve_many(["a"], survey="ztf")
+    assert lightcurves["detections"].magpsf_corr.dtype == "float64"
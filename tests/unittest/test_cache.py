@@ -0,0 +1,518 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+import pytest
+
+sys.path.append("..")
+from alerce.cache import (
+    CacheEntry,
+    LRUResponseCache,
+    MemoryResponseCache,
+    SQLiteResponseCache,
+    TieredResponseCache,
+    estimate_size,
+)
+from alerce.core import Alerce
+from alerce.exceptions import APIError, ObjectNotFoundError, StaleResultWarning
+from alerce.retry import RetryPolicy
+from alerce.transport import Transport
+from alerce.utils import Client
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(__file__), "../examples/example.fits.gz")
+
+
+def make_client(server, **kwargs):
+    transport = Transport(cache=MemoryResponseCache(), **kwargs)
+    return Client(transport=transport)
+
+
+def test_revalidation_304(local_server):
+    local_server.routes["/objects/oid/lightcurve"] = {"detections": [{"mjd": 1}]}
+    client = make_client(local_server, json_decoder="json")
+    url = local_server.url + "/objects/oid/lightcurve"
+
+    first = client._request("GET", url).result()
+    loads = client.transport.loads
+    with patch.object(client.transport, "loads", wraps=loads) as loads:
+        second = client._request("GET", url).result()
+        third = client._request("GET", url).result()
+    assert first == second == third == {"detections": [{"mjd": 1}]}
+    # the payload decoded with the first 304 is reused for the next ones
+    assert loads.call_count == 1
+    (_, h1), (_, h2), (_, h3) = local_server.requests
+    assert "If-None-Match" not in h1
+    assert h2["If-None-Match"] == h3["If-None-Match"]
+    assert h2["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+
+
+def test_revalidation_changed_body(local_server):
+    local_server.routes["/probabilities"] = [{"probability": 0.1}]
+    client = make_client(local_server)
+    url = local_server.url + "/probabilities"
+    assert client._request("GET", url).result() == [{"probability": 0.1}]
+    local_server.routes["/probabilities"] = [{"probability": 0.9}]
+    assert client._request("GET", url).result() == [{"probability": 0.9}]
+    assert client._request("GET", url).result() == [{"probability": 0.9}]
+
+
+def test_cached_payload_not_shared(local_server):
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    client = make_client(local_server)
+    url = local_server.url + "/detections"
+    client._request("GET", url).result()
+    client._request("GET", url).result()[0]["mjd"] = 100
+    assert client._request("GET", url).result() == [{"mjd": 1}]
+
+
+def test_no_validators_not_cached(local_server):
+    local_server.validators = False
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    client = make_client(local_server)
+    url = local_server.url + "/detections"
+    client._request("GET", url)
+    client._request("GET", url)
+    assert len(client.transport.cache) == 0
+    assert local_server.statuses() == [None, None]
+
+
+def test_errors_not_cached(local_server):
+    client = make_client(local_server)
+    with pytest.raises(ObjectNotFoundError):
+        client._request("GET", local_server.url + "/missing")
+    assert len(client.transport.cache) == 0
+
+
+def test_cache_shared_by_sub_clients(local_server):
+    transport = Transport(cache=MemoryResponseCache(ttls={}))
+    alerce = Alerce(transport=transport)
+    local_server.routes["/objects/oid/detections"] = [{"candid": 1}]
+    alerce.legacy_ztf_client.config["ZTF_API_URL"] = local_server.url
+    alerce.legacy_stamps_client.search_client.config["ZTF_API_URL"] = local_server.url
+    alerce.query_detections("oid", survey="ztf")
+    alerce.legacy_stamps_client.search_client.query_detections("oid")
+    assert local_server.statuses()[1] is not None
+
+
+@pytest.mark.filterwarnings("ignore:Keyword name")
+def test_stamp_revalidation(local_server):
+    with open(EXAMPLE_PATH, "rb") as f:
+        local_server.routes["/get_stamp"] = f.read()
+    alerce = Alerce(transport=Transport(cache=MemoryResponseCache(ttls={})))
+    alerce.legacy_stamps_client.config["AVRO_URL"] = local_server.url
+    for _ in range(2):
+        alerce.get_stamps(oid="ZTF18abjpdlh", candid=1, survey="ztf")
+    assert local_server.statuses()[:3] == [None, None, None]
+    assert all(local_server.statuses()[3:])
+
+
+def test_fresh_entry_not_requested(local_server):
+    local_server.validators = False
+    local_server.routes["/classifiers"] = [{"classifier_name": "stamp"}]
+    client = make_client(local_server)
+    url = local_server.url + "/classifiers"
+    for _ in range(3):
+        result = client._request("GET", url, route="classifiers").result()
+        assert result == [{"classifier_name": "stamp"}]
+    assert len(local_server.requests) == 1
+
+
+def test_expired_entry_revalidated(local_server):
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    transport = Transport(cache=MemoryResponseCache(ttls={"detections": 60}))
+    client = Client(transport=transport)
+    url = local_server.url + "/detections"
+    client._request("GET", url, route="detections")
+    client._request("GET", url, route="detections")
+    assert len(local_server.requests) == 1
+    for key in list(transport.cache._entries):
+        transport.cache._entries[key].stored_at -= 61
+    client._request("GET", url, route="detections")
+    client._request("GET", url, route="detections")
+    # revalidated once, then fresh again
+    first, second = local_server.statuses()
+    assert first is None and second is not None
+
+
+def expire(cache, seconds):
+    for entry in cache._entries.values():
+        entry.stored_at -= seconds
+
+
+def test_stale_while_revalidate(local_server):
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    cache = MemoryResponseCache(ttls={"detections": 60}, stale_while_revalidate=60)
+    client = Client(transport=Transport(cache=cache))
+    url = local_server.url + "/detections"
+    client._request("GET", url, route="detections")
+    local_server.routes["/detections"] = [{"mjd": 1}, {"mjd": 2}]
+    expire(cache, 90)
+    # the stale copy is answered at once and refreshed in the background
+    assert client._request("GET", url, route="detections").result() == [{"mjd": 1}]
+    deadline = time.monotonic() + 5
+    while client.transport._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert client._request("GET", url, route="detections").result() == [
+        {"mjd": 1},
+        {"mjd": 2},
+    ]
+    assert len(local_server.requests) == 2
+    assert client.transport.stats["refreshes"] == 1
+
+
+def test_stale_while_revalidate_window(local_server):
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    cache = MemoryResponseCache(ttls={"detections": 60}, stale_while_revalidate=60)
+    client = Client(transport=Transport(cache=cache))
+    url = local_server.url + "/detections"
+    client._request("GET", url, route="detections")
+    expire(cache, 150)
+    client._request("GET", url, route="detections")
+    # too old to be served, revalidated before answering
+    assert "refreshes" not in client.transport.stats
+    assert len(local_server.requests) == 2
+
+
+def test_stale_if_error(local_server):
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    cache = MemoryResponseCache(ttls={"detections": 60}, stale_if_error=3600)
+    transport = Transport(cache=cache, retry=RetryPolicy(total=0))
+    client = Client(transport=transport)
+    url = local_server.url + "/detections"
+    client._request("GET", url, route="detections")
+    expire(cache, 90)
+    local_server.status_code = 503
+    with pytest.warns(StaleResultWarning, match="status code 503"):
+        result = client._request("GET", url, route="detections").result()
+    assert result == [{"mjd": 1}]
+    expire(cache, 3600)
+    with pytest.raises(APIError):
+        client._request("GET", url, route="detections")
+
+
+def test_stale_if_error_connection_error(local_server):
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    cache = MemoryResponseCache(stale_if_error=3600)
+    transport = Transport(cache=cache, retry=RetryPolicy(total=0))
+    client = Client(transport=transport)
+    url = local_server.url + "/detections"
+    client._request("GET", url, route="detections")
+    expire(cache, 3000)
+    local_server.httpd.shutdown()
+    local_server.httpd.server_close()
+    with pytest.warns(StaleResultWarning, match="ConnectionError"):
+        result = client._request("GET", url, route="detections").result()
+    assert result == [{"mjd": 1}]
+
+
+def test_stale_if_error_not_on_client_errors(local_server):
+    local_server.routes["/objects/oid"] = {"oid": "oid"}
+    cache = MemoryResponseCache(stale_if_error=3600)
+    client = Client(transport=Transport(cache=cache))
+    url = local_server.url + "/objects/oid"
+    client._request("GET", url)
+    del local_server.routes["/objects/oid"]
+    with pytest.raises(ObjectNotFoundError):
+        client._request("GET", url)
+
+
+def test_cache_stats(local_server):
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    local_server.routes["/classifiers"] = [{"classifier_name": "stamp"}]
+    cache = MemoryResponseCache(ttls={"classifiers": 60})
+    client = Client(transport=Transport(cache=cache))
+    for _ in range(3):
+        client._request("GET", local_server.url + "/detections", route="detections")
+        client._request("GET", local_server.url + "/classifiers", route="classifiers")
+    stats = client.transport.cache_stats["cache"]
+    body = len(json.dumps([{"mjd": 1}]))
+    detections = stats["routes"]["detections"]
+    # downloaded once, then revalidated
+    assert detections["misses"] == 1 and detections["hits"] == 2
+    assert detections["revalidated"] == 2
+    assert detections["bytes_network"] == body
+    assert detections["bytes_cached"] == 2 * body
+    classifiers = stats["routes"]["classifiers"]
+    assert classifiers["hits"] == 2 and classifiers["revalidated"] == 0
+    assert stats["hits"] == 4 and stats["misses"] == 2
+    assert stats["hit_ratio"] == pytest.approx(4 / 6)
+
+    client.transport.reset_cache_stats()
+    stats = cache.stats
+    assert stats["hits"] == 0 and stats["routes"] == {}
+    assert stats["hit_ratio"] is None
+
+
+def test_stale_stats(local_server):
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    cache = MemoryResponseCache(stale_while_revalidate=60)
+    client = Client(transport=Transport(cache=cache))
+    url = local_server.url + "/detections"
+    client._request("GET", url, route="objects")
+    client._request("GET", url, route="objects")
+    deadline = time.monotonic() + 5
+    while client.transport._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = cache.stats
+    # the background revalidation is not a hit of its own
+    assert stats["hits"] == 1 and stats["stale"] == 1 and stats["misses"] == 1
+    assert stats["revalidated"] == 1
+
+
+def test_sqlite_cache_persists(local_server, tmp_path):
+    local_server.routes["/lightcurve"] = {"detections": [{"mjd": 1}]}
+    url = local_server.url + "/lightcurve"
+    path = str(tmp_path / "responses.sqlite")
+    cache = SQLiteResponseCache(path, ttls={"lightcurve": 600})
+    Client(transport=Transport(cache=cache))._request("GET", url, route="lightcurve")
+    cache.close()
+
+    client = Client(transport=Transport(cache=SQLiteResponseCache(path)))
+    result = client._request("GET", url, route="lightcurve").result()
+    assert result == {"detections": [{"mjd": 1}]}
+    assert len(local_server.requests) == 1
+    # without a TTL the persisted entry is revalidated
+    client._request("GET", url).result()
+    first, second = local_server.statuses()
+    assert first is None and second is not None
+
+
+@patch("alerce.cache.ACCESS_RESOLUTION", 0)
+def test_sqlite_cache_lru_eviction(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite"), max_bytes=30)
+    cache.set("a", CacheEntry(b"0123456789"))
+    cache.set("b", CacheEntry(b"0123456789"))
+    cache.set("c", CacheEntry(b"0123456789"))
+    assert cache.get("a").body == b"0123456789"
+    cache.set("d", CacheEntry(b"0123456789"))
+    # evicted down to 90% of the cap
+    assert cache.get("b") is None and cache.get("c") is None
+    assert cache.get("a") is not None
+    assert cache.size() == 20
+    # bodies larger than the cap are never stored
+    cache.set("e", CacheEntry(b"x" * 31))
+    assert cache.get("e") is None
+    assert len(cache) == 2
+
+
+def test_sqlite_cache_running_total(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    cache = SQLiteResponseCache(path)
+    cache.set("a", CacheEntry(b"x" * 10))
+    cache.set("b", CacheEntry(b"x" * 10))
+    cache.set("a", CacheEntry(b"x" * 25))
+    cache.delete("b")
+    assert cache._total == cache.size() == 25
+    # loaded when opened
+    assert SQLiteResponseCache(path)._total == 25
+    cache.clear()
+    assert cache._total == 0
+
+
+def test_sqlite_cache_recent_access_not_written(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite"))
+    cache.set("a", CacheEntry(b"body"))
+    (accessed_at,) = (
+        cache._connection()
+        .execute("SELECT accessed_at FROM responses WHERE key = 'a'")
+        .fetchone()
+    )
+    with patch("alerce.cache.time.time", return_value=accessed_at + 30):
+        cache.get("a")
+    assert cache._connection().total_changes == 1
+    with patch("alerce.cache.time.time", return_value=accessed_at + 120):
+        cache.get("a")
+    assert cache._connection().total_changes == 2
+
+
+def test_sqlite_cache_threads(tmp_path):
+    cache = SQLiteResponseCache(str(tmp_path / "responses.sqlite"))
+
+    def work(n):
+        for i in range(20):
+            key = "%d-%d" % (n, i)
+            cache.set(key, CacheEntry(key.encode(), etag=key))
+            assert cache.get(key).etag == key
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8)))
+    assert len(cache) == 160
+    cache.clear()
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_sqlite_cache_from_config(tmp_path, monkeypatch):
+    config = {
+        "transport": {
+            "CACHE": {
+                "PATH": str(tmp_path / "responses.sqlite"),
+                "TTLS": {"lightcurve": 5},
+                "MAX_BYTES": 1024,
+            }
+        }
+    }
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(config))
+    monkeypatch.setenv("ALERCE_CONFIG_PATH", str(config_path))
+    cache = Transport.from_config().cache
+    assert isinstance(cache, SQLiteResponseCache)
+    assert cache.ttl("lightcurve") == 5
+    assert cache.ttl("classifiers") == 0
+    assert cache.max_bytes == 1024
+
+
+def test_estimate_size():
+    small = estimate_size([{"mjd": 1.0}])
+    large = estimate_size([{"mjd": 1.0, "candid": "x" * 100}] * 100)
+    assert 0 < small < large
+    assert large > 100 * 100
+    # long lists are estimated from a sample of their items
+    records = [{"mjd": float(i), "candid": "x" * (i % 50)} for i in range(10000)]
+    full = sum(estimate_size(record) for record in records)
+    assert abs(estimate_size(records) - full) < 0.05 * full
+
+
+def test_lru_evicts_by_size():
+    cache = LRUResponseCache(max_bytes=10000)
+    for key in "abc":
+        cache.set(key, CacheEntry(b"x" * 3000))
+    cache.get("a")
+    cache.set("d", CacheEntry(b"x" * 3000))
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.size() <= 10000
+    entry = cache.get("a")
+    entry.payload = [{"field": "y" * 3000}]
+    cache.resized("a", entry)
+    assert len(cache) == 2 and cache.get("a") is entry
+    cache.set("huge", CacheEntry(b"x" * 20000))
+    assert cache.get("huge") is None
+    cache.clear()
+    assert cache.size() == 0 and len(cache) == 0
+
+
+def test_lru_serves_decoded_results(requests_mock):
+    cache = LRUResponseCache(keep_frames=True)
+    alerce = Alerce(transport=Transport(cache=cache, json_decoder="json"))
+    url = alerce.legacy_ztf_client.ztf_url + "/objects/oid/detections"
+    adapter = requests_mock.get(
+        url, json=[{"candid": 2, "mjd": 2}, {"candid": 1, "mjd": 1}]
+    )
+    first = alerce.query_detections("oid", survey="ztf", format="pandas", sort="mjd")
+    first["mjd"] = 0
+    loads = alerce.transport.loads
+    with patch.object(alerce.transport, "loads", wraps=loads) as loads:
+        with patch("alerce.utils.DataFrame") as frame:
+            second = alerce.query_detections(
+                "oid", survey="ztf", format="pandas", sort="mjd"
+            )
+        assert frame.call_count == 0
+        assert list(second.mjd) == [1, 2]
+        assert alerce.query_detections("oid", survey="ztf") == [
+            {"candid": 2, "mjd": 2},
+            {"candid": 1, "mjd": 1},
+        ]
+    assert adapter.call_count == 1
+    assert loads.call_count == 0
+
+
+def test_fast_decoder_payload_not_kept(requests_mock):
+    pytest.importorskip("orjson")
+    cache = LRUResponseCache()
+    alerce = Alerce(transport=Transport(cache=cache, json_decoder="orjson"))
+    url = alerce.legacy_ztf_client.ztf_url + "/objects/oid/detections"
+    requests_mock.get(url, json=[{"candid": 1, "mjd": 1}])
+    alerce.query_detections("oid", survey="ztf", format="pandas")
+    with patch("alerce.utils.copy_json") as copy_json:
+        first = alerce.query_detections("oid", survey="ztf")
+    # decoding the body again is faster than copying a kept payload
+    assert copy_json.call_count == 0
+    first[0]["mjd"] = 100
+    assert alerce.query_detections("oid", survey="ztf") == [{"candid": 1, "mjd": 1}]
+    (entry,) = cache._entries.values()
+    assert entry.payload is None
+
+
+def test_lru_sizes_payload_once():
+    cache = LRUResponseCache()
+    entry = CacheEntry(b"[]", payload=[{"mjd": 1.0}] * 1000)
+    with patch("alerce.cache.estimate_size", return_value=1000) as estimate:
+        cache.set("a", entry)
+        cache.touch("a", entry)
+        cache.resized("a", entry)
+    assert estimate.call_count == 1
+
+
+def test_eviction_stats(tmp_path):
+    memory = LRUResponseCache(max_bytes=2000)
+    persistent = SQLiteResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=1500)
+    cache = TieredResponseCache(memory, persistent)
+    for i in range(4):
+        cache.set("key%d" % i, CacheEntry(b"x" * 700))
+    assert memory.stats["evictions"] == 2
+    assert persistent.stats["evictions"] == 2
+    assert cache.stats["evictions"] == 4
+    cache.reset_stats()
+    assert cache.stats["evictions"] == 0
+    persistent.close()
+
+
+def test_tiered_cache(local_server, tmp_path):
+    local_server.validators = False
+    local_server.routes["/detections"] = [{"mjd": 1}]
+    url = local_server.url + "/detections"
+    path = str(tmp_path / "responses.sqlite")
+
+    def make_cache():
+        return TieredResponseCache(
+            LRUResponseCache(), SQLiteResponseCache(path, ttls={"detections": 60})
+        )
+
+    Client(transport=Transport(cache=make_cache()))._request(
+        "GET", url, route="detections"
+    )
+    cache = make_cache()
+    client = Client(transport=Transport(cache=cache))
+    for _ in range(2):
+        assert client._request("GET", url, route="detections").result() == [{"mjd": 1}]
+    assert len(local_server.requests) == 1
+    assert len(cache.memory) == 1
+    assert cache.ttl("detections") == 60
+
+
+def test_memory_cache_from_config(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        json.dumps(
+            {
+                "transport": {
+                    "CACHE": {"PATH": str(tmp_path / "responses.sqlite")},
+                    "MEMORY_CACHE": {"MAX_BYTES": 1024, "KEEP_FRAMES": True},
+                }
+            }
+        )
+    )
+    monkeypatch.setenv("ALERCE_CONFIG_PATH", str(config_path))
+    cache = Transport.from_config().cache
+    assert isinstance(cache, TieredResponseCache)
+    assert cache.memory.max_bytes == 1024 and cache.memory.keep_frames
+    assert isinstance(cache.persistent, SQLiteResponseCache)
+
+
+@pytest.mark.parametrize("cache", [MemoryResponseCache, LRUResponseCache])
+def test_multisurvey_band_names_keep_cached_payload(requests_mock, cache):
+    alerce = Alerce(
+        transport=Transport(cache=cache(default_ttl=60), json_decoder="json")
+    )
+    client = alerce.multisurvey_client
+    adapter = requests_mock.get(
+        client._get_survey_url("detections"),
+        json=[{"mjd": 1, "band": 1, "band_map": {"1": "g"}}],
+    )
+    for format in ("pandas", "pandas", "json"):
+        r = alerce.query_detections("oid", survey="lsst", format=format)
+    assert r == [{"mjd": 1, "band": 1, "band_name": "g"}]
+    assert adapter.call_count == 1
@@ -0,0 +1,179 @@
+import sys
+
+import pytest
+
+sys.path.append("..")
+from alerce.cone_cache import ConeCache, angular_distance
+from alerce.core import Alerce
+from alerce.transport import Transport
+from catshtm_testcases import CONESEARCH_ALL_RESPONSE, CONESEARCH_CATALOG_RESPONSE
+
+RA, DEC = 357.73373, 14.20514
+
+
+def make_alerce(requests_mock, route, response, **kwargs):
+    alerce = Alerce(transport=Transport(cone_cache=ConeCache(**kwargs)))
+    adapter = requests_mock.get(
+        alerce.config["CATSHTM_API_URL"] + alerce.config["CATSHTM_ROUTES"][route],
+        json=response,
+    )
+    return alerce, adapter
+
+
+def test_angular_distance():
+    assert angular_distance(10, 0, 10, 1) == pytest.approx(3600)
+    assert angular_distance(0, 89, 180, 89) == pytest.approx(7200)
+    assert angular_distance(359.9, 0, 0.1, 0) == pytest.approx(720)
+
+
+def test_contained_conesearch_served_locally(requests_mock):
+    alerce, adapter = make_alerce(
+        requests_mock, "conesearch", CONESEARCH_CATALOG_RESPONSE
+    )
+    full = alerce.catshtm_conesearch(
+        RA, DEC, 100, catalog_name="GAIA/DR1", format="votable"
+    )
+    assert len(full) == 9
+    inner = alerce.catshtm_conesearch(
+        RA, DEC, 10, catalog_name="GAIA/DR1", format="votable"
+    )
+    assert adapter.call_count == 1
+    distance = angular_distance(RA, DEC, full["RA"], full["Dec"])
+    assert len(inner) == (distance <= 10).sum()
+    # a cone reaching outside the recorded one goes to the server
+    alerce.catshtm_conesearch(RA + 0.03, DEC, 10, catalog_name="GAIA/DR1")
+    assert adapter.call_count == 2
+
+
+def test_empty_contained_conesearch(requests_mock):
+    alerce, adapter = make_alerce(
+        requests_mock, "conesearch", CONESEARCH_CATALOG_RESPONSE
+    )
+    alerce.catshtm_conesearch(RA, DEC, 100, catalog_name="GAIA/DR1")
+    assert alerce.catshtm_conesearch(RA, DEC + 0.02, 1, catalog_name="GAIA/DR1") is None
+    assert adapter.call_count == 1
+
+
+def test_regions_per_catalog(requests_mock):
+    alerce, adapter = make_alerce(
+        requests_mock, "conesearch", CONESEARCH_CATALOG_RESPONSE
+    )
+    alerce.catshtm_conesearch(RA, DEC, 100, catalog_name="GAIA/DR1")
+    alerce.catshtm_conesearch(RA, DEC, 10, catalog_name="2MASS")
+    assert adapter.call_count == 2
+
+
+def test_prefetch_radius(requests_mock):
+    alerce, adapter = make_alerce(
+        requests_mock, "conesearch", CONESEARCH_CATALOG_RESPONSE, prefetch_radius=60
+    )
+    r = alerce.catshtm_conesearch(RA, DEC, 5, catalog_name="GAIA/DR1", format="votable")
+    assert adapter.last_request.qs["radius"] == ["60.000000"]
+    assert len(r) == 1
+    alerce.catshtm_conesearch(RA + 0.001, DEC, 5, catalog_name="GAIA/DR1")
+    assert adapter.call_count == 1
+
+
+def test_conesearch_all(requests_mock):
+    alerce, adapter = make_alerce(
+        requests_mock, "conesearch_all", CONESEARCH_ALL_RESPONSE
+    )
+    full = alerce.catshtm_conesearch(RA, DEC, 100, catalog_name="all", format="votable")
+    inner = alerce.catshtm_conesearch(RA, DEC, 5, catalog_name="all", format="votable")
+    assert adapter.call_count == 1
+    assert set(inner) <= set(full)
+    for name, table in inner.items():
+        assert len(table) <= len(full[name])
+
+
+def test_crossmatch_from_cone(requests_mock):
+    alerce, cone = make_alerce(
+        requests_mock, "conesearch", CONESEARCH_CATALOG_RESPONSE, prefetch_radius=100
+    )
+    crossmatch = requests_mock.get(
+        alerce.config["CATSHTM_API_URL"] + alerce.config["CATSHTM_ROUTES"]["crossmatch"]
+    )
+    r = alerce.catshtm_crossmatch(RA, DEC, 5, catalog_name="GAIA/DR1")
+    assert r.Dec == pytest.approx(14.20512820647999)
+    assert r.cat_name == "catsHTM_GAIA/DR1"
+    assert cone.call_count == 1 and crossmatch.call_count == 0
+
+
+def test_crossmatch_without_counterpart_in_cone(requests_mock):
+    alerce, cone = make_alerce(
+        requests_mock, "conesearch", CONESEARCH_CATALOG_RESPONSE, prefetch_radius=100
+    )
+    crossmatch = requests_mock.get(
+        alerce.config["CATSHTM_API_URL"]
+        + alerce.config["CATSHTM_ROUTES"]["crossmatch"],
+        json={},
+    )
+    alerce.catshtm_crossmatch(RA, DEC, 5, catalog_name="GAIA/DR1")
+    # inside the recorded cone, no row within 1 arcsec
+    local = alerce.catshtm_crossmatch(RA, DEC + 0.02, 1, catalog_name="GAIA/DR1")
+    assert cone.call_count == 1 and crossmatch.call_count == 0
+    # shaped like the answer of the server
+    remote = Alerce().catshtm_crossmatch(RA, DEC + 0.02, 1, catalog_name="GAIA/DR1")
+    assert crossmatch.call_count == 1
+    assert local.equals(remote)
+
+
+def test_crossmatch_without_prefetch(requests_mock):
+    alerce, cone = make_alerce(requests_mock, "conesearch", CONESEARCH_CATALOG_RESPONSE)
+    crossmatch = requests_mock.get(
+        alerce.config["CATSHTM_API_URL"]
+        + alerce.config["CATSHTM_ROUTES"]["crossmatch"],
+        json={"RA": {"unit": "deg", "value": RA}},
+    )
+    alerce.catshtm_crossmatch(RA, DEC, 5, catalog_name="GAIA/DR1")
+    assert cone.call_count == 0 and crossmatch.call_count == 1
+    alerce.catshtm_conesearch(RA, DEC, 100, catalog_name="GAIA/DR1")
+    alerce.catshtm_crossmatch(RA, DEC, 5, catalog_name="GAIA/DR1")
+    assert crossmatch.call_count == 1
+
+
+def test_max_regions():
+    cache = ConeCache(max_regions=2)
+    for i in range(3):
+        cache.add("GAIADR1", i, 0, 10, {})
+    assert len(cache) == 2
+    assert cache.conesearch("GAIADR1", 0, 0, 1) is None
+    assert cache.conesearch("GAIADR1", 2, 0, 1) == {}
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_cone_cache_stats():
+    cache = ConeCache(max_regions=1)
+    assert cache.conesearch("GAIA/DR1", RA, DEC, 10) is None
+    cache.add("GAIA/DR1", RA, DEC, 100, CONESEARCH_CATALOG_RESPONSE)
+    cache.conesearch("GAIA/DR1", RA, DEC, 10)
+    cache.add("GAIA/DR1", RA + 1, DEC, 100, CONESEARCH_CATALOG_RESPONSE)
+    stats = cache.stats
+    assert stats["routes"]["GAIA/DR1"]["hits"] == 1
+    assert stats["routes"]["GAIA/DR1"]["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_cone_across_declination_bands():
+    cache = ConeCache()
+    # a cone around dec 0 overlaps the bands on both sides of it
+    cache.add("GAIADR1", 10, 0, 3600, {})
+    assert cache.conesearch("GAIADR1", 10, -0.5, 10) == {}
+    assert cache.conesearch("GAIADR1", 10, 0.5, 10) == {}
+    assert cache.conesearch("GAIADR1", 10, 1.5, 10) is None
+
+
+def test_many_regions_indexed():
+    cache = ConeCache(max_regions=500)
+    for i in range(1000):
+        cache.add("GAIADR1", i % 360, i % 170 - 85, 100, {})
+    assert len(cache) == 500
+    # evicted cones leave the index
+    indexed = set().union(*cache._index["GAIADR1"].values())
+    assert indexed == set(cache._regions)
+    assert cache.conesearch("GAIADR1", 0, -85, 10) is None
+    assert cache.conesearch("GAIADR1", 999 % 360, 999 % 170 - 85, 10) == {}
+    assert cache.conesearch("2MASS", 999 % 360, 999 % 170 - 85, 10) is None
+    cache.clear()
+    assert cache._index == {}
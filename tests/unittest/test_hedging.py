@@ -0,0 +1,105 @@
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+sys.path.append("..")
+from requests import Session
+from alerce.hedging import HedgePolicy
+from alerce.transport import Transport
+
+URL = "https://api.test/objects/oid"
+
+
+class Response:
+    def __init__(self, name):
+        self.name = name
+        self.status_code = 200
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def warm(policy, latency=0.01, n=20):
+    for _ in range(n):
+        policy.delay("api.test")
+        policy.record("api.test", latency)
+
+
+def test_no_hedge_before_min_samples():
+    policy = HedgePolicy(min_samples=5)
+    assert policy.delay("api.test") is None
+
+
+def test_delay_is_percentile():
+    policy = HedgePolicy(percentile=90, min_samples=10)
+    for latency in range(1, 11):
+        policy.record("api.test", latency)
+    assert policy.delay("api.test") == 10
+    policy = HedgePolicy(percentile=50, min_samples=10)
+    for latency in range(1, 11):
+        policy.record("api.test", latency)
+    assert policy.delay("api.test") == 6
+
+
+def test_budget():
+    policy = HedgePolicy(budget=0.1)
+    for _ in range(20):
+        policy.delay("api.test")
+    assert policy.acquire()
+    assert policy.acquire()
+    assert not policy.acquire()
+
+
+def test_slow_request_hedged():
+    policy = HedgePolicy(budget=1.0)
+    warm(policy)
+    transport = Transport(hedge=policy)
+    calls = []
+    lock = threading.Lock()
+
+    def request(*args, **kwargs):
+        with lock:
+            calls.append(None)
+            n = len(calls)
+        if n == 1:
+            time.sleep(0.5)
+            return Response("primary")
+        return Response("hedge")
+
+    with patch.object(Session, "request", side_effect=request):
+        start = time.monotonic()
+        resp = transport.request("GET", URL)
+        elapsed = time.monotonic() - start
+    assert resp.name == "hedge"
+    assert elapsed < 0.4
+    assert transport.stats["hedged"] == 1
+    assert transport.stats["hedge_wins"] == 1
+
+
+def test_fast_request_not_hedged():
+    policy = HedgePolicy(budget=1.0)
+    warm(policy, latency=1.0)
+    transport = Transport(hedge=policy)
+    with patch.object(
+        Session, "request", return_value=Response("primary")
+    ) as mock_request:
+        resp = transport.request("GET", URL)
+    assert resp.name == "primary"
+    assert mock_request.call_count == 1
+    assert "hedged" not in transport.stats
+
+
+def test_hedge_budget_spent():
+    policy = HedgePolicy(budget=0.0)
+    warm(policy)
+    transport = Transport(hedge=policy)
+
+    def request(*args, **kwargs):
+        time.sleep(0.1)
+        return Response("primary")
+
+    with patch.object(Session, "request", side_effect=request) as mock_request:
+        transport.request("GET", URL)
+    assert mock_request.call_count == 1
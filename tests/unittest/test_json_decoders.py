@@ -0,0 +1,61 @@
+import json
+import math
+import sys
+from unittest.mock import patch
+
+import pytest
+
+sys.path.append("..")
+from alerce import json_decoders
+from alerce.core import Alerce
+from alerce.json_decoders import get_decoder
+from alerce.transport import Transport
+
+
+def test_standard_decoder():
+    assert get_decoder("json") is json.loads
+
+
+def test_unknown_decoder():
+    with pytest.raises(ValueError):
+        get_decoder("ujson")
+
+
+def test_missing_decoder_falls_back():
+    with patch.dict(json_decoders.DECODERS, clear=True, json=json.loads):
+        with pytest.warns(RuntimeWarning, match="orjson is not installed"):
+            assert get_decoder("orjson") is json.loads
+        assert get_decoder("auto") is json.loads
+
+
+def test_orjson_decoder():
+    pytest.importorskip("orjson")
+    loads = get_decoder("orjson")
+    assert loads(b'[{"candid": 1, "mag": 18.5}]') == [{"candid": 1, "mag": 18.5}]
+    # values orjson rejects are decoded by the standard library
+    assert math.isnan(loads(b'{"mag": NaN}')["mag"])
+    # 64 bit identifiers are kept exact
+    assert loads(b'{"id": 18446744073709551615}') == {"id": 2**64 - 1}
+
+
+def test_client_uses_transport_decoder(requests_mock):
+    alerce = Alerce(transport=Transport(json_decoder="json"))
+    requests_mock.get(
+        alerce.legacy_ztf_client.ztf_url + "/objects/oid/detections",
+        json=[{"candid": 1}],
+    )
+    loads = alerce.transport.loads
+    with patch.object(alerce.transport, "loads", wraps=loads) as loads:
+        assert alerce.query_detections("oid", survey="ztf", format="json") == [
+            {"candid": 1}
+        ]
+    assert loads.call_count == 1
+
+
+def test_decoder_from_config(monkeypatch):
+    monkeypatch.setattr(
+        "alerce.utils.load_config", lambda service: {"JSON_DECODER": "json"}
+    )
+    transport = Transport.from_config()
+    assert transport.json_decoder == "json"
+    assert transport.loads is json.loads
@@ -0,0 +1,106 @@
+import re
+import sys
+
+from pandas import DataFrame
+
+sys.path.append("..")
+from alerce.core import Alerce
+from alerce.lightcurve_store import LightcurveStore
+
+alerce = Alerce()
+ZTF_URL = alerce.legacy_ztf_client.ztf_url
+
+
+class Sky:
+    """Stand-in for the objects and lightcurve routes of the ZTF API"""
+
+    def __init__(self, requests_mock):
+        self.detections = {}
+        self.objects = requests_mock.get(ZTF_URL + "/objects", json=self.list_objects)
+        self.lightcurves = requests_mock.get(
+            re.compile(ZTF_URL + "/objects/[^/]+/lightcurve"), json=self.lightcurve
+        )
+
+    def add(self, oid, mjd):
+        self.detections.setdefault(oid, []).append(
+            {"candid": "%s_%d" % (oid, mjd), "mjd": mjd, "fid": 1}
+        )
+
+    # requests_mock lowercases the query string and path
+    def list_objects(self, request, context):
+        oids = request.qs.get("oid", [])
+        return {
+            "items": [
+                {"oid": oid, "lastmjd": max(d["mjd"] for d in self.detections[oid])}
+                for oid in self.detections
+                if oid.lower() in oids
+            ]
+        }
+
+    def lightcurve(self, request, context):
+        oid = request.path.split("/")[-2].upper()
+        return {
+            "detections": list(self.detections[oid]),
+            "non_detections": [{"mjd": 0.5, "fid": 1, "diffmaglim": 20}],
+        }
+
+
+def test_sync_lightcurves(requests_mock):
+    sky = Sky(requests_mock)
+    oids = ["ZTF%d" % i for i in range(5)]
+    for oid in oids:
+        sky.add(oid, 1)
+    store = LightcurveStore()
+
+    changed = alerce.sync_lightcurves(oids, store, survey="ztf", batch_size=2)
+    assert changed == {oid: 2 for oid in oids}
+    assert sky.objects.call_count == 3
+    assert sky.lightcurves.call_count == 5
+
+    # nothing new, only the object listing is requested
+    assert alerce.sync_lightcurves(oids, store, survey="ztf") == {}
+    assert sky.lightcurves.call_count == 5
+
+    sky.add("ZTF3", 2)
+    assert alerce.sync_lightcurves(oids, store, survey="ztf") == {"ZTF3": 1}
+    assert sky.lightcurves.call_count == 6
+    assert store.watermark("ztf", "ZTF3") == (2, "ZTF3_2")
+    detections = store.lightcurve("ztf", "ZTF3", format="pandas")["detections"]
+    assert isinstance(detections, DataFrame)
+    assert list(detections.mjd) == [1, 2]
+
+
+def test_sync_unlisted_objects(requests_mock):
+    sky = Sky(requests_mock)
+    sky.add("ZTF1", 1)
+    requests_mock.get(ZTF_URL + "/objects", json={"items": []})
+    store = LightcurveStore()
+    assert alerce.sync_lightcurves(["ZTF1"], store, survey="ztf") == {"ZTF1": 2}
+    # without a last detection to compare with, the lightcurve is downloaded
+    # again but nothing is duplicated
+    assert alerce.sync_lightcurves(["ZTF1"], store, survey="ztf") == {}
+    assert sky.lightcurves.call_count == 2
+
+
+def test_store_persists(tmp_path):
+    store = LightcurveStore(str(tmp_path))
+    lightcurve = {
+        "detections": [
+            {"candid": 1, "mjd": 10.0},
+            {"candid": 2, "mjd": 12.0},
+        ],
+        "non_detections": [{"mjd": 9.0, "fid": 1}],
+    }
+    assert store.merge("ztf", "oid", lightcurve) == 3
+    assert store.merge("ztf", "oid", lightcurve) == 0
+
+    reopened = LightcurveStore(str(tmp_path))
+    assert ("ztf", "oid") in reopened
+    assert reopened.watermark("ztf", "oid") == (12.0, 2)
+    assert reopened.oids("ztf") == ["oid"]
+    assert not reopened.needs_update("ztf", "oid", 12.0)
+    assert reopened.needs_update("ztf", "oid", 13.0)
+    assert reopened.needs_update("ztf", "other", 13.0)
+    lightcurve["detections"].append({"candid": 3, "mjd": 13.0})
+    assert reopened.merge("ztf", "oid", lightcurve) == 1
+    assert len(reopened.lightcurve("ztf", "oid")["detections"]) == 3
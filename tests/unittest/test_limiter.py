@@ -0,0 +1,80 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+sys.path.append("..")
+from requests import Session
+from alerce.limiter import AdaptiveLimiter
+from alerce.transport import Transport
+
+
+def run_requests(limiter, host, n, latency=0.01, status_code=200):
+    for _ in range(n):
+        limiter.acquire(host)
+        limiter.release(host, latency, status_code)
+
+
+def test_limit_increases_with_stable_latency():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=10)
+    run_requests(limiter, "api", 50)
+    assert limiter.limits()["api"]["limit"] > 2
+
+
+def test_limit_capped():
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=4)
+    run_requests(limiter, "api", 500)
+    assert limiter.limits()["api"]["limit"] == 4
+
+
+def test_limit_decreases_on_throttling():
+    limiter = AdaptiveLimiter(initial_limit=16)
+    run_requests(limiter, "api", 1, status_code=429)
+    assert limiter.limits()["api"]["limit"] == 8
+    run_requests(limiter, "other", 1, status_code=503)
+    assert limiter.limits()["other"]["limit"] == 8
+
+
+def test_limit_decreases_on_latency_spike():
+    limiter = AdaptiveLimiter(initial_limit=16, max_limit=16)
+    run_requests(limiter, "api", 5, latency=0.001)
+    run_requests(limiter, "api", 1, latency=1.0)
+    assert limiter.limits()["api"]["limit"] == 8
+
+
+def test_limit_never_below_min():
+    limiter = AdaptiveLimiter(initial_limit=2, min_limit=1)
+    for _ in range(4):
+        run_requests(limiter, "api", 1, status_code=0)
+        time.sleep(0.02)
+    assert limiter.limits()["api"]["limit"] == 1
+
+
+def test_transport_bounds_concurrency_per_host():
+    limiter = AdaptiveLimiter(initial_limit=3, max_limit=3)
+    transport = Transport(limiter=limiter)
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def request(*args, **kwargs):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return type("Response", (), {"status_code": 200})()
+
+    with patch.object(Session, "request", side_effect=request):
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(
+                executor.map(
+                    lambda i: transport.request("GET", "https://api.test/%d" % i),
+                    range(30),
+                )
+            )
+    assert max_in_flight <= 3
+    assert limiter.limits()["api.test"]["in_flight"] == 0
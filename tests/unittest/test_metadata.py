@@ -0,0 +1,124 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from pandas import DataFrame
+
+sys.path.append("..")
+from alerce.core import Alerce
+from alerce.metadata import MetadataCache, Taxonomy
+
+ZTF_URL = Alerce().legacy_ztf_client.ztf_url
+CLASSIFIERS = [
+    {
+        "classifier_name": "lc_classifier",
+        "classifier_version": "hierarchical_rf_1.1.0",
+        "classes": ["SNIa", "SNII", "AGN"],
+    },
+    {
+        "classifier_name": "stamp_classifier",
+        "classifier_version": "stamp_classifier_1.0.4",
+        "classes": ["SN", "AGN", "bogus"],
+    },
+]
+
+
+def test_classifiers_shared_by_instances(requests_mock):
+    adapter = requests_mock.get(ZTF_URL + "/classifiers", json=CLASSIFIERS)
+    first = Alerce().query_classifiers(survey="ztf")
+    second = Alerce().query_classifiers(survey="ztf")
+    assert first == second == CLASSIFIERS
+    assert adapter.call_count == 1
+    # every call gets its own copy
+    first[0]["classes"].append("modified")
+    assert Alerce().query_classifiers(survey="ztf") == CLASSIFIERS
+
+
+def test_classifiers_formats(requests_mock):
+    requests_mock.get(ZTF_URL + "/classifiers", json=CLASSIFIERS)
+    alerce = Alerce()
+    df = alerce.query_classifiers(format="pandas", survey="ztf")
+    assert isinstance(df, DataFrame)
+    assert list(df.classifier_name) == ["lc_classifier", "stamp_classifier"]
+
+
+def test_classes_memoized_per_version(requests_mock):
+    url = ZTF_URL + "/classifiers/lc_classifier/%s/classes"
+    v1 = requests_mock.get(url % "1", json=["SNIa"])
+    v2 = requests_mock.get(url % "2", json=["SNIa", "SNII"])
+    alerce = Alerce()
+    for _ in range(2):
+        assert alerce.query_classes("lc_classifier", "1", survey="ztf") == ["SNIa"]
+        assert alerce.query_classes("lc_classifier", "2", survey="ztf") == [
+            "SNIa",
+            "SNII",
+        ]
+    assert v1.call_count == v2.call_count == 1
+
+
+def test_invalidate_metadata(requests_mock):
+    adapter = requests_mock.get(ZTF_URL + "/classifiers", json=CLASSIFIERS)
+    alerce = Alerce()
+    alerce.query_classifiers(survey="ztf")
+    alerce.invalidate_metadata()
+    alerce.query_classifiers(survey="ztf")
+    alerce.legacy_ztf_client.invalidate_metadata()
+    alerce.query_classifiers(survey="ztf")
+    assert adapter.call_count == 3
+
+
+def test_taxonomy(requests_mock):
+    adapter = requests_mock.get(ZTF_URL + "/classifiers", json=CLASSIFIERS)
+    alerce = Alerce()
+    taxonomy = alerce.taxonomy(survey="ztf")
+    assert taxonomy is Alerce().taxonomy(survey="ztf")
+    assert adapter.call_count == 1
+    assert taxonomy.classes("lc_classifier") == ("SNIa", "SNII", "AGN")
+    assert taxonomy.classes("stamp_classifier", "stamp_classifier_1.0.4")[-1] == (
+        "bogus"
+    )
+    assert taxonomy.classes("unknown") == ()
+    assert taxonomy.classifiers("AGN") == [
+        ("lc_classifier", "hierarchical_rf_1.1.0"),
+        ("stamp_classifier", "stamp_classifier_1.0.4"),
+    ]
+    assert "SNIa" in taxonomy
+    assert taxonomy.has_class("SN", "stamp_classifier")
+    assert not taxonomy.has_class("SN", "lc_classifier")
+
+
+def test_taxonomy_versions():
+    taxonomy = Taxonomy(
+        [
+            {"classifier_name": "c", "classifier_version": "2", "classes": ["b"]},
+            {"classifier_name": "c", "classifier_version": "1", "classes": ["a"]},
+        ]
+    )
+    assert taxonomy.classes("c") == ("b",)
+    assert taxonomy.classes("c", "1") == ("a",)
+    assert taxonomy.classifiers() == [("c", "2"), ("c", "1")]
+
+
+def test_metadata_cache_threads():
+    cache = MetadataCache()
+
+    def loader():
+        return {"value": [1]}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: cache.get("k", loader), range(20)))
+    assert all(r == {"value": [1]} for r in results)
+    assert "k" in cache and len(cache) == 1
+    cache.invalidate("k")
+    assert len(cache) == 0
+
+
+def test_metadata_cache_stats():
+    cache = MetadataCache()
+    for _ in range(3):
+        cache.get("key", lambda: [1])
+    assert cache.stats["hits"] == 2 and cache.stats["misses"] == 1
+
+
+def test_metadata_cache_in_transport_stats():
+    alerce = Alerce()
+    assert "metadata_cache" in alerce.transport.cache_stats
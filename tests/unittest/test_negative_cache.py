@@ -0,0 +1,100 @@
+import sys
+import time
+
+import pytest
+
+sys.path.append("..")
+from alerce.core import Alerce
+from alerce.exceptions import ObjectNotFoundError
+from alerce.negative_cache import NegativeCache
+from alerce.transport import Transport
+
+
+def make_alerce(**kwargs):
+    alerce = Alerce(transport=Transport(negative_cache=NegativeCache(**kwargs)))
+    return alerce, alerce.legacy_ztf_client.ztf_url
+
+
+def test_missing_object_not_requested_again(requests_mock):
+    alerce, url = make_alerce()
+    adapter = requests_mock.get(
+        url + "/objects/missing/detections",
+        json={"detail": "Object missing not found"},
+        status_code=404,
+    )
+    for _ in range(3):
+        with pytest.raises(ObjectNotFoundError) as e:
+            alerce.query_detections("missing", survey="ztf")
+        assert e.value.message == "Object missing not found"
+        assert e.value.code == 404
+    assert adapter.call_count == 1
+
+
+def test_other_errors_not_remembered(requests_mock):
+    alerce, url = make_alerce()
+    adapter = requests_mock.get(
+        url + "/objects/oid/detections", json={"detail": "error"}, status_code=500
+    )
+    for _ in range(2):
+        with pytest.raises(Exception):
+            alerce.query_detections("oid", survey="ztf")
+    assert adapter.call_count == 2
+    assert len(alerce.transport.negative_cache) == 0
+
+
+def test_miss_expires(requests_mock):
+    alerce, url = make_alerce(ttl=0.05)
+    adapter = requests_mock.get(
+        url + "/objects/oid/detections", json={"detail": "not found"}, status_code=404
+    )
+    with pytest.raises(ObjectNotFoundError):
+        alerce.query_detections("oid", survey="ztf")
+    time.sleep(0.06)
+    requests_mock.get(url + "/objects/oid/detections", json=[{"candid": 1}])
+    assert alerce.query_detections("oid", survey="ztf") == [{"candid": 1}]
+    assert adapter.call_count == 1
+
+
+def test_bulk_with_missing_objects(requests_mock):
+    alerce, url = make_alerce()
+    missing = requests_mock.get(
+        url + "/objects/missing/detections", json={"detail": "nf"}, status_code=404
+    )
+    requests_mock.get(url + "/objects/ok/detections", json=[{"candid": 1}])
+    for _ in range(2):
+        with pytest.warns(RuntimeWarning):
+            r, errors = alerce.query_detections_many(
+                ["missing", "ok"], survey="ztf", format="json", return_errors=True
+            )
+        assert list(errors) == ["missing"]
+    assert missing.call_count == 1
+
+
+def test_purge_keeps_live_misses():
+    cache = NegativeCache(capacity=4)
+    for i in range(10):
+        cache.add("key%d" % i)
+    assert all("key%d" % i in cache for i in range(10))
+    assert "other" not in cache
+    cache.discard("key0")
+    assert "key0" not in cache
+    cache.clear()
+    assert len(cache) == 0 and "key1" not in cache
+
+
+def test_negative_cache_stats():
+    cache = NegativeCache(ttl=60)
+    cache.add("missing")
+    assert "missing" in cache
+    assert "other" not in cache
+    stats = cache.stats
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["additions"] == 1 and stats["hit_ratio"] == 0.5
+
+
+def test_purge_drops_expired_misses():
+    cache = NegativeCache(ttl=0, capacity=2)
+    for i in range(5):
+        cache.add("key%d" % i)
+    assert len(cache) <= 2 and cache.capacity == 2
+    assert cache.stats["expirations"] >= 3
@@ -0,0 +1,99 @@
+import sys
+
+import pytest
+
+pl = pytest.importorskip("polars")
+
+sys.path.append("..")
+from alerce.core import Alerce
+from alerce.utils import ResultCsv, records_to_polars
+from catshtm_testcases import CONESEARCH_CATALOG_RESPONSE
+
+alerce = Alerce()
+ZTF_URL = alerce.legacy_ztf_client.ztf_url
+DETECTIONS = [
+    {"candid": 2, "mjd": 59001, "magpsf": 18.5, "band_name": "r"},
+    {"candid": 1, "mjd": 59000, "magpsf": None, "band_name": "g"},
+]
+
+
+def test_query_detections_polars(requests_mock):
+    requests_mock.get(ZTF_URL + "/objects/oid/detections", json=DETECTIONS)
+    frame = alerce.query_detections("oid", survey="ztf", format="polars")
+    assert isinstance(frame, pl.DataFrame)
+    assert frame.columns == ["candid", "mjd", "magpsf", "band_name"]
+    assert frame["candid"].to_list() == [2, 1]
+    # known float columns stay float even when they hold integers
+    assert frame.schema["mjd"] == pl.Float64
+    assert frame["magpsf"].null_count() == 1
+
+
+def test_polars_index_and_sort(requests_mock):
+    requests_mock.get(ZTF_URL + "/objects/oid/detections", json=DETECTIONS)
+    frame = alerce.query_detections(
+        "oid", survey="ztf", format="polars", index="band_name", sort="mjd"
+    )
+    assert frame.columns[0] == "band_name"
+    assert frame["candid"].to_list() == [1, 2]
+
+
+def test_records_to_polars_irregular():
+    frame = records_to_polars([{"a": 1}, {"a": 2, "b": "x"}])
+    assert frame.columns == ["a", "b"]
+    assert frame["b"].to_list() == [None, "x"]
+    # a float column holding strings is left as it is
+    frame = records_to_polars([{"a": 1.5}, {"a": "n/a"}], ("a",))
+    assert frame["a"].to_list() == ["1.5", "n/a"]
+    assert records_to_polars([]).is_empty()
+
+
+def test_csv_result_polars():
+    result = ResultCsv(b"oid,ndet\nb,4\na,3\n", format="polars")
+    frame = result.result(index="ndet", sort="oid")
+    assert frame.columns == ["ndet", "oid"]
+    assert frame["oid"].to_list() == ["a", "b"]
+
+
+def test_query_objects_all_polars(requests_mock):
+    def callback(request, context):
+        if "count" in request.qs:
+            return {"total": 15, "items": []}
+        page = int(request.qs["page"][0])
+        return {
+            "items": [
+                {"oid": "oid%d" % i, "meanra": i}
+                for i in range((page - 1) * 10, min(page * 10, 15))
+            ]
+        }
+
+    requests_mock.get(ZTF_URL + "/objects", json=callback)
+    frame = alerce.query_objects_all(survey="ztf", page_size=10, format="polars")
+    assert frame.height == 15
+    assert frame.schema["meanra"] == pl.Float64
+    pages = list(alerce.iter_objects(survey="ztf", page_size=10, format="polars"))
+    assert [page.height for page in pages] == [10, 5]
+
+
+def test_forced_photometry_polars(requests_mock):
+    requests_mock.get(
+        alerce.legacy_ztf_client.FORCED_PHOTOMETRY_URL % "oid",
+        json=[
+            {"mjd": 1, "aid": "x", "sid": "y", "extra_fields": {"procstatus": "0"}},
+        ],
+    )
+    frame = alerce.query_forced_photometry("oid", survey="ztf", format="polars")
+    assert frame.columns == ["mjd", "procstatus"]
+
+
+def test_catshtm_conesearch_polars(requests_mock):
+    requests_mock.get(
+        alerce.config["CATSHTM_API_URL"]
+        + alerce.config["CATSHTM_ROUTES"]["conesearch"],
+        json=CONESEARCH_CATALOG_RESPONSE,
+    )
+    frame = alerce.catshtm_conesearch(
+        1, 1, 10, catalog_name="GAIA/DR1", format="polars"
+    )
+    assert isinstance(frame, pl.DataFrame)
+    assert frame.height == 9
+    assert set(frame["cat_name"].to_list()) == {"catsHTM_GAIA/DR1"}
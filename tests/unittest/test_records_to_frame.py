@@ -0,0 +1,65 @@
+import sys
+
+import numpy as np
+from pandas import DataFrame
+from pandas.testing import assert_frame_equal
+
+sys.path.append("..")
+from alerce.core import Alerce
+from alerce.utils import records_to_frame
+
+RECORDS = [
+    {"candid": 1, "mjd": 59000.5, "fid": 1, "band_name": "g", "magpsf_corr": None},
+    {"candid": 2, "mjd": 59001.5, "fid": 2, "band_name": "r", "magpsf_corr": 18.2},
+    {"candid": 3, "mjd": 59002.5, "fid": 1, "band_name": None, "magpsf_corr": None},
+]
+
+
+def test_same_frame_as_row_by_row():
+    assert_frame_equal(records_to_frame(RECORDS), DataFrame(RECORDS))
+
+
+def test_known_float_columns():
+    records = [{"oid": "a", "probability": 1}, {"oid": "b", "probability": None}]
+    frame = records_to_frame(records, ("probability",))
+    assert frame.probability.dtype == np.float64
+    assert frame.probability[0] == 1.0 and np.isnan(frame.probability[1])
+    frame = records_to_frame(RECORDS, ("magpsf_corr",))
+    assert frame.magpsf_corr.dtype == np.float64
+    assert list(frame.columns) == list(RECORDS[0])
+
+
+def test_irregular_records():
+    # keys missing from the first record
+    records = [{"a": 1.5}, {"a": 2.5, "b": "x"}]
+    assert_frame_equal(records_to_frame(records), DataFrame(records))
+    # keys of the first record missing from a later one
+    records = [{"a": 1, "b": 2.0}, {"a": 3}]
+    assert_frame_equal(records_to_frame(records), DataFrame(records))
+    # a float column holding strings
+    records = [{"a": 1.5, "b": 1}, {"a": "n/a", "b": 2}]
+    assert_frame_equal(records_to_frame(records), DataFrame(records))
+    # a single float column
+    records = [{"a": 1.5}, {"a": 2.5}]
+    assert_frame_equal(records_to_frame(records), DataFrame(records))
+    assert records_to_frame([]).empty
+
+
+def test_route_float_columns(requests_mock):
+    alerce = Alerce()
+    requests_mock.get(
+        alerce.legacy_ztf_client.ztf_url + "/objects/oid/probabilities",
+        json=[{"class_name": "SN", "probability": 1}],
+    )
+    frame = alerce.query_probabilities("oid", survey="ztf", format="pandas")
+    assert frame.probability.dtype == np.float64
+
+
+def test_integer_and_boolean_columns():
+    records = [{"candid": 2**64 - 1, "flag": True}, {"candid": 1, "flag": False}]
+    frame = records_to_frame(records)
+    assert frame.candid.dtype == np.uint64 and frame.flag.dtype == bool
+    # None or other types mixed in are inferred by pandas
+    for values in ([1, None], [True, 1], [1, 2.5], [1, "x"]):
+        records = [{"a": value} for value in values]
+        assert_frame_equal(records_to_frame(records), DataFrame(records))
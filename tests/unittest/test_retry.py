@@ -0,0 +1,100 @@
+import sys
+from unittest.mock import patch
+import pytest
+import requests
+
+sys.path.append("..")
+from alerce.core import Alerce
+from alerce.exceptions import APIError
+from alerce.retry import RetryPolicy
+from alerce.transport import Transport
+
+NO_WAIT = dict(backoff_factor=0, jitter=False)
+
+
+def make_alerce(**kwargs):
+    return Alerce(transport=Transport(retry=RetryPolicy(**NO_WAIT, **kwargs)))
+
+
+def test_retry_then_success(requests_mock):
+    alerce = make_alerce()
+    url = alerce.legacy_ztf_client.ztf_url + "/objects/oid"
+    requests_mock.get(
+        url,
+        [
+            {"status_code": 503},
+            {"status_code": 429, "headers": {"Retry-After": "0"}},
+            {"status_code": 200, "json": {"oid": "oid"}},
+        ],
+    )
+    r = alerce.query_object("oid", survey="ztf")
+    assert r == {"oid": "oid"}
+    assert requests_mock.call_count == 3
+    stats = alerce.transport.stats
+    assert stats["retries"] == 2
+    assert stats["retries_503"] == 1
+    assert stats["retries_429"] == 1
+
+
+def test_retry_exhausted(requests_mock):
+    alerce = make_alerce(total=2)
+    requests_mock.get(alerce.config["CATSHTM_API_URL"] + "/conesearch", status_code=502)
+    with pytest.raises(APIError):
+        alerce._request_catshtm("GET", alerce.config["CATSHTM_API_URL"] + "/conesearch")
+    assert requests_mock.call_count == 3
+    assert alerce.transport.stats["exhausted"] == 1
+
+
+def test_no_retry_on_client_error(requests_mock):
+    alerce = make_alerce()
+    url = alerce.legacy_ztf_client.ztf_url + "/objects/oid"
+    requests_mock.get(url, status_code=404, json={"detail": "not found"})
+    with pytest.raises(APIError):
+        alerce.query_object("oid", survey="ztf")
+    assert requests_mock.call_count == 1
+
+
+def test_retry_connection_error(requests_mock):
+    alerce = make_alerce()
+    url = alerce.legacy_ztf_client.ztf_url + "/objects/oid"
+    requests_mock.get(
+        url,
+        [{"exc": requests.ConnectionError}, {"status_code": 200, "json": {}}],
+    )
+    assert alerce.query_object("oid", survey="ztf") == {}
+    assert alerce.transport.stats["retries_error"] == 1
+
+
+def test_retry_disabled(requests_mock):
+    alerce = make_alerce(total=0)
+    url = alerce.legacy_ztf_client.ztf_url + "/objects/oid"
+    requests_mock.get(url, status_code=503)
+    with pytest.raises(APIError):
+        alerce.query_object("oid", survey="ztf")
+    assert requests_mock.call_count == 1
+
+
+def test_backoff_capped_and_jittered():
+    policy = RetryPolicy(backoff_factor=1, backoff_max=5, jitter=False)
+    assert [policy.backoff(n) for n in range(4)] == [1, 2, 4, 5]
+    policy = RetryPolicy(backoff_factor=1, backoff_max=5)
+    assert all(0 <= policy.backoff(3) <= 5 for _ in range(20))
+
+
+def test_retry_after_header():
+    policy = RetryPolicy(retry_after_max=10)
+    response = requests.Response()
+    response.headers["Retry-After"] = "3"
+    assert policy.sleep_time(0, response) == 3
+    response.headers["Retry-After"] = "100"
+    assert policy.sleep_time(0, response) == 10
+    response.headers["Retry-After"] = "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert policy.sleep_time(0, response) == 0
+
+
+def test_timeout_passed_to_session():
+    transport = Transport(timeout=5)
+    with patch.object(requests.Session, "request") as mock_request:
+        mock_request.return_value.status_code = 200
+        transport.request("GET", "mock://test.com")
+    assert mock_request.call_args.kwargs["timeout"] == 5
@@ -1,4 +1,5 @@
 from unittest.mock import patch
+import json
 from requests import Session
 from pandas import DataFrame
 from astropy.table import Table
@@ -18,7 +19,7 @@ def test_query_objects(mock_request):
         return {"items": [{"oid": "test"}]}
 
     mock_request.return_value.status_code = 200
-    mock_request.return_value.json = mock_result
+    mock_request.return_value.content = json.dumps(mock_result()).encode()
     r = alerce.query_objects(classifier="lc_classifier")
     assert r is not None
 
@@ -50,7 +51,7 @@ def test_query_objects_format_pandas(mock_request):
         return {"items": [{"oid": "test"}]}
 
     mock_request.return_value.status_code = 200
-    mock_request.return_value.json = mock_result
+    mock_request.return_value.content = json.dumps(mock_result()).encode()
     r = alerce.query_objects(format="pandas")
     assert isinstance(r, DataFrame)
 
@@ -61,7 +62,7 @@ def test_query_objects_format_pandas_index(mock_request):
         return {"items": [{"oid": "test"}]}
 
     mock_request.return_value.status_code = 200
-    mock_request.return_value.json = mock_result
+    mock_request.return_value.content = json.dumps(mock_result()).encode()
     index = "oid"
     r = alerce.query_objects(format="pandas", index=index)
     assert r.index.name == index
@@ -73,7 +74,7 @@ def test_query_objects_format_pandas_sort(mock_request):
         return {"items": [{"mjd": 2}, {"mjd": 1}]}
 
     mock_request.return_value.status_code = 200
-    mock_request.return_value.json = mock_result
+    mock_request.return_value.content = json.dumps(mock_result()).encode()
     sort = "mjd"
     r = alerce.query_objects(format="pandas", sort=sort)
     assert r.mjd.iloc[0] < r.mjd.iloc[1]
@@ -82,7 +83,7 @@ def test_query_objects_format_pandas_sort(mock_request):
 @patch.object(Session, "request")
 def test_query_objects_format_json(mock_request):
     mock_request.return_value.status_code = 200
-    mock_request.return_value.json.return_value = "ok"
+    mock_request.return_value.content = json.dumps("ok").encode()
     r = alerce.query_objects(format="json")
     assert r == "ok"
 
@@ -90,10 +91,12 @@ def test_query_objects_format_json(mock_request):
 @patch.object(Session, "request")
 def test_query_objects_format_csv(mock_request):
     mock_request.return_value.status_code = 200
-    mock_request.return_value.json.return_value = [
-        {"oid": 1, "mjd": 2},
-        {"oid": 3, "mjd": 4},
-    ]
+    mock_request.return_value.content = json.dumps(
+        [
+            {"oid": 1, "mjd": 2},
+            {"oid": 3, "mjd": 4},
+        ]
+    ).encode()
     r = alerce.query_objects(format="csv")
     expected_csv = "oid,mjd\n1,2\n3,4\n"
     assert r == expected_csv
@@ -102,7 +105,7 @@ def test_query_objects_format_csv(mock_request):
 @patch.object(Session, "request")
 def test_query_objects_format_votable(mock_request):
     mock_request.return_value.status_code = 200
-    mock_request.return_value.json.return_value = {"items": {}}
+    mock_request.return_value.content = json.dumps({"items": {}}).encode()
     r = alerce.query_objects(format="votable")
     assert isinstance(r, Table)
 
@@ -110,6 +113,7 @@ def test_query_objects_format_votable(mock_request):
 @patch.object(Session, "request")
 def test_query_object(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_object("oid")
     assert r is not None
 
@@ -117,6 +121,7 @@ def test_query_object(mock_request):
 @patch.object(Session, "request")
 def test_query_lightcurve(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_lightcurve("oid")
     assert r is not None
 
@@ -124,6 +129,7 @@ def test_query_lightcurve(mock_request):
 @patch.object(Session, "request")
 def test_query_detections(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_detections("oid")
     assert r is not None
 
@@ -131,6 +137,7 @@ def test_query_detections(mock_request):
 @patch.object(Session, "request")
 def test_query_non_detections(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_non_detections("oid")
     assert r is not None
 
@@ -138,6 +145,7 @@ def test_query_non_detections(mock_request):
 @patch.object(Session, "request")
 def test_query_magstats(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_magstats("oid")
     assert r is not None
 
@@ -145,6 +153,7 @@ def test_query_magstats(mock_request):
 @patch.object(Session, "request")
 def test_query_probabilities(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_probabilities("oid")
     assert r is not None
 
@@ -152,6 +161,7 @@ def test_query_probabilities(mock_request):
 @patch.object(Session, "request")
 def test_query_features(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_features("oid")
     assert r is not None
 
@@ -159,6 +169,7 @@ def test_query_features(mock_request):
 @patch.object(Session, "request")
 def test_query_single_feature(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_feature(oid="oid", name="feature")
     assert r is not None
 
@@ -166,6 +177,7 @@ def test_query_single_feature(mock_request):
 @patch.object(Session, "request")
 def test_query_classifiers(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_classifiers()
     assert r is not None
 
@@ -173,6 +185,7 @@ def test_query_classifiers(mock_request):
 @patch.object(Session, "request")
 def test_query_classes(mock_request):
     mock_request.return_value.status_code = 200
+    mock_request.return_value.content = b"{}"
     r = alerce.query_classes("lc_classifier", "bulk_0.0.1")
     assert r is not None
 
@@ -200,7 +213,7 @@ def test_query_detections(mock_request):
         ]
 
     mock_request.return_value.status_code = 200
-    mock_request.return_value.json = mock_result
+    mock_request.return_value.content = json.dumps(mock_result()).encode()
 
     r = alerce.query_forced_photometry("oid")
     assert r is not None
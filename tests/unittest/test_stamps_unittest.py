@@ -16,6 +16,7 @@ EXAMPLE_PATH = os.path.join(FILE_PATH, "../examples/example.fits.gz")
 class Dummy:
     def __init__(self, content):
         self.content = content
+        self.status_code = 200
 
 
 with open(EXAMPLE_PATH, "rb") as f:
@@ -0,0 +1,266 @@
+import gzip
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from astropy.io.fits import HDUList
+
+sys.path.append("..")
+from alerce.cache import MemoryResponseCache
+from alerce.core import Alerce
+from alerce.store import BlobStore
+from alerce.transport import Transport
+
+EXAMPLE_PATH = os.path.join(os.path.dirname(__file__), "../examples/example.fits.gz")
+
+
+class Dummy:
+    def __init__(self, content):
+        self.content = content
+        self.status_code = 200
+        self.headers = {}
+
+
+with open(EXAMPLE_PATH, "rb") as f:
+    EXAMPLE_FITS = f.read()
+
+
+def test_put_get(tmp_path):
+    store = BlobStore(str(tmp_path))
+    key = BlobStore.make_key("ztf", "oid", 1, "science", "fits")
+    assert key == "ztf/oid/1/science/fits"
+    assert store.get(key) is None
+    digest = store.put(key, b"body")
+    assert store.get(key) == b"body"
+    assert store.digest(key) == digest
+    assert key in store
+    store.close()
+    # persisted between instances
+    assert BlobStore(str(tmp_path)).get(key) == b"body"
+
+
+def test_identical_bodies_stored_once(tmp_path):
+    store = BlobStore(str(tmp_path))
+    digest = store.put("a", b"0123456789")
+    assert store.put("b", b"0123456789") == digest
+    assert len(store) == 2
+    assert store.size() == 10
+    store.delete("a")
+    assert store.get("b") == b"0123456789"
+    store.delete("b")
+    assert store.size() == 0
+    assert not os.path.exists(store._blob_path(digest))
+
+
+def test_replaced_body_file_removed(tmp_path):
+    store = BlobStore(str(tmp_path))
+    first = store.put("a", b"first")
+    store.put("a", b"second")
+    assert store.get("a") == b"second"
+    assert not os.path.exists(store._blob_path(first))
+    assert store.size() == 6
+
+
+def test_quota_evicts_least_recently_read(tmp_path):
+    store = BlobStore(str(tmp_path), max_bytes=30)
+    for key in "abc":
+        store.put(key, key.encode() * 10)
+    store.get("a")
+    store.put("d", b"d" * 10)
+    assert "b" not in store
+    assert store.get("a") == b"a" * 10
+    assert store.size() == 30
+    # bodies over the quota are not stored
+    store.put("e", b"e" * 31)
+    assert "e" not in store
+    assert len(store) == 3
+
+
+def test_missing_file(tmp_path):
+    store = BlobStore(str(tmp_path))
+    digest = store.put("a", b"body")
+    os.remove(store._blob_path(digest))
+    assert store.get("a") is None
+    assert len(store) == 0
+
+
+def test_threads(tmp_path):
+    store = BlobStore(str(tmp_path))
+
+    def work(n):
+        for i in range(10):
+            body = b"%d" % (i % 5)
+            store.put("%d-%d" % (n, i), body)
+            assert store.get("%d-%d" % (n, i)) == body
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8)))
+    assert len(store) == 80
+    assert store.size() == 5
+    store.clear()
+    assert len(store) == 0 and store.size() == 0
+
+
+@pytest.mark.filterwarnings("ignore:Keyword name")
+def test_get_stamps_stored(tmp_path):
+    store = BlobStore(str(tmp_path))
+    alerce = Alerce(transport=Transport(stamp_store=store))
+    with patch("requests.Session.request", return_value=Dummy(EXAMPLE_FITS)) as request:
+        first = alerce.get_stamps(oid="ZTF18abjpdlh", candid=1, survey="ztf")
+        second = alerce.get_stamps(
+            oid="ZTF18abjpdlh", candid=1, survey="ztf", format="numpy"
+        )
+    assert isinstance(first, HDUList)
+    assert len(second) == 3 and isinstance(second[0], np.ndarray)
+    assert request.call_count == 3
+    # kept compressed, as received
+    key = BlobStore.make_key("ztf", "ZTF18abjpdlh", 1, "difference", "fits")
+    assert store.get(key) == EXAMPLE_FITS
+    assert gzip.decompress(store.get(key))
+    # identical cutouts take space once
+    assert store.size() == len(EXAMPLE_FITS)
+
+
+@pytest.mark.filterwarnings("ignore:Keyword name")
+def test_stored_stamps_not_cached(tmp_path, requests_mock):
+    cache = MemoryResponseCache(ttls={})
+    transport = Transport(stamp_store=BlobStore(str(tmp_path)), cache=cache)
+    alerce = Alerce(transport=transport)
+    url = alerce.legacy_stamps_client.config["AVRO_URL"] + "/get_stamp"
+    requests_mock.get(url, content=EXAMPLE_FITS, headers={"ETag": '"stamp"'})
+    alerce.get_stamps(oid="ZTF18abjpdlh", candid=1, survey="ztf")
+    # kept by the stamp store only
+    assert len(cache) == 0
+
+
+def test_missing_stamp(tmp_path, requests_mock):
+    alerce = Alerce(transport=Transport(stamp_store=BlobStore(str(tmp_path))))
+    url = alerce.legacy_stamps_client.config["AVRO_URL"] + "/get_stamp"
+    requests_mock.get(url, status_code=404, content=b'{"detail": "not found"}')
+    with pytest.warns(RuntimeWarning, match="not found"):
+        assert alerce.get_stamps(oid="oid", candid=1, survey="ztf") is None
+
+
+@pytest.mark.filterwarnings("ignore:Keyword name")
+def test_multisurvey_get_stamps_stored(tmp_path):
+    store = BlobStore(str(tmp_path))
+    alerce = Alerce(transport=Transport(stamp_store=store))
+    with patch("requests.Session.request", return_value=Dummy(EXAMPLE_FITS)) as request:
+        for _ in range(2):
+            r = alerce.get_stamps(oid="oid", measurement_id=1, survey="lsst")
+            assert len(r) == 3
+    assert request.call_count == 3
+    assert BlobStore.make_key("lsst", "oid", 1, "cutoutScience", "fits") in store
+
+
+def test_stamp_store_from_config(tmp_path, monkeypatch):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(
+        '{"transport": {"STAMP_STORE": {"PATH": "%s", "MAX_BYTES": 1024}}}'
+        % str(tmp_path / "stamps")
+    )
+    monkeypatch.setenv("ALERCE_CONFIG_PATH", str(config_path))
+    store = Transport.from_config().stamp_store
+    assert isinstance(store, BlobStore)
+    assert store.max_bytes == 1024
+
+
+def avro_body(request, context):
+    if request.qs["candid"] == ["404"]:
+        context.status_code = 404
+        return b'{"detail": "not found"}'
+    # candids 1 and 2 are the same alert packet
+    return b"avro-%d" % min(int(request.qs["candid"][0]), 2)
+
+
+def test_get_avros(tmp_path, requests_mock):
+    store = BlobStore(str(tmp_path))
+    alerce = Alerce(transport=Transport(avro_store=store))
+    url = alerce.legacy_stamps_client.config["AVRO_URL"] + "/get_avro"
+    adapter = requests_mock.get(url, content=avro_body)
+
+    assert alerce.get_avro("oid", candid=1) == b"avro-1"
+    pairs = [("oid", 1), ("oid", 2), ("oid", 3)]
+    avros = alerce.get_avros(pairs, max_workers=2)
+    assert avros == {
+        ("oid", 1): b"avro-1",
+        ("oid", 2): b"avro-2",
+        ("oid", 3): b"avro-2",
+    }
+    # only the avros missing from the store are downloaded
+    assert adapter.call_count == 3
+    # and each of them is looked up in the store once
+    assert store.stats["misses"] == 3 and store.stats["hits"] == 1
+    assert alerce.get_avros(pairs) == avros
+    assert adapter.call_count == 3
+    assert store.stats["misses"] == 3 and store.stats["hits"] == 4
+    # identical packets are stored once
+    assert store.digest("ztf/oid/2") == store.digest("ztf/oid/3")
+    assert store.size() == len(b"avro-1") + len(b"avro-2")
+
+
+def test_get_avros_errors(tmp_path, requests_mock):
+    alerce = Alerce(transport=Transport(avro_store=BlobStore(str(tmp_path))))
+    url = alerce.legacy_stamps_client.config["AVRO_URL"] + "/get_avro"
+    requests_mock.get(url, content=avro_body)
+    with pytest.warns(RuntimeWarning, match="1 of 2"):
+        avros = alerce.get_avros([("oid", 404), ("oid", 1)])
+    assert avros == {("oid", 404): None, ("oid", 1): b"avro-1"}
+    assert "ztf/oid/404" not in alerce.transport.avro_store
+
+
+def test_stored_avros_not_cached(tmp_path, requests_mock):
+    cache = MemoryResponseCache(ttls={})
+    store = BlobStore(str(tmp_path))
+    alerce = Alerce(transport=Transport(avro_store=store, cache=cache))
+    url = alerce.legacy_stamps_client.config["AVRO_URL"] + "/get_avro"
+    requests_mock.get(url, content=b"x" * 100000, headers={"ETag": '"avro"'})
+    assert len(alerce.get_avro("oid", candid=1)) == 100000
+    # kept by the avro store only
+    assert len(cache) == 0
+    assert store.size() == 100000
+
+
+def test_missing_avro(requests_mock):
+    alerce = Alerce()
+    url = alerce.legacy_stamps_client.config["AVRO_URL"] + "/get_avro"
+    requests_mock.get(url, content=avro_body)
+    with pytest.warns(RuntimeWarning, match="not found"):
+        assert alerce.get_avro("oid", candid=404) is None
+
+
+def test_multisurvey_get_avros(tmp_path, requests_mock):
+    store = BlobStore(str(tmp_path))
+    alerce = Alerce(transport=Transport(avro_store=store))
+    client = alerce.multisurvey_stamps_client
+    adapter = requests_mock.get(
+        client.config["STAMP_URL"] + "/get_avro", content=b"packet"
+    )
+    pairs = [("oid1", 10), ("oid2", 20)]
+    for _ in range(2):
+        avros = alerce.get_avros(pairs, use_multisurvey_api=True, survey="lsst")
+        assert avros == {("oid1", 10): b"packet", ("oid2", 20): b"packet"}
+    assert adapter.call_count == 2
+    sent = sorted(
+        (r.qs["oid"][0], r.qs["measurement_id"][0]) for r in adapter.request_history
+    )
+    assert sent == [("oid1", "10"), ("oid2", "20")]
+    assert "lsst/oid2/20" in store
+
+
+def test_store_stats(tmp_path):
+    store = BlobStore(str(tmp_path), max_bytes=10)
+    store.get("a")
+    store.put("a", b"123456")
+    store.get("a")
+    store.put("b", b"7890123")
+    stats = store.stats
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["bytes_cached"] == 6 and stats["bytes_network"] == 13
+    assert stats["evictions"] == 1
+    store.reset_stats()
+    assert store.stats["hit_ratio"] is None
+    store.close()
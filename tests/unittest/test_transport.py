@@ -0,0 +1,138 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import pytest
+from requests import Session
+
+sys.path.append("..")
+from alerce.core import Alerce
+from alerce.transport import Transport, request_key
+
+
+def test_transport_shared_by_all_clients():
+    alerce = Alerce()
+    clients = [
+        alerce,
+        alerce.legacy_ztf_client,
+        alerce.multisurvey_client,
+        alerce.legacy_stamps_client,
+        alerce.legacy_stamps_client.search_client,
+        alerce.multisurvey_stamps_client,
+        alerce.multisurvey_stamps_client.search_client,
+    ]
+    for client in clients:
+        assert client.transport is alerce.transport
+        assert client.session is alerce.transport.session
+
+
+def test_transport_given_to_client():
+    transport = Transport(pool_maxsize=32)
+    alerce = Alerce(transport=transport)
+    assert alerce.transport is transport
+    assert alerce.legacy_ztf_client.transport is transport
+
+
+def test_transport_pool_settings():
+    transport = Transport(pool_connections=4, pool_maxsize=32, pool_block=True)
+    adapter = transport.session.get_adapter("https://api.alerce.online")
+    assert adapter._pool_connections == 4
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block is True
+
+
+def test_transport_keep_alive():
+    assert Transport().session.headers["Connection"] == "keep-alive"
+    assert Transport(keep_alive=False).session.headers["Connection"] == "close"
+
+
+def test_transport_from_config_overrides():
+    transport = Transport.from_config(pool_maxsize=64)
+    assert transport.pool_maxsize == 64
+    assert transport.pool_connections == 10
+
+
+def test_request_key_normalizes_params():
+    a = request_key("get", "https://api.test/x", {"b": 1, "a": [2, 3], "c": None})
+    b = request_key("GET", "https://api.test/x", {"a": [2, 3], "b": 1})
+    assert a == b == "GET https://api.test/x?a=2&a=3&b=1"
+    assert request_key("GET", "https://api.test/x?q=1", {"a": 1}).endswith("?q=1&a=1")
+
+
+def slow_response(*args, **kwargs):
+    time.sleep(0.05)
+    return type("Response", (), {"status_code": 200})()
+
+
+def test_identical_requests_coalesced():
+    transport = Transport()
+
+    def answer_when_joined(*args, **kwargs):
+        # the other requests wait for this one, however slow the threads start
+        deadline = time.monotonic() + 5
+        while transport.stats.get("coalesced", 0) < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return slow_response()
+
+    with patch.object(
+        Session, "request", side_effect=answer_when_joined
+    ) as mock_request:
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            responses = list(
+                executor.map(
+                    lambda i: transport.request(
+                        "GET", "https://api.test/x", params={"oid": "a"}
+                    ),
+                    range(5),
+                )
+            )
+    assert mock_request.call_count == 1
+    assert all(resp is responses[0] for resp in responses)
+    assert transport.stats["coalesced"] == 4
+
+
+def test_different_requests_not_coalesced():
+    transport = Transport()
+    with patch.object(Session, "request", side_effect=slow_response) as mock_request:
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            list(
+                executor.map(
+                    lambda i: transport.request(
+                        "GET", "https://api.test/x", params={"oid": i}
+                    ),
+                    range(5),
+                )
+            )
+    assert mock_request.call_count == 5
+
+
+def test_coalesced_error_shared():
+    transport = Transport(coalesce=True)
+
+    def fail(*args, **kwargs):
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    with patch.object(Session, "request", side_effect=fail) as mock_request:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(transport.request, "GET", "https://api.test/x")
+                for _ in range(3)
+            ]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    assert mock_request.call_count == 1
+
+
+def test_coalescing_disabled():
+    transport = Transport(coalesce=False)
+    with patch.object(Session, "request", side_effect=slow_response) as mock_request:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(
+                executor.map(
+                    lambda i: transport.request("GET", "https://api.test/x"),
+                    range(3),
+                )
+            )
+    assert mock_request.call_count == 3
@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import threading
+import time
+import pytest
+
+sys.path.append("..")
+from alerce.cache import MemoryResponseCache
+from alerce.core import Alerce
+from alerce.transport import Transport
+from alerce.warm import RESOURCES, main, read_oids, warm
+
+ZTF_URL = Alerce().legacy_ztf_client.ztf_url
+
+
+def register(requests_mock, oid):
+    requests_mock.get(ZTF_URL + "/objects/%s" % oid, json={"oid": oid})
+    requests_mock.get(
+        ZTF_URL + "/objects/%s/probabilities" % oid, json=[{"probability": 1}]
+    )
+
+
+def test_warm_fills_cache(requests_mock):
+    oids = ["oid%d" % i for i in range(5)]
+    for oid in oids:
+        register(requests_mock, oid)
+    client = Alerce(transport=Transport(cache=MemoryResponseCache(default_ttl=60)))
+    calls = []
+    report = warm(
+        oids,
+        resources=["object", "probabilities"],
+        client=client,
+        max_workers=3,
+        progress=lambda *args: calls.append(args),
+    )
+    assert report == {"done": 10, "skipped": 0, "failed": {}}
+    assert calls[-1] == (10, 10, 0)
+    assert len(client.transport.cache) == 10
+    count = requests_mock.call_count
+    assert client.query_object("oid3", survey="ztf") == {"oid": "oid3"}
+    assert requests_mock.call_count == count
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Records the largest number of futures submitted and not finished"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queued = 0
+        self.max_queued = 0
+        self._count_lock = threading.Lock()
+        CountingExecutor.last = self
+
+    def submit(self, *args, **kwargs):
+        with self._count_lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        future = super().submit(*args, **kwargs)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self._count_lock:
+            self.queued -= 1
+
+
+def test_warm_bounded_queue(monkeypatch):
+    monkeypatch.setitem(RESOURCES, "sleep", lambda *args: time.sleep(0.001))
+    monkeypatch.setattr("alerce.warm.ThreadPoolExecutor", CountingExecutor)
+    client = Alerce(transport=Transport(cache=MemoryResponseCache()))
+    report = warm(range(200), resources=["sleep"], client=client, max_workers=3)
+    assert report["done"] == 200
+    assert CountingExecutor.last.max_queued <= 6
+
+
+def test_warm_resumes_from_checkpoint(requests_mock, tmp_path):
+    register(requests_mock, "ok")
+    requests_mock.get(
+        ZTF_URL + "/objects/missing", json={"detail": "not found"}, status_code=404
+    )
+    checkpoint = str(tmp_path / "warm.done")
+    client = Alerce(transport=Transport(cache=MemoryResponseCache()))
+    with pytest.warns(RuntimeWarning, match="1 of 2 downloads failed"):
+        report = warm(
+            ["ok", "missing"],
+            resources=["object"],
+            client=client,
+            checkpoint=checkpoint,
+        )
+    assert report["done"] == 1
+    assert list(report["failed"]) == [("missing", "object")]
+
+    count = requests_mock.call_count
+    with pytest.warns(RuntimeWarning):
+        report = warm(
+            ["ok", "missing"],
+            resources=["object"],
+            client=client,
+            checkpoint=checkpoint,
+        )
+    # only the failed download is retried
+    assert report["skipped"] == 1
+    assert requests_mock.call_count == count + 1
+    assert requests_mock.last_request.path.endswith("/missing")
+
+
+def test_warm_unknown_resource():
+    with pytest.raises(ValueError):
+        warm(["oid"], resources=["spectra"], client=Alerce())
+
+
+def test_read_oids(tmp_path):
+    path = tmp_path / "oids.txt"
+    path.write_text("# watch list\nZTF1\n\nZTF2,0.5\n  ZTF3  \n")
+    assert read_oids(str(path)) == ["ZTF1", "ZTF2", "ZTF3"]
+
+
+def test_main(requests_mock, tmp_path, capsys):
+    register(requests_mock, "ZTF1")
+    path = tmp_path / "oids.txt"
+    path.write_text("ZTF1\n")
+    cache = str(tmp_path / "responses.sqlite")
+    assert main([str(path), "-r", "object", "--cache", cache, "-q"]) == 0
+    assert "1 downloaded, 0 skipped, 0 failed" in capsys.readouterr().out
+
+
+def test_warm_stamps_without_store(monkeypatch):
+    monkeypatch.setitem(RESOURCES, "stamps", lambda *args: None)
+    client = Alerce(transport=Transport(cache=MemoryResponseCache()))
+    with pytest.warns(RuntimeWarning, match="no stamp store"):
+        warm(["oid"], resources=["stamps"], client=client)